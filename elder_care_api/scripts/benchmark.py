@@ -0,0 +1,325 @@
+"""Endpoint benchmark for the provider and booking routes.
+
+Drives every route in ``src/routes/providers.py`` and ``src/routes/bookings.py``
+with randomized but reproducible arguments drawn from the database (build one
+with ``scripts/generate_data.py``), either in process through the Flask test
+client or against a running server. For each endpoint it reports throughput,
+latency percentiles, status codes, response-cache hits and, in process, the
+number of SQL statements per request. Results are written as JSON so runs
+can be compared over time.
+
+    python scripts/benchmark.py --database /tmp/scale.db --requests 200
+    python scripts/benchmark.py --database /tmp/scale.db --compare benchmark-20250101T000000Z.json
+    python scripts/benchmark.py --database /tmp/scale.db --url http://127.0.0.1:5000
+
+The write endpoints create, update, confirm and cancel their own bookings in
+the far future, so a database can be reused, but it does grow.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from datetime import datetime, timedelta
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_ROOT)
+
+# Bookings made by the benchmark start here, one slot per request
+WRITE_START = datetime(2040, 1, 1, 9, 0)
+
+class LocalClient:
+    """Flask test client that also counts the SQL statements each request runs"""
+
+    def __init__(self, app):
+        from sqlalchemy import event
+        from src.models.care_models import db
+        self.client = app.test_client()
+        self.statements = 0
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.statements += 1
+
+    def request(self, method, path, body=None):
+        self.statements = 0
+        response = self.client.open(path, method=method, json=body)
+        data = response.get_data()
+        response.close()
+        return response.status_code, data, response.headers.get('X-Cache'), self.statements
+
+class RemoteClient:
+    """Plain HTTP client for a running server; statement counts are not available"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        url = self.url + urllib.parse.quote(path, safe="/?&=:,'")
+        request = urllib.request.Request(url, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read(), response.headers.get('X-Cache'), None
+        except urllib.error.HTTPError as error:
+            return error.code, error.read(), error.headers.get('X-Cache'), None
+
+def sample_fixtures(app, rnd, size=500):
+    """Random ids to draw request arguments from"""
+    from sqlalchemy import func, select
+    from src.models.care_models import db, Booking, ProviderProfile, Service, Elder, FamilyProfile
+
+    def sample(query):
+        return db.session.execute(query.order_by(func.random()).limit(size)).all()
+
+    with app.app_context():
+        fixtures = {
+            'providers': [row.id for row in sample(select(ProviderProfile.id))],
+            'cities': [row.city for row in db.session.execute(
+                select(ProviderProfile.city).where(ProviderProfile.city.isnot(None)).distinct()
+            )],
+            'services': [tuple(row) for row in sample(
+                select(Service.id, Service.provider_id).where(Service.is_active == True)
+            )],
+            'families': [tuple(row) for row in sample(
+                select(FamilyProfile.user_id, Elder.id).join(Elder, Elder.family_profile_id == FamilyProfile.id)
+            )],
+            'bookings': [row.id for row in sample(select(Booking.id))],
+            'dates': [row.scheduled_date for row in sample(select(Booking.scheduled_date))],
+        }
+        db.session.remove()
+    missing = [name for name in ('providers', 'services', 'families', 'bookings') if not fixtures[name]]
+    if missing:
+        sys.exit(f'The database has no {", ".join(missing)}; fill it with scripts/generate_data.py first')
+    return fixtures
+
+class Scenarios:
+    """Request factories per endpoint; each returns ``(method, path, body)``"""
+
+    def __init__(self, fixtures, rnd):
+        self.fx = fixtures
+        self.rnd = rnd
+        self.slot = 0
+        self.created = []
+        self.confirmed = []
+
+    def pick(self, name):
+        return self.rnd.choice(self.fx[name])
+
+    def day(self):
+        return self.pick('dates').date()
+
+    def new_booking(self):
+        service_id, provider_id = self.pick('services')
+        family_user_id, elder_id = self.pick('families')
+        self.slot += 1
+        start = WRITE_START + timedelta(days=self.rnd.randrange(3650), hours=self.slot % 8)
+        return {
+            'family_user_id': family_user_id, 'provider_id': provider_id, 'service_id': service_id,
+            'elder_id': elder_id, 'scheduled_date': start.isoformat(), 'duration_minutes': 60
+        }
+
+    def availability(self):
+        first = self.day()
+        return ('GET', f'/api/providers/{self.pick("providers")}/availability'
+                       f'?start_date={first}&end_date={first + timedelta(days=6)}', None)
+
+    def record(self, name, status, data):
+        """Keep the bookings created here for the update, status and cancel endpoints"""
+        if name == 'POST /bookings' and status == 201:
+            self.created.append(json.loads(data)['id'])
+
+    def own_booking(self):
+        return self.created[-1] if self.created else self.pick('bookings')
+
+    def to_confirm(self):
+        booking_id = self.created.pop(0) if self.created else self.pick('bookings')
+        self.confirmed.append(booking_id)
+        return booking_id
+
+    def to_cancel(self):
+        return self.confirmed.pop(0) if self.confirmed else self.own_booking()
+
+    def all(self):
+        day = self.day
+        return {
+            # providers.py
+            'GET /providers': lambda: ('GET', f'/api/providers?page={self.rnd.randint(1, 5)}', None),
+            'GET /providers?city': lambda: ('GET', f'/api/providers?city={self.pick("cities")}&verified_only=true', None),
+            'GET /providers?q': lambda: ('GET', '/api/providers?q=' + self.rnd.choice(
+                ['dementia', 'wound care', 'nurse', 'companionship', 'physio']), None),
+            'GET /providers?near': lambda: ('GET', f'/api/providers?near={self.pick("cities")}&radius_km=5', None),
+            'GET /providers/<id>': lambda: ('GET', f'/api/providers/{self.pick("providers")}', None),
+            'GET /providers/<id>/reviews': lambda: ('GET', f'/api/providers/{self.pick("providers")}/reviews', None),
+            'GET /providers/<id>/availability': lambda: self.availability(),
+            'POST /providers/search': lambda: ('POST', '/api/providers/search', {
+                'location': {'city': self.pick('cities')}, 'services': ['home_care'],
+                'preferences': {'min_rating': 3.5}, 'limit': 20
+            }),
+            'POST /providers/search+availability': lambda: ('POST', '/api/providers/search', {
+                'availability': {'date': day().isoformat(), 'start_time': '09:00', 'end_time': '12:00'},
+                'limit': 20
+            }),
+            'GET /reviews/export': lambda: ('GET', f'/api/reviews/export?provider_id={self.pick("providers")}', None),
+            # bookings.py
+            'POST /bookings': lambda: ('POST', '/api/bookings', self.new_booking()),
+            'POST /bookings/bulk': lambda: ('POST', '/api/bookings/bulk', dict(self.new_booking(), recurrence={
+                'start': self.new_booking()['scheduled_date'], 'frequency': 'weekly', 'count': 8
+            })),
+            'GET /bookings/<id>': lambda: ('GET', f'/api/bookings/{self.pick("bookings")}', None),
+            'PUT /bookings/<id>': lambda: ('PUT', f'/api/bookings/{self.own_booking()}',
+                                           {'special_instructions': 'Benchmark update'}),
+            'PUT /bookings/<id>/status': lambda: ('PUT', f'/api/bookings/{self.to_confirm()}/status',
+                                                  {'status': 'confirmed'}),
+            'GET /bookings?family': lambda: ('GET', f'/api/bookings?family_user_id={self.pick("families")[0]}', None),
+            'GET /bookings?provider&status': lambda: (
+                'GET', f'/api/bookings?provider_id={self.pick("providers")}&status=completed', None),
+            'GET /bookings?cursor': lambda: (
+                'GET', f'/api/bookings?family_user_id={self.pick("families")[0]}&cursor=&per_page=20', None),
+            'GET /bookings/upcoming': lambda: (
+                'GET', f'/api/bookings/upcoming?user_id={self.pick("families")[0]}&user_type=family', None),
+            'GET /bookings/export': lambda: (
+                'GET', f'/api/bookings/export?provider_id={self.pick("providers")}&format=csv', None),
+            'DELETE /bookings/<id>': lambda: ('DELETE', f'/api/bookings/{self.to_cancel()}', None),
+        }
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(fraction * len(values)))], 3)
+
+def run_endpoint(client, scenarios, name, factory, requests, warmup):
+    for _ in range(warmup):
+        status, data, cache, count = client.request(*factory())
+        scenarios.record(name, status, data)
+    latencies = []
+    statuses = Counter()
+    statements = []
+    cache_hits = 0
+    began = time.perf_counter()
+    for _ in range(requests):
+        method, path, body = factory()
+        start = time.perf_counter()
+        status, data, cache, count = client.request(method, path, body)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[status] += 1
+        cache_hits += cache == 'HIT'
+        if count is not None:
+            statements.append(count)
+        scenarios.record(name, status, data)
+    elapsed = time.perf_counter() - began
+    return {
+        'requests': requests,
+        'errors': sum(count for status, count in statuses.items() if status >= 500),
+        'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+        'throughput_rps': round(requests / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': percentile(latencies, .5), 'p95': percentile(latencies, .95),
+            'p99': percentile(latencies, .99), 'max': round(max(latencies), 3),
+        },
+        'sql_statements': {
+            'mean': round(sum(statements) / len(statements), 2), 'max': max(statements)
+        } if statements else None,
+        'cache_hits': cache_hits,
+    }
+
+def table_counts(app):
+    from src.models.care_models import db
+    with app.app_context():
+        counts = {table: db.session.execute(db.text(f'SELECT count(*) FROM {table}')).scalar()
+                  for table in ('provider_profiles', 'services', 'bookings', 'reviews', 'users')}
+        db.session.remove()
+        return counts
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=API_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, previous=None):
+    header = f'{"endpoint":<38} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"sql":>6}  codes'
+    print(header)
+    for name, result in results['endpoints'].items():
+        latency = result['latency_ms']
+        statements = result['sql_statements']['mean'] if result['sql_statements'] else '-'
+        codes = ' '.join(f'{status}x{count}' for status, count in result['status_codes'].items())
+        line = f'{name:<38} {result["throughput_rps"]:>8} {latency["p50"]:>8} {latency["p95"]:>8} ' \
+               f'{latency["p99"]:>8} {statements:>6}  {codes}'
+        before = (previous or {}).get('endpoints', {}).get(name)
+        if before:
+            change = (latency['p50'] - before['latency_ms']['p50']) / before['latency_ms']['p50'] * 100 \
+                if before['latency_ms']['p50'] else 0
+            line += f'  (p50 {change:+.0f}% vs {previous["meta"].get("revision") or "previous"})'
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='SQLite file to benchmark (fixtures are sampled from it)')
+    parser.add_argument('--url', help='benchmark a running server at this URL instead of the test client')
+    parser.add_argument('--mode', choices=['production', 'default'], default='default', help='database mode in process')
+    parser.add_argument('--requests', type=int, default=100, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests per endpoint first')
+    parser.add_argument('--only', help='run only endpoints whose name contains this text')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='results file (default: benchmark-<UTC time>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare p50 latency with')
+    args = parser.parse_args()
+
+    from src.main import create_app
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.database)}', 'DATABASE_MODE': args.mode
+    })
+    rnd = random.Random(args.seed)
+    scenarios = Scenarios(sample_fixtures(app, rnd), rnd)
+    client = RemoteClient(args.url) if args.url else LocalClient(app)
+
+    started = datetime.utcnow()
+    endpoints = {}
+    for name, factory in scenarios.all().items():
+        if args.only and args.only not in name:
+            continue
+        endpoints[name] = run_endpoint(client, scenarios, name, factory, args.requests, args.warmup)
+        print(f'  {name}: p50 {endpoints[name]["latency_ms"]["p50"]} ms', file=sys.stderr)
+
+    results = {
+        'meta': {
+            'started_at': started.isoformat() + 'Z',
+            'revision': git_revision(),
+            'target': args.url or 'test-client',
+            'database': os.path.abspath(args.database),
+            'database_mode': args.mode,
+            'rows': table_counts(app),
+            'requests_per_endpoint': args.requests,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'endpoints': endpoints,
+    }
+    output = args.output or f'benchmark-{started.strftime("%Y%m%dT%H%M%SZ")}.json'
+    with open(output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    previous = None
+    if args.compare:
+        with open(args.compare) as handle:
+            previous = json.load(handle)
+    print_results(results, previous)
+    print(f'results written to {output}')
+
+if __name__ == '__main__':
+    main()
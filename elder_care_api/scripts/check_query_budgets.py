@@ -0,0 +1,125 @@
+"""Query-budget check for the API endpoints.
+
+Seeds the same synthetic data as ``check_query_plans.py`` and calls every
+endpoint twice through the Flask test client, once as listed there and once
+with ``per_page``/``limit`` raised to ``--page-size``, with
+``QUERY_BUDGET_MODE = 'raise'``. A request fails when it runs more SQL
+statements than its view's ``@query_budget`` allows, when a statement repeats
+with different parameters (an N+1), or when its view declares no budget.
+
+    python scripts/check_query_budgets.py
+    python scripts/check_query_budgets.py --page-size 100
+
+Prints the statement count of every request and exits non-zero on failure.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_ROOT)
+
+from check_query_plans import load_app, seed, requests_to_check
+
+# Paged endpoints that take ``per_page``
+LIST_PATHS = r'/api/(providers|bookings|providers/\d+/reviews|messages|messages/conversations(/\d+)?)(\?|$)'
+
+def widen(url, payload, page_size):
+    """The same request with a larger page"""
+    if payload is not None and 'limit' in payload:
+        return url, dict(payload, limit=page_size)
+    if re.search(r'[?&]per_page=\d+', url):
+        return re.sub(r'([?&]per_page=)\d+', rf'\g<1>{page_size}', url), payload
+    if re.match(LIST_PATHS, url):
+        return url + ('&' if '?' in url else '?') + f'per_page={page_size}', payload
+    return url, payload
+
+def run_checks(app, ids, page_size=50):
+    """Run every request (reads also widened to ``page_size``) with budgets enforced
+
+    Returns the ``statement counts, method, url`` line of each request, the
+    number of requests run and the failures.
+    """
+    app.config.update(TESTING=True, QUERY_BUDGET_MODE='raise')
+    from sqlalchemy import event
+    from src.models.care_models import db
+    from src.utils.query_budget import QueryBudgetExceeded
+
+    counter = {'statements': 0}
+
+    def count(*args):
+        counter['statements'] += 1
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', count)
+
+    client = app.test_client()
+    lines = []
+    failures = []
+    created = None
+    next_cursor = None
+    checked = 0
+    try:
+        for method, url, payload in requests_to_check(ids):
+            # Write requests change state, so only reads run a second time
+            variants = [(url, payload)]
+            if method == 'GET' or url.endswith('/search'):
+                variants.append(widen(url, payload, page_size))
+            counts = []
+            for variant_url, variant_payload in variants:
+                variant_url = variant_url.replace('{created}', str(created)).replace('{next_cursor}', next_cursor or '')
+                counter['statements'] = 0
+                checked += 1
+                try:
+                    response = client.open(variant_url, method=method, json=variant_payload)
+                except QueryBudgetExceeded as e:
+                    failures.append(str(e))
+                    counts.append('!')
+                    continue
+                response.close()
+                counts.append(str(counter['statements']))
+                if response.status_code >= 400:
+                    failures.append(f'{method} {variant_url}: HTTP {response.status_code}')
+                    continue
+                view = app.view_functions.get(app.url_map.bind('').match(variant_url.split('?')[0], method)[0])
+                if getattr(view, 'query_budget', None) is None:
+                    failures.append(f'{method} {variant_url}: {view.__name__} declares no query budget')
+                body = response.get_json(silent=True)
+                if variant_url == url.replace('{created}', str(created)).replace('{next_cursor}', next_cursor or ''):
+                    if method == 'POST' and url == '/api/bookings':
+                        created = body['id']
+                    if isinstance(body, dict) and isinstance(body.get('pagination'), dict):
+                        next_cursor = body['pagination'].get('next_cursor')
+            lines.append(f'{" / ".join(counts):>9}  {method} {url}')
+    finally:
+        with app.app_context():
+            for engine in db.engines.values():
+                event.remove(engine, 'before_cursor_execute', count)
+    return lines, checked, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--page-size', type=int, default=50, help='page size of the second run of each request')
+    args = parser.parse_args()
+    handle, database = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    os.unlink(database)
+
+    app = load_app(database)
+    ids = seed(app)
+    lines, checked, failures = run_checks(app, ids, args.page_size)
+    for line in lines:
+        print(line)
+
+    print(f'\nchecked {checked} requests')
+    for failure in failures:
+        print(f'  {failure}')
+    if failures:
+        sys.exit(1)
+    print('every request within its query budget')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""Query-plan regression check for the API endpoints.
+
+Seeds a temporary SQLite database with synthetic providers, bookings,
+reviews and messages, calls every endpoint through the Flask test client, and runs
+``EXPLAIN QUERY PLAN`` on each SELECT/UPDATE/DELETE statement the requests
+issued (with the same parameters). A plan step that scans a whole table
+(``SCAN <table>`` without an index) is reported as a failure unless the
+statement is listed in ``ALLOWED_SCANS``.
+
+    python scripts/check_query_plans.py
+    python scripts/check_query_plans.py --verbose   # print every plan
+
+Exits non-zero when an unexpected full table scan is found.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_ROOT)
+
+PROVIDERS = 200
+FAMILIES = 50
+BOOKINGS_PER_PROVIDER = 20
+REVIEWS_PER_PROVIDER = 10
+MESSAGE_BOOKINGS = 1000
+FIRST_DATE = datetime(2031, 1, 6, 9, 0)
+
+# Statements that are expected to read a whole table, matched against the SQL
+ALLOWED_SCANS = [
+    # The in-process catalog and free-slot indexes load every provider once
+    (re.compile(r'FROM provider_profiles JOIN users ON users\.id = provider_profiles\.user_id '
+                r'ORDER BY provider_profiles\.id$'), 'catalog index load'),
+    (re.compile(r'^SELECT provider_profiles\.id, provider_profiles\.availability_schedule\s+FROM provider_profiles$'),
+     'free-slot index schedule load'),
+]
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?!.*\bUSING\b)')
+
+def load_app(database):
+    from src.main import create_app
+    from src.models.care_models import db
+    from src.utils import schema
+    from src.utils.seed import seed_sample_data
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+    with app.app_context():
+        schema.upgrade(db.engine)
+        seed_sample_data()
+    return app
+
+def seed(app):
+    """Add synthetic providers with services, bookings, reviews and messages"""
+    from werkzeug.security import generate_password_hash
+    from sqlalchemy import insert
+    from src.models.care_models import (
+        db, User, FamilyProfile, Elder, ProviderProfile, Service, Booking, Review, Message,
+        UserRole, ProviderType, ServiceType, BookingStatus
+    )
+    from src.utils import rating_aggregates, unread_counts
+    password = generate_password_hash('password123')
+    statuses = list(BookingStatus)
+    with app.app_context():
+        family_user = User.query.filter_by(role=UserRole.FAMILY).order_by(User.id).first()
+        elder = Elder.query.join(FamilyProfile).filter(FamilyProfile.user_id == family_user.id).first()
+        db.session.execute(insert(User), [{
+            'username': f'plan_family_{n}', 'email': f'plan_family_{n}@example.com',
+            'password_hash': password, 'first_name': 'Plan', 'last_name': f'Family {n}',
+            'role': UserRole.FAMILY
+        } for n in range(FAMILIES)])
+        family_ids = db.session.execute(
+            db.select(User.id).where(User.username.like('plan_family_%')).order_by(User.id)
+        ).scalars().all()
+        db.session.execute(insert(FamilyProfile), [{'user_id': user_id, 'city': 'Downtown'} for user_id in family_ids])
+        db.session.execute(insert(Elder), [{
+            'family_profile_id': profile_id, 'first_name': 'Plan', 'last_name': f'Elder {profile_id}'
+        } for profile_id in db.session.execute(
+            db.select(FamilyProfile.id).where(FamilyProfile.user_id.in_(family_ids))
+        ).scalars()])
+        families = [(family_user.id, elder.id)] + db.session.execute(
+            db.select(FamilyProfile.user_id, Elder.id).join(Elder).where(FamilyProfile.user_id.in_(family_ids))
+        ).all()
+        users = [{
+            'username': f'plan_provider_{n}', 'email': f'plan_provider_{n}@example.com',
+            'password_hash': password, 'first_name': 'Plan', 'last_name': f'Provider {n}',
+            'role': UserRole.PROVIDER
+        } for n in range(PROVIDERS)]
+        db.session.execute(insert(User), users)
+        user_ids = db.session.execute(
+            db.select(User.id).where(User.username.like('plan_provider_%')).order_by(User.id)
+        ).scalars().all()
+        db.session.execute(insert(ProviderProfile), [{
+            'user_id': user_id, 'provider_type': ProviderType.INDIVIDUAL,
+            'business_name': f'Plan Provider {n}', 'city': ('Downtown', 'Westside', 'Northside')[n % 3],
+            'state': 'CA', 'zip_code': f'902{n % 20:02d}', 'hourly_rate': 30 + n % 30,
+            'is_verified': n % 2 == 0, 'rating': 0.0, 'total_reviews': 0
+        } for n, user_id in enumerate(user_ids)])
+        provider_ids = db.session.execute(
+            db.select(ProviderProfile.id).where(ProviderProfile.user_id.in_(user_ids)).order_by(ProviderProfile.id)
+        ).scalars().all()
+        db.session.execute(insert(Service), [{
+            'provider_id': provider_id, 'service_type': ServiceType.HOME_CARE, 'name': 'Home Care',
+            'price': 35, 'duration_minutes': 60, 'is_active': True
+        } for provider_id in provider_ids])
+        service_ids = dict(db.session.execute(
+            db.select(Service.provider_id, Service.id).where(Service.provider_id.in_(provider_ids))
+        ).all())
+        bookings = []
+        for n, provider_id in enumerate(provider_ids):
+            for k in range(BOOKINGS_PER_PROVIDER):
+                scheduled = FIRST_DATE + timedelta(days=k, hours=n % 6)
+                family_id, elder_id = families[(n + k) % len(families)]
+                bookings.append({
+                    'family_user_id': family_id, 'provider_id': provider_id,
+                    'service_id': service_ids[provider_id], 'elder_id': elder_id,
+                    'scheduled_date': scheduled, 'duration_minutes': 60,
+                    'end_time': scheduled + timedelta(minutes=60),
+                    'status': statuses[(n + k) % len(statuses)], 'total_cost': 35
+                })
+        db.session.execute(insert(Booking), bookings)
+        booking_ids = db.session.execute(
+            db.select(Booking.provider_id, Booking.family_user_id, Booking.id).where(Booking.provider_id.in_(provider_ids))
+            .order_by(Booking.id)
+        ).all()
+        reviews = []
+        per_provider = {}
+        for provider_id, family_id, booking_id in booking_ids:
+            count = per_provider.get(provider_id, 0)
+            if count < REVIEWS_PER_PROVIDER:
+                per_provider[provider_id] = count + 1
+                reviews.append({
+                    'booking_id': booking_id, 'provider_id': provider_id, 'family_user_id': family_id,
+                    'rating': 1 + booking_id % 5, 'comment': 'Plan check review',
+                    'created_at': FIRST_DATE + timedelta(days=count)
+                })
+        db.session.execute(insert(Review), reviews)
+        rating_aggregates.rebuild(db.session.connection())
+        # A question from the family and the provider's answer for some bookings
+        provider_users = dict(zip(provider_ids, user_ids))
+        messages = []
+        for n, (provider_id, family_id, booking_id) in enumerate(booking_ids[:MESSAGE_BOOKINGS]):
+            sent = FIRST_DATE + timedelta(minutes=n)
+            messages += [{
+                'sender_id': family_id, 'recipient_id': provider_users[provider_id], 'booking_id': booking_id,
+                'content': 'Plan check question', 'is_read': n % 3 == 0, 'created_at': sent
+            }, {
+                'sender_id': provider_users[provider_id], 'recipient_id': family_id, 'booking_id': booking_id,
+                'content': 'Plan check answer', 'is_read': n % 2 == 0, 'created_at': sent + timedelta(seconds=30)
+            }]
+        db.session.execute(insert(Message), messages)
+        unread_counts.rebuild(db.session.connection())
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        return {
+            'family_user_id': family_user.id, 'elder_id': elder.id,
+            'provider_id': provider_ids[0], 'service_id': service_ids[provider_ids[0]],
+            'provider_user_id': user_ids[0], 'booking_id': booking_ids[0].id
+        }
+
+def requests_to_check(ids):
+    """``(method, url, json)`` for every endpoint and the main filter combinations"""
+    provider = ids['provider_id']
+    family = ids['family_user_id']
+    booking = {
+        'family_user_id': family, 'provider_id': provider, 'service_id': ids['service_id'],
+        'elder_id': ids['elder_id'], 'scheduled_date': '2032-02-02T10:00:00', 'duration_minutes': 60
+    }
+    message = {
+        'sender_id': family, 'recipient_id': ids['provider_user_id'], 'booking_id': ids['booking_id'],
+        'content': 'Is Tuesday still fine?'
+    }
+    return [
+        ('GET', '/api/providers', None),
+        ('GET', '/api/providers?city=Downtown&verified_only=true&sort_by=rating', None),
+        ('GET', '/api/providers?q=provider', None),
+        ('GET', '/api/providers?service_type=home_care&max_rate=40', None),
+        ('GET', '/api/providers?per_page=5&cursor=', None),
+        ('GET', '/api/providers?per_page=5&cursor={next_cursor}', None),
+        ('GET', f'/api/providers/{provider}', None),
+        ('GET', f'/api/providers/{provider}/reviews', None),
+        ('GET', f'/api/providers/{provider}/reviews?cursor=&per_page=3', None),
+        ('GET', f'/api/providers/{provider}/reviews?cursor={{next_cursor}}&per_page=3', None),
+        ('GET', f'/api/providers/{provider}/availability?start_date=2031-01-06&end_date=2031-01-20', None),
+        ('POST', '/api/providers/search', {'location': {'city': 'Downtown'}, 'services': ['home_care'], 'limit': 20}),
+        ('POST', '/api/providers/search', {
+            'limit': 20,
+            'availability': {'windows': [{'date': '2031-01-07', 'start_time': '09:00', 'end_time': '12:00'}]}
+        }),
+        ('GET', '/api/bookings', None),
+        ('GET', f'/api/bookings?family_user_id={family}', None),
+        ('GET', f'/api/bookings?provider_id={provider}&status=confirmed', None),
+        ('GET', '/api/bookings?status=pending', None),
+        ('GET', '/api/bookings?start_date=2031-01-10&end_date=2031-01-12', None),
+        ('GET', f'/api/bookings?family_user_id={family}&cursor=&per_page=5', None),
+        ('GET', f'/api/bookings?family_user_id={family}&cursor={{next_cursor}}&per_page=5', None),
+        ('GET', f'/api/bookings/export?provider_id={provider}', None),
+        ('GET', '/api/bookings/export?format=csv&start_date=2031-01-10&end_date=2031-01-12', None),
+        ('GET', '/api/reviews/export', None),
+        ('GET', f'/api/reviews/export?provider_id={provider}&format=csv', None),
+        ('GET', '/api/reviews/export?start_date=2031-01-08', None),
+        ('GET', f'/api/bookings/upcoming?user_id={family}&user_type=family', None),
+        ('GET', f'/api/bookings/upcoming?user_id={ids["provider_user_id"]}&user_type=provider', None),
+        ('POST', '/api/bookings', booking),
+        ('GET', '/api/bookings/{created}', None),
+        ('PUT', '/api/bookings/{created}', {'duration_minutes': 90}),
+        ('PUT', '/api/bookings/{created}/status', {'status': 'confirmed'}),
+        ('DELETE', '/api/bookings/{created}', None),
+        ('POST', '/api/bookings/bulk', dict(booking, recurrence={
+            'start': '2032-03-01T09:00:00', 'until': '2032-03-14', 'days': ['monday', 'thursday']
+        })),
+        ('GET', f'/api/dashboard/family/{family}', None),
+        ('GET', f'/api/dashboard/provider/{ids["provider_user_id"]}', None),
+        ('GET', '/api/analytics/bookings?start_date=2030-01-01&end_date=2033-12-31&granularity=month', None),
+        ('GET', '/api/analytics/bookings?start_date=2031-01-01&end_date=2031-03-31&service_type=home_care', None),
+        ('GET', f'/api/analytics/providers/{provider}/bookings?start_date=2030-01-01&end_date=2033-12-31&granularity=week', None),
+        ('GET', f'/api/messages?user_id={family}', None),
+        ('GET', f'/api/messages?user_id={family}&unread_only=true&per_page=5', None),
+        ('GET', f'/api/messages?user_id={family}&unread_only=true&per_page=5&cursor={{next_cursor}}', None),
+        ('GET', f'/api/messages/conversations?user_id={family}&per_page=5', None),
+        ('GET', f'/api/messages/conversations?user_id={family}&per_page=5&cursor={{next_cursor}}', None),
+        ('GET', f'/api/messages/conversations/{ids["provider_user_id"]}?user_id={family}', None),
+        ('GET', f'/api/messages/unread-count?user_id={family}', None),
+        ('GET', f'/api/messages/stream?user_id={family}', None),
+        ('GET', f'/api/messages/stream?user_id={family}&last_event_id=1', None),
+        ('POST', '/api/batch', {'requests': [
+            {'path': f'/api/bookings/{ids["booking_id"]}'},
+            {'path': f'/api/providers/{provider}'},
+            {'path': f'/api/providers/{provider}/reviews?per_page=3'},
+        ]}),
+        ('POST', '/api/messages', message),
+        ('POST', '/api/messages/read', {'user_id': ids['provider_user_id'], 'with_user_id': family}),
+        ('POST', '/api/messages/read', {'user_id': family}),
+    ]
+
+def capture_statements(engine, statements):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not re.match(r'\s*(SELECT|UPDATE|DELETE|WITH)\b', statement, re.I):
+            return
+        statements.append((statement, parameters))
+
+def explain(connection, statement, parameters):
+    """Plan detail lines for a statement"""
+    cursor = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+    return [row[-1] for row in cursor]
+
+def full_scans(plan):
+    scans = []
+    for detail in plan:
+        match = FULL_SCAN.match(detail)
+        # Virtual tables (the FTS index), constant rows and materialized subqueries are not table scans
+        if match and 'VIRTUAL TABLE' not in detail and 'CONSTANT ROW' not in detail \
+                and not match.group(1).startswith('anon_'):
+            scans.append(match.group(1))
+    return scans
+
+def allowed(statement):
+    for pattern, reason in ALLOWED_SCANS:
+        if pattern.search(' '.join(statement.split())):
+            return reason
+    return None
+
+def run_checks(app, ids, verbose=False):
+    """Run every request and explain its statements; returns the statement count and the failures"""
+    from src.models.care_models import db
+
+    failures = []
+    checked = 0
+    client = app.test_client()
+    created = None
+    next_cursor = None
+    statements = []
+    with app.app_context():
+        for engine in db.engines.values():
+            capture_statements(engine, statements)
+        engine = db.engines[None]
+    for method, url, payload in requests_to_check(ids):
+        url = url.replace('{created}', str(created)).replace('{next_cursor}', next_cursor or '')
+        statements.clear()
+        response = client.open(url, method=method, json=payload)
+        # Finish streamed bodies before the next request
+        response.close()
+        if response.status_code >= 400:
+            failures.append((f'{method} {url}', f'HTTP {response.status_code}', response.get_data(as_text=True)[:200], []))
+            continue
+        body = response.get_json(silent=True)
+        if method == 'POST' and url == '/api/bookings':
+            created = body['id']
+        if isinstance(body, dict) and isinstance(body.get('pagination'), dict):
+            next_cursor = body['pagination'].get('next_cursor')
+        with engine.connect() as connection:
+            for statement, parameters in list(statements):
+                plan = explain(connection, statement, parameters)
+                checked += 1
+                scans = full_scans(plan)
+                reason = allowed(statement) if scans else None
+                if verbose:
+                    print(f'{method} {url}\n  {" ".join(statement.split())}')
+                    for detail in plan:
+                        print(f'    {detail}')
+                    if reason:
+                        print(f'    (allowed: {reason})')
+                if scans and not reason:
+                    failures.append((f'{method} {url}', ', '.join(scans), statement, plan))
+    return checked, failures
+
+def format_failure(failure):
+    request, scans, statement, plan = failure
+    return '\n'.join([f'{request}: full scan of {scans}', f'  {" ".join(statement.split())}']
+                     + [f'    {detail}' for detail in plan])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--verbose', action='store_true', help='print every statement with its plan')
+    args = parser.parse_args()
+    handle, database = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    os.unlink(database)
+
+    app = load_app(database)
+    ids = seed(app)
+    checked, failures = run_checks(app, ids, args.verbose)
+
+    print(f'checked {checked} statements from {len(requests_to_check(ids))} requests')
+    for failure in failures:
+        print(f'\n{format_failure(failure)}')
+    if failures:
+        sys.exit(1)
+    print('no unexpected full table scans')
+
+if __name__ == '__main__':
+    main()
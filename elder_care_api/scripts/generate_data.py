@@ -0,0 +1,428 @@
+"""Synthetic data generator for production-scale local databases.
+
+Fills a SQLite database with family users and their elders, providers,
+services, bookings and reviews, inserted with Core executemany batches and
+skewed the way real traffic is: providers cluster in the populous districts,
+a minority of providers takes most bookings, ratings lean positive, and
+booking status follows the date (past bookings are completed or cancelled,
+future ones pending or confirmed). A provider's bookings never overlap.
+
+    python scripts/generate_data.py --database /tmp/scale.db \\
+        --providers 100000 --services 1000000 --bookings 10000000 --reviews 2000000
+
+Secondary indexes and the full-text and rollup triggers are dropped during the
+load and rebuilt afterwards, followed by the rating aggregates, the booking
+rollups and ``ANALYZE``. Running
+it again appends another batch of the same shape.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_ROOT)
+
+# Hong Kong districts with rough weights (share of the elderly population)
+DISTRICTS = [
+    ('Kwun Tong', 9.5), ('Sha Tin', 8.9), ('Yuen Long', 8.3), ('Eastern', 7.4), ('Kwai Tsing', 7.2),
+    ('Sham Shui Po', 6.2), ('Wong Tai Sin', 6.1), ('Tuen Mun', 6.0), ('Kowloon City', 5.6),
+    ('Tai Po', 4.1), ('Tsuen Wan', 4.1), ('Southern', 3.8), ('Sai Kung', 3.6), ('North', 3.6),
+    ('Yau Tsim Mong', 4.3), ('Central and Western', 3.3), ('Wan Chai', 2.3), ('Islands', 2.1),
+]
+
+PROVIDER_TYPES = [('INDIVIDUAL', 0.70), ('FACILITY', 0.18), ('PHARMACY', 0.06), ('HOSPITAL', 0.06)]
+
+# Service type, weight, typical price and duration in minutes
+SERVICE_TYPES = [
+    ('HOME_CARE', 0.32, 35, 120), ('COMPANIONSHIP', 0.20, 28, 120), ('MEDICAL_SERVICES', 0.18, 55, 60),
+    ('TRANSPORTATION', 0.12, 25, 60), ('ADULT_DAY_CARE', 0.10, 65, 120), ('PHARMACY_SERVICES', 0.08, 20, 30),
+]
+
+RATINGS = [(1, 0.03), (2, 0.05), (3, 0.12), (4, 0.30), (5, 0.50)]
+
+FIRST_NAMES = ['Wing', 'Mei', 'Ka', 'Siu', 'Chi', 'Man', 'Yuk', 'Kwok', 'Lai', 'Hoi', 'Sarah', 'Michael',
+               'Grace', 'David', 'Emily', 'Peter', 'Joyce', 'Kenneth', 'Winnie', 'Raymond']
+LAST_NAMES = ['Chan', 'Wong', 'Lee', 'Cheung', 'Lau', 'Ng', 'Ho', 'Leung', 'Lam', 'Tang', 'Yeung', 'Chow',
+              'Tsang', 'Fung', 'Mak', 'Kwan', 'Lo', 'Yip', 'Tam', 'Cheng']
+SPECIALTIES = ['Dementia Care', 'Medication Management', 'Wound Care', 'Mobility Assistance', 'Companionship',
+               'Physiotherapy', 'Diabetes Care', 'Post-Surgery Recovery', 'Palliative Care', 'Meal Preparation',
+               'Light Housekeeping', 'Personal Hygiene', 'Stroke Rehabilitation', 'Respite Care']
+CERTIFICATIONS = ['Registered Nurse', 'Enrolled Nurse', 'Certified Nursing Assistant', 'CPR Certified',
+                  'First Aid', 'Physiotherapist', 'Occupational Therapist', 'Licensed Pharmacist']
+SERVICE_NAMES = {
+    'HOME_CARE': ['Personal Care Assistance', 'Home Care Visit', 'Overnight Care', 'Bathing Assistance'],
+    'COMPANIONSHIP': ['Companionship Visit', 'Escort to Appointments', 'Social Outing'],
+    'MEDICAL_SERVICES': ['In-Home Nursing Care', 'Wound Dressing', 'Health Check', 'Injection Service'],
+    'TRANSPORTATION': ['Medical Transport', 'Wheelchair Transport', 'Day Centre Shuttle'],
+    'ADULT_DAY_CARE': ['Adult Day Care', 'Half-Day Programme', 'Rehabilitation Exercise Class'],
+    'PHARMACY_SERVICES': ['Medication Delivery', 'Medication Review', 'Pill Organiser Setup'],
+}
+COMMENTS = ['Very caring and punctual.', 'Helpful and patient with my father.', 'Arrived late but did a good job.',
+            'Excellent service, will book again.', 'Friendly and professional.', 'Not what we expected.',
+            'My mother enjoys the visits.', 'Knowledgeable about medications.']
+SCHEDULES = [
+    {day: {'start': '09:00', 'end': '17:00'} for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday')},
+    {day: {'start': '08:00', 'end': '20:00'} for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+                                                          'saturday', 'sunday')},
+    dict({day: {'start': '09:00', 'end': '18:00'} for day in ('monday', 'wednesday', 'friday')},
+         saturday={'start': '10:00', 'end': '16:00'}),
+    {day: [{'start': '08:00', 'end': '12:00'}, {'start': '14:00', 'end': '19:00'}]
+     for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday')},
+]
+
+# Bookings start in one of these 2-hour slots (08:00-20:00) and last at most
+# two hours, so giving each of a provider's bookings its own slot keeps them
+# from overlapping
+SLOT_HOURS = 2
+SLOTS_PER_DAY = 6
+DAYS_BACK = 365
+DAYS_AHEAD = 90
+DURATIONS = [(30, 0.15), (60, 0.35), (90, 0.20), (120, 0.30)]
+
+TABLES = ('users', 'family_profiles', 'elders', 'provider_profiles', 'services', 'bookings', 'reviews')
+
+def choice(rng, weighted, size):
+    values, weights = zip(*weighted)
+    weights = np.asarray(weights, dtype=float)
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+def popularity(rng, size, exponent, cap_share=None):
+    """Shuffled Zipf-like weights over ``size`` items, optionally capping any item's share"""
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    rng.shuffle(weights)
+    weights /= weights.sum()
+    if cap_share is not None:
+        for _ in range(20):
+            over = weights > cap_share
+            if not over.any():
+                break
+            weights[over] = cap_share
+            weights /= weights.sum()
+    return weights
+
+def next_id(connection, table):
+    return (connection.exec_driver_sql(f'SELECT max(id) FROM {table}').scalar() or 0) + 1
+
+def insert_batches(connection, table, rows, batch_size):
+    """Insert an iterable of row dicts in executemany batches; returns the row count"""
+    from sqlalchemy import insert
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            connection.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        connection.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+def drop_secondary_objects(connection, db):
+    """Drop model indexes and full-text and rollup triggers so the load does not maintain them row by row"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS {index.name}')
+    triggers = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+        "AND (name LIKE 'provider_search_%' OR name LIKE 'booking_rollup_%')"
+    ).scalars().all()
+    for name in triggers:
+        connection.exec_driver_sql(f'DROP TRIGGER {name}')
+
+class Generator:
+    def __init__(self, args, db, models):
+        self.args = args
+        self.db = db
+        self.models = models
+        self.rng = np.random.default_rng(args.seed)
+        self.now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        self.first_day = (self.now - timedelta(days=DAYS_BACK)).replace(hour=8)
+        self.password_hash = None
+
+    def log(self, message):
+        print(f'[{time.perf_counter() - self.started:7.1f}s] {message}', flush=True)
+
+    def users(self, connection, role, count, tag):
+        first_id = next_id(connection, 'users')
+        first = self.rng.integers(len(FIRST_NAMES), size=count)
+        last = self.rng.integers(len(LAST_NAMES), size=count)
+        created = self.now - timedelta(days=DAYS_BACK + 30)
+
+        def rows():
+            for n in range(count):
+                number = first_id + n
+                yield {
+                    'username': f'{tag}_{number}', 'email': f'{tag}_{number}@example.com',
+                    'password_hash': self.password_hash, 'first_name': FIRST_NAMES[first[n]],
+                    'last_name': LAST_NAMES[last[n]], 'phone': f'5{number % 10000000:07d}',
+                    'role': role, 'created_at': created, 'updated_at': created, 'is_active': True
+                }
+        insert_batches(connection, self.models.User, rows(), self.args.batch_size)
+        return np.arange(first_id, first_id + count)
+
+    def families(self, connection, count):
+        """Family users with profiles and one to three elders; returns user ids and elder id ranges"""
+        User, FamilyProfile, Elder = self.models.User, self.models.FamilyProfile, self.models.Elder
+        user_ids = self.users(connection, self.models.UserRole.FAMILY, count, 'family')
+        first_profile = next_id(connection, 'family_profiles')
+        cities = choice(self.rng, DISTRICTS, count)
+        insert_batches(connection, FamilyProfile, ({
+            'user_id': int(user_id), 'city': cities[n], 'state': 'HK', 'address': f'{n % 200 + 1} Main Road',
+            'emergency_contact_name': 'Family Contact', 'emergency_contact_phone': '555-0100', 'created_at': self.now
+        } for n, user_id in enumerate(user_ids)), self.args.batch_size)
+        elder_counts = self.rng.choice([1, 2, 3], size=count, p=[0.75, 0.22, 0.03])
+        first_elder = next_id(connection, 'elders')
+        birth_years = self.rng.integers(1925, 1960, size=int(elder_counts.sum()))
+
+        def elders():
+            number = 0
+            for n in range(count):
+                for _ in range(elder_counts[n]):
+                    yield {
+                        'family_profile_id': first_profile + n, 'first_name': FIRST_NAMES[number % len(FIRST_NAMES)],
+                        'last_name': LAST_NAMES[n % len(LAST_NAMES)],
+                        'date_of_birth': datetime(int(birth_years[number]), 1 + number % 12, 1 + number % 28).date(),
+                        'gender': ('Female', 'Male')[number % 2], 'mobility_level': ('Independent', 'Limited', 'Wheelchair')[number % 3],
+                        'created_at': self.now
+                    }
+                    number += 1
+        insert_batches(connection, Elder, elders(), self.args.batch_size)
+        elder_starts = first_elder + np.concatenate(([0], np.cumsum(elder_counts)[:-1]))
+        return user_ids, elder_starts, elder_counts
+
+    def providers(self, connection, count):
+        ProviderProfile = self.models.ProviderProfile
+        user_ids = self.users(connection, self.models.UserRole.PROVIDER, count, 'provider')
+        first_id = next_id(connection, 'provider_profiles')
+        types = choice(self.rng, PROVIDER_TYPES, count)
+        cities = choice(self.rng, DISTRICTS, count)
+        rates = np.round(np.clip(self.rng.lognormal(np.log(40), 0.35, size=count), 18, 150))
+        verified = self.rng.random(count) < 0.7
+        schedules = [json.dumps(schedule) for schedule in SCHEDULES]
+        schedule_of = self.rng.integers(len(schedules), size=count)
+        specialty_of = self.rng.integers(len(SPECIALTIES), size=(count, 3))
+        certification_of = self.rng.integers(len(CERTIFICATIONS), size=(count, 2))
+
+        def rows():
+            for n in range(count):
+                facility = types[n] in ('FACILITY', 'HOSPITAL')
+                last_name = LAST_NAMES[n % len(LAST_NAMES)]
+                yield {
+                    'user_id': int(user_ids[n]), 'provider_type': self.models.ProviderType[types[n]],
+                    'business_name': f'{cities[n]} {("Care Centre", "Elderly Home")[n % 2]} {n}' if facility
+                    else f'{FIRST_NAMES[n % len(FIRST_NAMES)]} {last_name} Care {n}',
+                    'license_number': f'LIC{first_id + n:08d}',
+                    'certifications': ', '.join(sorted({CERTIFICATIONS[i] for i in certification_of[n]})),
+                    'specialties': ', '.join(sorted({SPECIALTIES[i] for i in specialty_of[n]})),
+                    'description': f'Elder care provider serving {cities[n]} and nearby districts',
+                    'city': cities[n], 'state': 'HK',
+                    'hourly_rate': None if facility else float(rates[n]),
+                    'daily_rate': float(rates[n] * 6) if facility else None,
+                    'is_verified': bool(verified[n]), 'verification_date': self.now if verified[n] else None,
+                    'rating': 0.0, 'total_reviews': 0, 'availability_schedule': schedules[schedule_of[n]],
+                    'created_at': self.now - timedelta(days=DAYS_BACK)
+                }
+        insert_batches(connection, ProviderProfile, rows(), self.args.batch_size)
+        return np.arange(first_id, first_id + count)
+
+    def services(self, connection, provider_ids, count):
+        """At least one service per provider; returns per-provider (first id, count, prices, durations)"""
+        Service = self.models.Service
+        extra = self.rng.multinomial(max(count - len(provider_ids), 0), popularity(self.rng, len(provider_ids), 0.5))
+        counts = 1 + extra
+        total = int(counts.sum())
+        first_id = next_id(connection, 'services')
+        kinds = self.rng.choice(len(SERVICE_TYPES), size=total, p=[kind[1] for kind in SERVICE_TYPES])
+        price_factor = np.clip(self.rng.normal(1.0, 0.2, size=total), 0.5, 2.0)
+        active = self.rng.random(total) < 0.92
+        owners = np.repeat(provider_ids, counts)
+        prices = np.round([SERVICE_TYPES[kind][2] * factor for kind, factor in zip(kinds, price_factor)])
+
+        def rows():
+            for n in range(total):
+                name, _, _, duration = SERVICE_TYPES[kinds[n]]
+                names = SERVICE_NAMES[name]
+                yield {
+                    'provider_id': int(owners[n]), 'service_type': self.models.ServiceType[name],
+                    'name': names[n % len(names)], 'description': f'Professional {names[n % len(names)].lower()} service',
+                    'price': float(prices[n]), 'duration_minutes': duration, 'is_active': bool(active[n]),
+                    'created_at': self.now - timedelta(days=DAYS_BACK)
+                }
+        insert_batches(connection, Service, rows(), self.args.batch_size)
+        starts = first_id + np.concatenate(([0], np.cumsum(counts)[:-1]))
+        return starts, counts, prices
+
+    def bookings_and_reviews(self, connection, provider_ids, services, families, booking_count, review_count):
+        Booking, Review, BookingStatus = self.models.Booking, self.models.Review, self.models.BookingStatus
+        service_starts, service_counts, prices = services
+        family_ids, elder_starts, elder_counts = families
+        slots = (DAYS_BACK + DAYS_AHEAD) * SLOTS_PER_DAY
+        per_provider = self.rng.multinomial(booking_count, popularity(self.rng, len(provider_ids), 0.8, slots / booking_count))
+        per_provider = np.minimum(per_provider, slots)
+        family_weights = popularity(self.rng, len(family_ids), 0.6)
+        first_service = int(service_starts[0])
+        now_slot = (self.now - self.first_day).days * SLOTS_PER_DAY
+        completed_expected = max(1, int(per_provider.sum() * now_slot / slots * 0.8))
+        review_rate = min(1.0, review_count / completed_expected)
+        durations, duration_weights = zip(*DURATIONS)
+        ratings, rating_weights = zip(*RATINGS)
+        state = {'booking_id': next_id(connection, 'bookings'), 'reviews': 0}
+        statuses = {name: getattr(BookingStatus, name) for name in ('PENDING', 'CONFIRMED', 'COMPLETED', 'CANCELLED')}
+
+        def rows(reviews):
+            for n, provider_id in enumerate(provider_ids):
+                count = int(per_provider[n])
+                if not count:
+                    continue
+                slot_numbers = np.sort(self.rng.choice(slots, size=count, replace=False))
+                families_of = self.rng.choice(len(family_ids), size=count, p=family_weights)
+                services_of = service_starts[n] + self.rng.integers(service_counts[n], size=count)
+                minutes = self.rng.choice(durations, size=count, p=duration_weights)
+                offsets = self.rng.choice([0, 15, 30], size=count)
+                draws = self.rng.random(count)
+                for k in range(count):
+                    slot = int(slot_numbers[k])
+                    start = self.first_day + timedelta(days=slot // SLOTS_PER_DAY,
+                                                       hours=SLOT_HOURS * (slot % SLOTS_PER_DAY),
+                                                       minutes=int(offsets[k]) if minutes[k] <= 90 else 0)
+                    if slot < now_slot:
+                        status = statuses['COMPLETED'] if draws[k] < 0.85 else statuses['CANCELLED']
+                    else:
+                        status = statuses['PENDING'] if draws[k] < 0.4 else \
+                            statuses['CONFIRMED'] if draws[k] < 0.9 else statuses['CANCELLED']
+                    family = int(families_of[k])
+                    elder_id = int(elder_starts[family] + k % elder_counts[family])
+                    duration = int(minutes[k])
+                    service_id = int(services_of[k])
+                    booking_id = state['booking_id']
+                    state['booking_id'] += 1
+                    created = start - timedelta(days=int(3 + draws[k] * 20))
+                    yield {
+                        'family_user_id': int(family_ids[family]), 'provider_id': int(provider_id),
+                        'service_id': service_id, 'elder_id': elder_id, 'scheduled_date': start,
+                        'duration_minutes': duration, 'end_time': start + timedelta(minutes=duration),
+                        'status': status, 'total_cost': float(prices[service_id - first_service]) * duration / 60,
+                        'created_at': created, 'updated_at': created
+                    }
+                    if status is statuses['COMPLETED'] and state['reviews'] < review_count \
+                            and draws[k] < 0.85 * review_rate:
+                        state['reviews'] += 1
+                        reviews.append({
+                            'booking_id': booking_id, 'provider_id': int(provider_id),
+                            'family_user_id': int(family_ids[family]),
+                            'rating': int(self.rng.choice(ratings, p=rating_weights)),
+                            'comment': COMMENTS[booking_id % len(COMMENTS)],
+                            'created_at': start + timedelta(minutes=duration, hours=int(1 + draws[k] * 72))
+                        })
+
+        # Bookings and their reviews go in together, batch by batch
+        from sqlalchemy import insert
+        reviews = []
+        batch = []
+        inserted = 0
+        for row in rows(reviews):
+            batch.append(row)
+            if len(batch) >= self.args.batch_size:
+                connection.execute(insert(Booking), batch)
+                inserted += len(batch)
+                batch = []
+                if reviews:
+                    connection.execute(insert(Review), reviews)
+                    reviews.clear()
+                if inserted % (self.args.batch_size * 100) == 0:
+                    self.log(f'{inserted} bookings, {state["reviews"]} reviews')
+        if batch:
+            connection.execute(insert(Booking), batch)
+            inserted += len(batch)
+        if reviews:
+            connection.execute(insert(Review), reviews)
+        return inserted, state['reviews']
+
+    def run(self, engine):
+        from werkzeug.security import generate_password_hash
+        from src.utils import fulltext, rating_aggregates, rollups, schema
+        self.started = time.perf_counter()
+        args = self.args
+        # Every generated account shares one password ('password123'), hashed once
+        self.password_hash = generate_password_hash('password123')
+        families = args.families or max(1, args.bookings // 40)
+
+        with engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA synchronous = OFF')
+            connection.exec_driver_sql('PRAGMA cache_size = -256000')
+            drop_secondary_objects(connection, self.db)
+            connection.commit()
+
+            family_data = self.families(connection, families)
+            connection.commit()
+            self.log(f'{families} families')
+            provider_ids = self.providers(connection, args.providers)
+            connection.commit()
+            self.log(f'{args.providers} providers')
+            services = self.services(connection, provider_ids, args.services)
+            connection.commit()
+            self.log(f'{int(services[1].sum())} services')
+            bookings, reviews = self.bookings_and_reviews(
+                connection, provider_ids, services, family_data, args.bookings, args.reviews
+            )
+            connection.commit()
+            self.log(f'{bookings} bookings, {reviews} reviews')
+
+            added = schema.add_missing_indexes(connection)
+            connection.commit()
+            self.log(f'rebuilt {len(added)} indexes')
+            rating_aggregates.rebuild(connection)
+            fulltext.rebuild(connection)
+            connection.commit()
+            self.log('rebuilt rating aggregates and full-text index')
+            # Recreating the rollup triggers backfills the rollups in the same pass
+            rollups.install(engine)
+            self.log('rebuilt booking rollups')
+            connection.exec_driver_sql('ANALYZE')
+            connection.commit()
+        # Recreate the full-text triggers
+        fulltext.install(engine)
+        with engine.connect() as connection:
+            counts = {table: connection.exec_driver_sql(f'SELECT count(*) FROM {table}').scalar() for table in TABLES}
+        self.log('done: ' + ', '.join(f'{table} {count}' for table, count in counts.items()))
+        return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLite file to fill (default: a new temporary file)')
+    parser.add_argument('--providers', type=int, default=1000)
+    parser.add_argument('--services', type=int, default=10000, help='total services (at least one per provider)')
+    parser.add_argument('--bookings', type=int, default=100000)
+    parser.add_argument('--reviews', type=int, default=20000, help='upper bound; reviews go to completed bookings')
+    parser.add_argument('--families', type=int, help='family users (default: one per 40 bookings)')
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows per executemany')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if not args.database:
+        handle, args.database = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        os.unlink(args.database)
+
+    from src.main import create_app
+    from src.models import care_models
+    from src.utils import schema
+    # Without metrics, the bulk inserts are not timed, logged as slow queries and explained
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.database)}',
+        'METRICS_ENABLED': False
+    })
+    with app.app_context():
+        schema.upgrade(care_models.db.engine)
+        print(f'database: {args.database}')
+        Generator(args, care_models.db, care_models).run(care_models.db.engine)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Concurrency stress test for booking creation and confirmation.
+
+Runs several worker processes, each with several threads, against one local
+SQLite database file. Every thread repeatedly books one provider into a small
+set of overlapping time slots and immediately tries to confirm the booking,
+so confirmations race for the same slots. Afterwards it reports status codes,
+"database is locked" failures and latency percentiles, and checks that no two
+CONFIRMED bookings overlap.
+
+    python scripts/stress_bookings.py --mode production --workers 4 --threads 8
+    python scripts/stress_bookings.py --mode default   # for comparison
+
+Exits non-zero when bookings were double-confirmed or requests failed with 5xx.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_ROOT)
+
+SLOT_DATE = datetime(2031, 3, 3, 8, 0)
+
+def load_app(database, mode):
+    from src.main import create_app
+    return create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'DATABASE_MODE': mode})
+
+def prepare_database(app):
+    from src.models.care_models import db
+    from src.utils import schema
+    from src.utils.seed import seed_sample_data
+    with app.app_context():
+        schema.upgrade(db.engine)
+        seed_sample_data()
+
+def fixture_ids(app):
+    """A family user, one of their elders, and a provider with an active service"""
+    from src.models.care_models import db, User, Elder, FamilyProfile, Service, UserRole
+    with app.app_context():
+        family_user = User.query.filter_by(role=UserRole.FAMILY).order_by(User.id).first()
+        elder = Elder.query.join(FamilyProfile).filter(FamilyProfile.user_id == family_user.id).first()
+        service = Service.query.filter_by(is_active=True).order_by(Service.id).first()
+        ids = {
+            'family_user_id': family_user.id,
+            'elder_id': elder.id,
+            'provider_id': service.provider_id,
+            'service_id': service.id
+        }
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        return ids
+
+def run_thread(client, ids, args, seed, results):
+    rnd = random.Random(seed)
+    for _ in range(args.requests):
+        start = SLOT_DATE + timedelta(minutes=30 * rnd.randrange(args.slots))
+        payload = dict(ids, scheduled_date=start.isoformat(), duration_minutes=rnd.choice([60, 90]))
+        began = time.perf_counter()
+        response = client.post('/api/bookings', json=payload)
+        results.append(('create', response.status_code, time.perf_counter() - began,
+                         response.get_data(as_text=True) if response.status_code >= 500 else None))
+        if response.status_code != 201:
+            continue
+        booking_id = response.get_json()['id']
+        began = time.perf_counter()
+        response = client.put(f'/api/bookings/{booking_id}/status', json={'status': 'confirmed'})
+        results.append(('confirm', response.status_code, time.perf_counter() - began,
+                        response.get_data(as_text=True) if response.status_code >= 500 else None))
+
+def run_worker(worker, args, ids, queue):
+    app = load_app(args.database, args.mode)
+    results = []
+    threads = []
+    for number in range(args.threads):
+        thread = threading.Thread(target=run_thread, args=(
+            app.test_client(), ids, args, worker * 1000 + number, results
+        ))
+        threads.append(thread)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put(results)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def overlapping_confirmations(app, provider_id):
+    from src.models.care_models import Booking, BookingStatus
+    with app.app_context():
+        bookings = Booking.query.filter(
+            Booking.provider_id == provider_id,
+            Booking.status == BookingStatus.CONFIRMED,
+            Booking.scheduled_date >= SLOT_DATE,
+            Booking.scheduled_date < SLOT_DATE + timedelta(days=1)
+        ).order_by(Booking.scheduled_date).all()
+        overlaps = []
+        latest = None
+        for booking in bookings:
+            end = booking.scheduled_date + timedelta(minutes=booking.duration_minutes)
+            if latest is not None and booking.scheduled_date < latest[1]:
+                overlaps.append((latest[0], booking.id))
+            if latest is None or end > latest[1]:
+                latest = (booking.id, end)
+        return len(bookings), overlaps
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLite file to use (default: a new temporary file)')
+    parser.add_argument('--mode', choices=['production', 'default'], default='production')
+    parser.add_argument('--workers', type=int, default=4, help='worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per worker')
+    parser.add_argument('--requests', type=int, default=25, help='bookings attempted per thread')
+    parser.add_argument('--slots', type=int, default=12, help='distinct half-hour start times contested')
+    args = parser.parse_args()
+    if not args.database:
+        handle, args.database = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        os.unlink(args.database)
+
+    # Create and seed the database once before the workers start
+    app = load_app(args.database, args.mode)
+    prepare_database(app)
+    ids = fixture_ids(app)
+
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    began = time.perf_counter()
+    workers = [context.Process(target=run_worker, args=(number, args, ids, queue)) for number in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    results = [result for _ in workers for result in queue.get()]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+
+    codes = Counter((kind, status) for kind, status, _, _ in results)
+    locked = sum(1 for *_, body in results if body and 'locked' in body)
+    server_errors = sum(1 for _, status, _, _ in results if status >= 500)
+    confirmed, overlaps = overlapping_confirmations(app, ids['provider_id'])
+
+    print(f'database: {args.database} ({args.mode} mode)')
+    print(f'{len(results)} requests from {args.workers}x{args.threads} clients in {elapsed:.2f}s '
+          f'({len(results) / elapsed:.0f} req/s)')
+    for (kind, status), count in sorted(codes.items()):
+        print(f'  {kind:<8} {status}: {count}')
+    for kind in ('create', 'confirm'):
+        latencies = [latency * 1000 for name, _, latency, _ in results if name == kind]
+        print(f'  {kind:<8} latency ms: p50 {percentile(latencies, .5):.1f}  '
+              f'p95 {percentile(latencies, .95):.1f}  p99 {percentile(latencies, .99):.1f}')
+    print(f'"database is locked" errors: {locked}')
+    print(f'confirmed bookings: {confirmed}, overlapping confirmed pairs: {len(overlaps)}')
+    if overlaps or server_errors:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
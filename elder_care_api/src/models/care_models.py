@@ -1,8 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import event
+from datetime import datetime, timedelta
 from enum import Enum
+from src.utils.database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class UserRole(Enum):
     FAMILY = "family"
@@ -44,6 +46,8 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    # Unread received messages, maintained by src/utils/unread_counts.py
+    unread_messages = db.Column(db.Integer, default=0, server_default='0')
     
     # Relationships
     family_profile = db.relationship('FamilyProfile', backref='user', uselist=False, cascade='all, delete-orphan')
@@ -68,6 +72,9 @@ class User(db.Model):
 
 class FamilyProfile(db.Model):
     __tablename__ = 'family_profiles'
+    __table_args__ = (
+        db.Index('ix_family_profiles_user_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -95,6 +102,9 @@ class FamilyProfile(db.Model):
 
 class Elder(db.Model):
     __tablename__ = 'elders'
+    __table_args__ = (
+        db.Index('ix_elders_family_profile_id', 'family_profile_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     family_profile_id = db.Column(db.Integer, db.ForeignKey('family_profiles.id'), nullable=False)
@@ -128,6 +138,9 @@ class Elder(db.Model):
 
 class ProviderProfile(db.Model):
     __tablename__ = 'provider_profiles'
+    __table_args__ = (
+        db.Index('ix_provider_profiles_user_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -147,6 +160,13 @@ class ProviderProfile(db.Model):
     verification_date = db.Column(db.DateTime)
     rating = db.Column(db.Float, default=0.0)
     total_reviews = db.Column(db.Integer, default=0)
+    # Review aggregates, maintained by src/utils/rating_aggregates.py
+    rating_sum = db.Column(db.Float, default=0.0, server_default='0')
+    rating_1_count = db.Column(db.Integer, default=0, server_default='0')
+    rating_2_count = db.Column(db.Integer, default=0, server_default='0')
+    rating_3_count = db.Column(db.Integer, default=0, server_default='0')
+    rating_4_count = db.Column(db.Integer, default=0, server_default='0')
+    rating_5_count = db.Column(db.Integer, default=0, server_default='0')
     availability_schedule = db.Column(db.Text)  # JSON string for schedule
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -179,8 +199,21 @@ class ProviderProfile(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+    def rating_histogram(self):
+        return {
+            '1': self.rating_1_count or 0,
+            '2': self.rating_2_count or 0,
+            '3': self.rating_3_count or 0,
+            '4': self.rating_4_count or 0,
+            '5': self.rating_5_count or 0
+        }
+
 class Service(db.Model):
     __tablename__ = 'services'
+    __table_args__ = (
+        # Active services of a provider
+        db.Index('ix_services_provider_active', 'provider_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     provider_id = db.Column(db.Integer, db.ForeignKey('provider_profiles.id'), nullable=False)
@@ -215,16 +248,35 @@ class Booking(db.Model):
     elder_id = db.Column(db.Integer, db.ForeignKey('elders.id'), nullable=False)
     scheduled_date = db.Column(db.DateTime, nullable=False)
     duration_minutes = db.Column(db.Integer, nullable=False)
+    end_time = db.Column(db.DateTime)  # scheduled_date + duration_minutes, kept in sync on flush
     status = db.Column(db.Enum(BookingStatus), default=BookingStatus.PENDING)
     total_cost = db.Column(db.Numeric(10, 2))
     special_instructions = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Overlap checks seek on (provider_id, end_time)
+        db.Index('ix_bookings_provider_end_time', 'provider_id', 'end_time'),
+        # Booking lists filter by one party and/or status and sort by date
+        # (SQLite appends the rowid, which also covers the id tiebreak)
+        db.Index('ix_bookings_provider_scheduled', 'provider_id', 'scheduled_date'),
+        db.Index('ix_bookings_family_scheduled', 'family_user_id', 'scheduled_date'),
+        db.Index('ix_bookings_status_scheduled', 'status', 'scheduled_date'),
+        db.Index('ix_bookings_scheduled_date', 'scheduled_date'),
+        # A provider's most recently changed bookings (dashboard activity)
+        db.Index('ix_bookings_provider_updated', 'provider_id', 'updated_at'),
+    )
+    
     # Relationships
     service = db.relationship('Service', backref='bookings')
     elder = db.relationship('Elder', backref='bookings')
 
+    def compute_end_time(self):
+        if self.scheduled_date is None or self.duration_minutes is None:
+            return None
+        return self.scheduled_date + timedelta(minutes=self.duration_minutes)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -241,8 +293,43 @@ class Booking(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+@event.listens_for(Booking, 'before_insert')
+@event.listens_for(Booking, 'before_update')
+def _set_booking_end_time(mapper, connection, booking):
+    booking.end_time = booking.compute_end_time()
+
+class BookingDailyRollup(db.Model):
+    # Booking totals per provider, day, service type and status, kept in sync
+    # with ``bookings`` by the triggers in ``src/utils/rollups.py``
+    __tablename__ = 'booking_daily_rollups'
+    # Rows stored in key order, so a provider's date range is one contiguous read
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    provider_id = db.Column(db.Integer, db.ForeignKey('provider_profiles.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    service_type = db.Column(db.Enum(ServiceType), primary_key=True)
+    status = db.Column(db.Enum(BookingStatus), primary_key=True)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+class BookingDailyTotal(db.Model):
+    # The same totals across all providers, for platform-wide ranges
+    __tablename__ = 'booking_daily_totals'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    day = db.Column(db.Date, primary_key=True)
+    service_type = db.Column(db.Enum(ServiceType), primary_key=True)
+    status = db.Column(db.Enum(BookingStatus), primary_key=True)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
 class CarePlan(db.Model):
     __tablename__ = 'care_plans'
+    __table_args__ = (
+        db.Index('ix_care_plans_elder_active', 'elder_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     elder_id = db.Column(db.Integer, db.ForeignKey('elders.id'), nullable=False)
@@ -273,6 +360,13 @@ class CarePlan(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # A provider's reviews, newest first
+        db.Index('ix_reviews_provider_created', 'provider_id', 'created_at'),
+        # Review exports over a date range
+        db.Index('ix_reviews_created_at', 'created_at'),
+        db.Index('ix_reviews_booking_id', 'booking_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=False)
@@ -299,6 +393,13 @@ class Review(db.Model):
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        # A user's inbox, newest first
+        db.Index('ix_messages_recipient_created', 'recipient_id', 'created_at'),
+        # Threads between two users, and the sent side of the conversation list
+        db.Index('ix_messages_sender_recipient_created', 'sender_id', 'recipient_id', 'created_at'),
+        db.Index('ix_messages_booking_id', 'booking_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -0,0 +1,127 @@
+from flask import Blueprint, request, jsonify
+from src.models.care_models import db, BookingDailyRollup, BookingDailyTotal, BookingStatus, ProviderProfile, ServiceType
+from src.utils.query_budget import query_budget
+from sqlalchemy import func, select
+from datetime import datetime, timedelta
+
+analytics_bp = Blueprint('analytics', __name__)
+
+# Days covered when no start_date is given
+DEFAULT_ANALYTICS_DAYS = 30
+
+# Buckets one response may hold
+MAX_ANALYTICS_BUCKETS = 1000
+
+# First day of the bucket holding a rollup day, as stored ('YYYY-MM-DD')
+BUCKETS = {
+    'day': lambda day: func.date(day),
+    'week': lambda day: func.date(day, 'weekday 0', '-6 days'),
+    'month': lambda day: func.strftime('%Y-%m-01', day),
+}
+
+@analytics_bp.route('/analytics/bookings', methods=['GET'])
+@query_budget(1)
+def get_booking_analytics():
+    """Get platform-wide booking counts, revenue and hours per day, week or month"""
+    try:
+        return booking_analytics(None)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/analytics/providers/<int:provider_id>/bookings', methods=['GET'])
+@query_budget(2)
+def get_provider_analytics(provider_id):
+    """Get a provider's booking counts, earnings and hours per day, week or month"""
+    try:
+        if db.session.get(ProviderProfile, provider_id) is None:
+            return jsonify({'error': 'Provider not found'}), 404
+        return booking_analytics(provider_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def booking_analytics(provider_id):
+    """Rollup totals per bucket of the requested range, read only from the daily rollups"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in BUCKETS:
+        return jsonify({'error': f'granularity must be one of: {", ".join(BUCKETS)}'}), 400
+    service_type = request.args.get('service_type')
+    if service_type and service_type not in [e.value for e in ServiceType]:
+        return jsonify({'error': 'Invalid service_type'}), 400
+    try:
+        last_day = datetime.fromisoformat(request.args['end_date']).date() \
+            if request.args.get('end_date') else datetime.utcnow().date()
+        first_day = datetime.fromisoformat(request.args['start_date']).date() \
+            if request.args.get('start_date') else last_day - timedelta(days=DEFAULT_ANALYTICS_DAYS - 1)
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use ISO format.'}), 400
+    if last_day < first_day:
+        return jsonify({'error': 'end_date must not be before start_date'}), 400
+    periods = bucket_starts(first_day, last_day, granularity)
+    if len(periods) > MAX_ANALYTICS_BUCKETS:
+        return jsonify({'error': f'Range cannot exceed {MAX_ANALYTICS_BUCKETS} buckets; use a coarser granularity'}), 400
+
+    rollup = BookingDailyRollup if provider_id is not None else BookingDailyTotal
+    bucket = BUCKETS[granularity](rollup.day).label('bucket')
+    query = select(bucket, rollup.status, func.sum(rollup.bookings), func.sum(rollup.minutes), func.sum(rollup.revenue))\
+        .where(rollup.day >= first_day, rollup.day <= last_day)\
+        .group_by(bucket, rollup.status)
+    if provider_id is not None:
+        query = query.where(rollup.provider_id == provider_id)
+    if service_type:
+        query = query.where(rollup.service_type == ServiceType(service_type))
+
+    buckets = {period.isoformat(): empty_totals(period.isoformat()) for period in periods}
+    totals = empty_totals(None)
+    for period, status, count, minutes, revenue in db.session.execute(query):
+        for entry in (buckets[period], totals):
+            add_totals(entry, status, count, minutes, revenue)
+
+    totals.pop('period')
+    return jsonify({
+        'provider_id': provider_id,
+        'service_type': service_type,
+        'granularity': granularity,
+        'start_date': first_day.isoformat(),
+        'end_date': last_day.isoformat(),
+        'buckets': [finish_totals(entry) for entry in buckets.values()],
+        'totals': finish_totals(totals)
+    }), 200
+
+def bucket_starts(first_day, last_day, granularity):
+    """First day of every bucket overlapping ``first_day``..``last_day``"""
+    if granularity == 'week':
+        day, step = first_day - timedelta(days=first_day.weekday()), lambda day: day + timedelta(days=7)
+    elif granularity == 'month':
+        day, step = first_day.replace(day=1), lambda day: (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    else:
+        day, step = first_day, lambda day: day + timedelta(days=1)
+    periods = []
+    while day <= last_day and len(periods) <= MAX_ANALYTICS_BUCKETS:
+        periods.append(day)
+        day = step(day)
+    return periods
+
+def empty_totals(period):
+    return {
+        'period': period,
+        'bookings': 0,
+        'by_status': {status.value: 0 for status in BookingStatus},
+        'cancellations': 0,
+        'revenue': 0.0,
+        'minutes': 0
+    }
+
+def add_totals(entry, status, count, minutes, revenue):
+    """Add one status of a bucket; revenue and hours count completed bookings only"""
+    entry['bookings'] += count
+    entry['by_status'][status.value] += count
+    if status == BookingStatus.CANCELLED:
+        entry['cancellations'] += count
+    elif status == BookingStatus.COMPLETED:
+        entry['revenue'] += float(revenue or 0)
+        entry['minutes'] += minutes or 0
+
+def finish_totals(entry):
+    entry['revenue'] = round(entry['revenue'], 2)
+    entry['hours'] = round(entry.pop('minutes') / 60, 2)
+    return entry
@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from flask import Blueprint, current_app, g, request, jsonify
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from sqlalchemy import event
+from src.models.care_models import db
+from src.utils.database import reads_only
+from src.utils.query_budget import query_budget
+
+batch_bp = Blueprint('batch', __name__)
+
+# Blueprints whose GET endpoints a batch may call
+BATCH_BLUEPRINTS = ('providers', 'bookings')
+
+# Sub-requests one batch may hold
+MAX_BATCH_REQUESTS = 20
+
+# Sub-request headers passed through to the endpoint
+BATCH_REQUEST_HEADERS = ('If-None-Match',)
+
+# Sub-response headers returned with its body
+BATCH_RESPONSE_HEADERS = ('ETag', 'Cache-Control', 'X-Cache')
+
+@batch_bp.route('/batch', methods=['POST'])
+@query_budget(0)  # Each sub-request is checked against its own route's budget
+@reads_only
+def run_batch():
+    """Run several GET requests in one round trip, sharing one app context and database session"""
+    data = request.get_json(silent=True) or {}
+    sub_requests = data.get('requests')
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(sub_requests) > MAX_BATCH_REQUESTS:
+        return jsonify({'error': f'A batch cannot exceed {MAX_BATCH_REQUESTS} requests'}), 400
+
+    for index, sub_request in enumerate(sub_requests):
+        if not isinstance(sub_request, dict) or not isinstance(sub_request.get('path'), str):
+            return jsonify({'error': f'requests[{index}] needs a path'}), 400
+        if not isinstance(sub_request.get('headers', {}), dict):
+            return jsonify({'error': f'requests[{index}].headers must be an object'}), 400
+
+    responses = []
+    with held_objects(db.session()):
+        for index, sub_request in enumerate(sub_requests):
+            status, headers, body = dispatch(sub_request)
+            responses.append({'id': sub_request.get('id', index), 'status': status, 'headers': headers, 'body': body})
+    return jsonify({'responses': responses}), 200
+
+def dispatch(sub_request):
+    """Run one sub-request through the app; returns its status, headers and body"""
+    method = str(sub_request.get('method', 'GET')).upper()
+    if method != 'GET':
+        return 405, {}, {'error': 'Only GET requests can be batched'}
+    path, _, query_string = sub_request['path'].partition('?')
+    try:
+        endpoint, _ = current_app.url_map.bind('').match(path, method=method)
+    except HTTPException as e:
+        return e.code, {}, {'error': e.description}
+    if endpoint.partition('.')[0] not in BATCH_BLUEPRINTS:
+        return 400, {}, {'error': f'{path} cannot be batched'}
+
+    headers = sub_request.get('headers') or {}
+    environ = EnvironBuilder(
+        path=path, query_string=query_string, method=method, base_url=request.host_url,
+        headers={name: headers[name] for name in BATCH_REQUEST_HEADERS if name in headers},
+        environ_base={'REMOTE_ADDR': request.remote_addr} if request.remote_addr else None
+    ).get_environ()
+    try:
+        # The nested request context reuses the batch's app context, so every
+        # sub-request shares ``db.session`` and its identity map
+        with own_globals(), current_app.request_context(environ):
+            response = current_app.full_dispatch_request()
+            if response.is_streamed:
+                response.close()
+                return 400, {}, {'error': f'{path} streams its response and cannot be batched'}
+            if response.status_code == 304:
+                body = None
+            else:
+                body = response.get_json() if response.is_json else response.get_data(as_text=True)
+            return response.status_code, \
+                {name: response.headers[name] for name in BATCH_RESPONSE_HEADERS if name in response.headers}, body
+    except Exception as e:
+        return 500, {}, {'error': str(e)}
+
+@contextmanager
+def own_globals():
+    """Give a sub-request an empty ``g``, restoring the batch request's afterwards
+
+    ``g`` belongs to the app context the sub-requests share; without this a
+    sub-request's hooks (metrics, query budget, database routing) would
+    overwrite or consume the batch request's state.
+    """
+    saved = {name: g.pop(name) for name in list(g)}
+    try:
+        yield
+    finally:
+        for name in list(g):
+            g.pop(name)
+        for name, value in saved.items():
+            setattr(g, name, value)
+
+@contextmanager
+def held_objects(session):
+    """Keep every object ``session`` loads alive until the batch ends
+
+    The identity map only holds weak references, so an object a sub-request
+    loaded would be gone by the next one; held, a later ``get`` or many-to-one
+    load of the same row (the booking's provider, then the provider page) is
+    answered from the identity map without a query.
+    """
+    held = []
+
+    def hold(session, instance):
+        held.append(instance)
+
+    event.listen(session, 'loaded_as_persistent', hold)
+    try:
+        yield
+    finally:
+        event.remove(session, 'loaded_as_persistent', hold)
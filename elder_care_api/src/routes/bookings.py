@@ -1,11 +1,47 @@
 from flask import Blueprint, request, jsonify
 from src.models.care_models import db, Booking, BookingStatus, ProviderProfile, Service, Elder, User
-from datetime import datetime
-import json
+from src.utils.booking_conflicts import find_conflict, find_conflicts, booking_conflict, MAX_BOOKING_MINUTES
+from src.utils.pagination import (
+    normalize_page_args, build_pagination, build_cursor_pagination, decode_cursor, encode_cursor,
+    keyset_before, wants_total, cached_count, filter_key
+)
+from src.utils.projections import booking_list_select, booking_list_item, upcoming_booking_select, upcoming_booking_item
+from src.utils.query_budget import query_budget
+from src.utils import change_feed
+from src.utils.exports import export_response, FORMATS as EXPORT_FORMATS
+from sqlalchemy import func, insert, select
+from datetime import datetime, timedelta
+import operator
 
 bookings_bp = Blueprint('bookings', __name__)
 
+# Statuses whose time slot is checked for overlaps when it changes
+ACTIVE_STATUSES = (BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS)
+
+# Most occurrences a single bulk request may create
+MAX_BULK_OCCURRENCES = 366
+
+# Furthest a recurrence may run past its first occurrence
+MAX_RECURRENCE_DAYS = 2 * 366
+
+BULK_MODES = ('all_or_nothing', 'best_effort')
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# Date range arguments shared by the list and export endpoints
+DATE_FILTERS = (
+    ('start_date', Booking.scheduled_date, operator.ge),
+    ('end_date', Booking.scheduled_date, operator.le),
+)
+
+def conflict_response(existing_booking):
+    return jsonify({
+        'error': 'Provider is not available at the requested time',
+        'conflicting_booking_id': existing_booking.id
+    }), 409
+
 @bookings_bp.route('/bookings', methods=['POST'])
+@query_budget(10)
 def create_booking():
     """Create a new booking"""
     try:
@@ -44,20 +80,21 @@ def create_booking():
         except ValueError:
             return jsonify({'error': 'Invalid scheduled_date format. Use ISO format.'}), 400
         
-        # Check for scheduling conflicts
-        existing_booking = Booking.query.filter(
-            Booking.provider_id == data['provider_id'],
-            Booking.scheduled_date == scheduled_date,
-            Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS])
-        ).first()
+        try:
+            duration_minutes = positive_minutes(data['duration_minutes'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Check for scheduling conflicts with any overlapping booking
+        existing_booking = find_conflict(data['provider_id'], scheduled_date, duration_minutes)
         
         if existing_booking:
-            return jsonify({'error': 'Provider is not available at the requested time'}), 409
+            return conflict_response(existing_booking)
         
         # Calculate total cost
         total_cost = 0
         if service.price:
-            total_cost = service.price * (data['duration_minutes'] / 60)  # Assuming hourly pricing
+            total_cost = float(service.price) * (duration_minutes / 60)  # Assuming hourly pricing
         
         # Create the booking
         booking = Booking(
@@ -66,7 +103,7 @@ def create_booking():
             service_id=data['service_id'],
             elder_id=data['elder_id'],
             scheduled_date=scheduled_date,
-            duration_minutes=data['duration_minutes'],
+            duration_minutes=duration_minutes,
             total_cost=total_cost,
             special_instructions=data.get('special_instructions', ''),
             status=BookingStatus.PENDING
@@ -87,7 +124,135 @@ def create_booking():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bookings_bp.route('/bookings/bulk', methods=['POST'])
+@query_budget(8)
+def create_bulk_bookings():
+    """Create a series of bookings from a recurrence rule or a list of occurrences"""
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        required_fields = ['family_user_id', 'provider_id', 'service_id', 'elder_id', 'duration_minutes']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        mode = data.get('mode', 'all_or_nothing')
+        if mode not in BULK_MODES:
+            return jsonify({'error': f'Invalid mode. Must be one of: {", ".join(BULK_MODES)}'}), 400
+        
+        # Expand the occurrences: (scheduled_date, duration_minutes) pairs
+        try:
+            if 'recurrence' in data:
+                occurrences = expand_recurrence(data['recurrence'], data['duration_minutes'])
+            elif 'occurrences' in data:
+                occurrences = parse_occurrences(data['occurrences'], data['duration_minutes'])
+            else:
+                return jsonify({'error': 'Either recurrence or occurrences is required'}), 400
+        except (ValueError, TypeError, AttributeError) as e:
+            return jsonify({'error': str(e)}), 400
+        if not occurrences:
+            return jsonify({'error': 'No occurrences to book'}), 400
+        
+        # Validate that the entities exist, once for the whole series
+        family_user = User.query.get(data['family_user_id'])
+        if not family_user:
+            return jsonify({'error': 'Family user not found'}), 404
+        
+        provider = ProviderProfile.query.get(data['provider_id'])
+        if not provider:
+            return jsonify({'error': 'Provider not found'}), 404
+        
+        service = Service.query.get(data['service_id'])
+        if not service or not service.is_active:
+            return jsonify({'error': 'Service not found or inactive'}), 404
+        
+        elder = Elder.query.get(data['elder_id'])
+        if not elder:
+            return jsonify({'error': 'Elder not found'}), 404
+        
+        if service.provider_id != data['provider_id']:
+            return jsonify({'error': 'Service does not belong to the specified provider'}), 400
+        
+        # Check every occurrence against existing bookings with one query, and
+        # against the earlier occurrences of the same series
+        intervals = [(start, start + timedelta(minutes=duration)) for start, duration in occurrences]
+        existing_conflicts = find_conflicts(data['provider_id'], intervals)
+        conflicts = []
+        accepted = []
+        for index, ((start, end), existing_booking) in enumerate(zip(intervals, existing_conflicts)):
+            conflict = {'index': index, 'scheduled_date': start.isoformat()}
+            if existing_booking:
+                conflict['conflicting_booking_id'] = existing_booking.id
+                conflicts.append(conflict)
+                continue
+            overlapping = next((other for other in accepted
+                                if other[1] < end and start < other[2]), None)
+            if overlapping:
+                conflict['conflicting_occurrence'] = overlapping[0]
+                conflicts.append(conflict)
+                continue
+            accepted.append((index, start, end))
+        
+        if conflicts and mode == 'all_or_nothing':
+            return jsonify({
+                'error': 'Provider is not available for every requested occurrence',
+                'mode': mode,
+                'requested': len(occurrences),
+                'created': [],
+                'conflicts': conflicts
+            }), 409
+        
+        # Insert the accepted occurrences in one statement and commit once
+        now = datetime.utcnow()
+        rows = []
+        for index, start, end in accepted:
+            duration = occurrences[index][1]
+            total_cost = 0
+            if service.price:
+                total_cost = float(service.price) * (duration / 60)  # Assuming hourly pricing
+            rows.append({
+                'family_user_id': data['family_user_id'],
+                'provider_id': data['provider_id'],
+                'service_id': data['service_id'],
+                'elder_id': data['elder_id'],
+                'scheduled_date': start,
+                'duration_minutes': duration,
+                'end_time': end,
+                'total_cost': total_cost,
+                'special_instructions': data.get('special_instructions', ''),
+                'status': BookingStatus.PENDING,
+                'created_at': now,
+                'updated_at': now
+            })
+        bookings = []
+        if rows:
+            # One multi-row INSERT ... RETURNING. SQLite does not promise to
+            # return rows in VALUES order, so match them up by start time
+            # (accepted occurrences never overlap, so it is unique)
+            booking_ids = dict(db.session.execute(
+                insert(Booking).returning(Booking.scheduled_date, Booking.id), rows
+            ).all())
+            bookings = [Booking(id=booking_ids[row['scheduled_date']], **row) for row in rows]
+            # Bulk inserts bypass the ORM flush; tell in-process indexes and caches
+            change_feed.mark_changed(db.session, 'booking', *(
+                (booking.id, booking.provider_id, booking.family_user_id) for booking in bookings
+            ))
+        db.session.commit()
+        
+        return jsonify({
+            'mode': mode,
+            'requested': len(occurrences),
+            'created': [booking.to_dict() for booking in bookings],
+            'conflicts': conflicts
+        }), 201 if bookings else 409
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @bookings_bp.route('/bookings/<int:booking_id>', methods=['GET'])
+@query_budget(6)
 def get_booking(booking_id):
     """Get detailed booking information"""
     try:
@@ -106,6 +271,7 @@ def get_booking(booking_id):
         return jsonify({'error': str(e)}), 500
 
 @bookings_bp.route('/bookings/<int:booking_id>', methods=['PUT'])
+@query_budget(6)
 def update_booking(booking_id):
     """Update booking details"""
     try:
@@ -127,12 +293,25 @@ def update_booking(booking_id):
                         booking.status = BookingStatus(data[field])
                     except ValueError:
                         return jsonify({'error': 'Invalid status value'}), 400
+                elif field == 'duration_minutes':
+                    try:
+                        booking.duration_minutes = positive_minutes(data[field])
+                    except ValueError as e:
+                        return jsonify({'error': str(e)}), 400
                 else:
                     setattr(booking, field, data[field])
         
+        # Rescheduled or (re)activated bookings must not overlap another booking
+        if any(field in data for field in ('scheduled_date', 'duration_minutes', 'status')) \
+                and booking.status in ACTIVE_STATUSES:
+            existing_booking = booking_conflict(booking)
+            if existing_booking:
+                db.session.rollback()
+                return conflict_response(existing_booking)
+        
         # Recalculate total cost if duration changed
         if 'duration_minutes' in data and booking.service.price:
-            booking.total_cost = booking.service.price * (booking.duration_minutes / 60)
+            booking.total_cost = float(booking.service.price) * (booking.duration_minutes / 60)
         
         booking.updated_at = datetime.utcnow()
         db.session.commit()
@@ -144,6 +323,7 @@ def update_booking(booking_id):
         return jsonify({'error': str(e)}), 500
 
 @bookings_bp.route('/bookings/<int:booking_id>/status', methods=['PUT'])
+@query_budget(4)
 def update_booking_status(booking_id):
     """Update booking status"""
     try:
@@ -170,6 +350,12 @@ def update_booking_status(booking_id):
         if new_status not in valid_transitions.get(booking.status, []):
             return jsonify({'error': f'Invalid status transition from {booking.status.value} to {new_status.value}'}), 400
         
+        # A booking can only be confirmed while its time slot is still free
+        if booking.status == BookingStatus.PENDING and new_status == BookingStatus.CONFIRMED:
+            existing_booking = booking_conflict(booking)
+            if existing_booking:
+                return conflict_response(existing_booking)
+        
         booking.status = new_status
         booking.updated_at = datetime.utcnow()
         
@@ -187,92 +373,90 @@ def update_booking_status(booking_id):
         return jsonify({'error': str(e)}), 500
 
 @bookings_bp.route('/bookings', methods=['GET'])
+@query_budget(3)
 def get_bookings():
     """Get bookings with filtering options"""
     try:
         # Get query parameters
-        family_user_id = request.args.get('family_user_id', type=int)
-        provider_id = request.args.get('provider_id', type=int)
-        status = request.args.get('status')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        # Build query
-        query = Booking.query
-        
-        if family_user_id:
-            query = query.filter(Booking.family_user_id == family_user_id)
-        
-        if provider_id:
-            query = query.filter(Booking.provider_id == provider_id)
-        
-        if status:
-            try:
-                status_enum = BookingStatus(status)
-                query = query.filter(Booking.status == status_enum)
-            except ValueError:
-                return jsonify({'error': 'Invalid status value'}), 400
-        
-        if start_date:
-            try:
-                start_date_obj = datetime.fromisoformat(start_date)
-                query = query.filter(Booking.scheduled_date >= start_date_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid start_date format'}), 400
-        
-        if end_date:
-            try:
-                end_date_obj = datetime.fromisoformat(end_date)
-                query = query.filter(Booking.scheduled_date <= end_date_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid end_date format'}), 400
-        
-        # Order by scheduled date
-        query = query.order_by(Booking.scheduled_date.desc())
-        
-        # Execute query with pagination
-        bookings = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        result = []
-        for booking in bookings.items:
-            booking_data = booking.to_dict()
-            booking_data['service'] = booking.service.to_dict()
-            booking_data['provider'] = {
-                'id': booking.provider.id,
-                'business_name': booking.provider.business_name,
-                'provider_type': booking.provider.provider_type.value,
-                'rating': booking.provider.rating,
-                'is_verified': booking.provider.is_verified
-            }
-            booking_data['elder'] = {
-                'id': booking.elder.id,
-                'first_name': booking.elder.first_name,
-                'last_name': booking.elder.last_name
-            }
-            result.append(booking_data)
+        # Build filters
+        try:
+            filters = booking_filters(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Keyset pagination on (scheduled_date, id) when a cursor is given
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            page, per_page = normalize_page_args(1, per_page)
+            query = booking_list_select().where(*filters)
+            if cursor:
+                try:
+                    after = decode_cursor(cursor, (datetime, int))
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                query = query.where(keyset_before((Booking.scheduled_date, Booking.id), after))
+            rows = db.session.execute(
+                query.order_by(Booking.scheduled_date.desc(), Booking.id.desc()).limit(per_page + 1)
+            ).all()
+            result = [booking_list_item(row) for row in rows[:per_page]]
+            next_cursor = None
+            if len(rows) > per_page:
+                next_cursor = encode_cursor(result[-1]['scheduled_date'], result[-1]['id'])
+            total = None
+            if wants_total():
+                total = cached_count(('bookings', filter_key()), lambda: db.session.execute(
+                    select(func.count()).select_from(Booking).where(*filters)
+                ).scalar())
+            return jsonify({
+                'bookings': result,
+                'pagination': build_cursor_pagination(per_page, next_cursor, total)
+            }), 200
+        
+        # Count matches, then fetch one page of projected rows ordered by scheduled date
+        page, per_page = normalize_page_args(page, per_page)
+        total = db.session.execute(
+            select(func.count()).select_from(Booking).where(*filters)
+        ).scalar()
+        query = booking_list_select().where(*filters)\
+            .order_by(Booking.scheduled_date.desc(), Booking.id.desc())\
+            .limit(per_page).offset((page - 1) * per_page)
+        
+        result = [booking_list_item(row) for row in db.session.execute(query)]
         
         return jsonify({
             'bookings': result,
-            'pagination': {
-                'page': bookings.page,
-                'pages': bookings.pages,
-                'per_page': bookings.per_page,
-                'total': bookings.total,
-                'has_next': bookings.has_next,
-                'has_prev': bookings.has_prev
-            }
+            'pagination': build_pagination(page, per_page, total)
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bookings_bp.route('/bookings/export', methods=['GET'])
+@query_budget(1)
+def export_bookings():
+    """Stream every booking matching the list filters as NDJSON or CSV"""
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Invalid format. Must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+        try:
+            filters = booking_filters(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Oldest first, in the (scheduled_date, id) order of the booking indexes
+        query = booking_list_select().where(*filters)\
+            .order_by(Booking.scheduled_date, Booking.id)
+        return export_response(query, booking_list_item, export_format, 'bookings')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bookings_bp.route('/bookings/<int:booking_id>', methods=['DELETE'])
+@query_budget(3)
 def cancel_booking(booking_id):
     """Cancel a booking"""
     try:
@@ -294,6 +478,7 @@ def cancel_booking(booking_id):
         return jsonify({'error': str(e)}), 500
 
 @bookings_bp.route('/bookings/upcoming', methods=['GET'])
+@query_budget(1)
 def get_upcoming_bookings():
     """Get upcoming bookings for a user"""
     try:
@@ -306,46 +491,135 @@ def get_upcoming_bookings():
         current_time = datetime.utcnow()
         
         if user_type == 'family':
-            query = Booking.query.filter(
-                Booking.family_user_id == user_id,
-                Booking.scheduled_date > current_time,
-                Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING])
-            )
+            user_filter = Booking.family_user_id == user_id
         elif user_type == 'provider':
-            query = Booking.query.filter(
-                Booking.provider_id == user_id,
-                Booking.scheduled_date > current_time,
-                Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING])
-            )
+            # user_id is the provider's user account, not the provider profile
+            user_filter = Booking.provider_id == select(ProviderProfile.id)\
+                .where(ProviderProfile.user_id == user_id).scalar_subquery()
         else:
             return jsonify({'error': 'Invalid user_type. Must be "family" or "provider"'}), 400
         
-        bookings = query.order_by(Booking.scheduled_date.asc()).limit(10).all()
-        
-        result = []
-        for booking in bookings:
-            booking_data = booking.to_dict()
-            booking_data['service'] = booking.service.to_dict()
-            if user_type == 'family':
-                booking_data['provider'] = {
-                    'id': booking.provider.id,
-                    'business_name': booking.provider.business_name,
-                    'provider_type': booking.provider.provider_type.value
-                }
-            else:
-                booking_data['family_user'] = {
-                    'id': booking.family_user.id,
-                    'first_name': booking.family_user.first_name,
-                    'last_name': booking.family_user.last_name
-                }
-            booking_data['elder'] = {
-                'id': booking.elder.id,
-                'first_name': booking.elder.first_name,
-                'last_name': booking.elder.last_name
-            }
-            result.append(booking_data)
+        query = upcoming_booking_select(user_type).where(
+            user_filter,
+            Booking.scheduled_date > current_time,
+            Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING])
+        ).order_by(Booking.scheduled_date.asc()).limit(10)
+        
+        result = [upcoming_booking_item(row, user_type) for row in db.session.execute(query)]
         
         return jsonify({'upcoming_bookings': result}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+def parse_occurrences(occurrences, duration_minutes):
+    """Parse a list of ISO datetimes or ``{scheduled_date, duration_minutes}`` objects"""
+    if not isinstance(occurrences, list):
+        raise ValueError('occurrences must be a list')
+    if len(occurrences) > MAX_BULK_OCCURRENCES:
+        raise ValueError(f'At most {MAX_BULK_OCCURRENCES} occurrences can be booked at once')
+    result = []
+    for occurrence in occurrences:
+        if isinstance(occurrence, dict):
+            scheduled_date = occurrence.get('scheduled_date')
+            duration = occurrence.get('duration_minutes', duration_minutes)
+        else:
+            scheduled_date, duration = occurrence, duration_minutes
+        try:
+            scheduled_date = datetime.fromisoformat(scheduled_date)
+        except (ValueError, TypeError):
+            raise ValueError('Invalid scheduled_date format. Use ISO format.')
+        result.append((scheduled_date, positive_minutes(duration)))
+    return result
+
+def expand_recurrence(rule, duration_minutes):
+    """Expand a recurrence rule into ``(scheduled_date, duration_minutes)`` pairs
+
+    ``rule`` has ``start`` (ISO datetime of the first occurrence), ``frequency``
+    (``daily`` or ``weekly``), an optional ``interval`` (every n days/weeks),
+    ``days`` (weekday names, weekly only; defaults to the start's weekday) and
+    either ``until`` (last date, inclusive) or ``count``.
+    """
+    try:
+        start = datetime.fromisoformat(rule['start'])
+    except (KeyError, ValueError, TypeError):
+        raise ValueError('recurrence.start is required in ISO format')
+    frequency = rule.get('frequency', 'weekly')
+    if frequency not in ('daily', 'weekly'):
+        raise ValueError('recurrence.frequency must be "daily" or "weekly"')
+    interval = int(rule.get('interval', 1))
+    if not 1 <= interval <= MAX_RECURRENCE_DAYS:
+        raise ValueError(f'recurrence.interval must be between 1 and {MAX_RECURRENCE_DAYS}')
+    count = int(rule['count']) if rule.get('count') is not None else None
+    until = datetime.fromisoformat(rule['until']).date() if rule.get('until') else None
+    if count is None and until is None:
+        raise ValueError('recurrence needs either count or until')
+    if count is not None and count > MAX_BULK_OCCURRENCES:
+        raise ValueError(f'At most {MAX_BULK_OCCURRENCES} occurrences can be booked at once')
+    first_day = start.date()
+    span_error = ValueError(f'A recurrence cannot run more than {MAX_RECURRENCE_DAYS} days past its start')
+    last_day = first_day + timedelta(days=MAX_RECURRENCE_DAYS)
+    if until is not None:
+        if until > last_day:
+            raise span_error
+        last_day = until
+    
+    if frequency == 'weekly':
+        days = rule.get('days') or [WEEKDAYS[start.weekday()]]
+        try:
+            weekdays = sorted({WEEKDAYS.index(day.lower()) for day in days})
+        except ValueError:
+            raise ValueError(f'recurrence.days must be weekday names: {", ".join(WEEKDAYS)}')
+    else:
+        weekdays = None
+    duration = positive_minutes(duration_minutes)
+    
+    # Step a period (``interval`` days, or ``interval`` weeks) at a time
+    occurrences = []
+    period_start = first_day if weekdays is None else first_day - timedelta(days=first_day.weekday())
+    step = timedelta(days=interval) if weekdays is None else timedelta(weeks=interval)
+    while period_start <= last_day and (count is None or len(occurrences) < count):
+        for day in [period_start] if weekdays is None else [period_start + timedelta(days=n) for n in weekdays]:
+            if day < first_day or day > last_day or len(occurrences) == count:
+                continue
+            if len(occurrences) == MAX_BULK_OCCURRENCES:
+                raise ValueError(f'At most {MAX_BULK_OCCURRENCES} occurrences can be booked at once')
+            occurrences.append((datetime.combine(day, start.time()), duration))
+        period_start += step
+    if count is not None and len(occurrences) < count and until is None:
+        raise span_error
+    return occurrences
+
+def positive_minutes(value):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 < value <= MAX_BOOKING_MINUTES:
+        raise ValueError(f'duration_minutes must be a positive integer of at most {MAX_BOOKING_MINUTES}')
+    return value
+
+def booking_filters(args):
+    """Filters for the booking list and export endpoints; raises ``ValueError`` on bad input"""
+    filters = []
+    
+    family_user_id = args.get('family_user_id', type=int)
+    if family_user_id:
+        filters.append(Booking.family_user_id == family_user_id)
+    
+    provider_id = args.get('provider_id', type=int)
+    if provider_id:
+        filters.append(Booking.provider_id == provider_id)
+    
+    status = args.get('status')
+    if status:
+        try:
+            filters.append(Booking.status == BookingStatus(status))
+        except ValueError:
+            raise ValueError('Invalid status value')
+    
+    for name, column, operator in DATE_FILTERS:
+        if args.get(name):
+            try:
+                value = datetime.fromisoformat(args[name])
+            except ValueError:
+                raise ValueError(f'Invalid {name} format')
+            filters.append(operator(column, value))
+    
+    return filters
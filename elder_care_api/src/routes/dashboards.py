@@ -0,0 +1,154 @@
+from flask import Blueprint, jsonify
+from src.models.care_models import db, Booking, BookingStatus, CarePlan, Elder, FamilyProfile, ProviderProfile, Review, User, UserRole
+from src.utils.cache import TTLCache
+from src.utils.projections import (
+    CARE_PLAN_SUMMARY, ELDER_SUMMARY, PERSON_SUMMARY, PROVIDER_SUMMARY,
+    booking_list_select, booking_list_item, upcoming_booking_select, upcoming_booking_item,
+    review_list_select, review_list_item
+)
+from src.utils.query_budget import query_budget
+from src.utils.response_cache import (
+    response_cache, provider_scope, provider_bookings_scope, user_scope, CATALOG, USERS
+)
+from sqlalchemy import and_, func, select
+from datetime import datetime
+
+dashboards_bp = Blueprint('dashboards', __name__)
+
+# Items in each list of a dashboard
+DASHBOARD_LIST_SIZE = 5
+
+# Seconds a cached dashboard is served for; upcoming bookings move with the clock
+DASHBOARD_MAX_AGE = 60
+
+UPCOMING_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.PENDING)
+
+# Provider profile ids of the provider users whose dashboards were built most
+# recently, for their cache scopes
+_provider_ids = TTLCache(maxsize=4096, ttl=None)
+
+def provider_dashboard_scopes(user_id):
+    provider_id = _provider_ids.get(user_id)
+    if provider_id is None:
+        # Not known yet: the first response is built but not reused, as
+        # later requests compute a different set of versions
+        return (user_scope(user_id), USERS)
+    return (user_scope(user_id), USERS, provider_scope(provider_id), provider_bookings_scope(provider_id))
+
+@dashboards_bp.route('/dashboard/family/<int:user_id>', methods=['GET'])
+@query_budget(5)
+@response_cache.cached(lambda user_id: (user_scope(user_id), USERS, CATALOG), max_age=DASHBOARD_MAX_AGE)
+def get_family_dashboard(user_id):
+    """Get everything the family dashboard shows in one response"""
+    try:
+        user = db.session.execute(
+            select(*PERSON_SUMMARY.columns('user'), User.unread_messages)
+            .where(User.id == user_id, User.role == UserRole.FAMILY)
+        ).first()
+        if user is None:
+            return jsonify({'error': 'Family user not found'}), 404
+
+        # Elders with their active care plans, in one joined query
+        elders = {}
+        rows = db.session.execute(
+            select(*ELDER_SUMMARY.columns('elder'), *CARE_PLAN_SUMMARY.columns('care_plan'))
+            .select_from(Elder)
+            .join(FamilyProfile, FamilyProfile.id == Elder.family_profile_id)
+            .outerjoin(CarePlan, and_(CarePlan.elder_id == Elder.id, CarePlan.is_active == True))
+            .where(FamilyProfile.user_id == user_id)
+            .order_by(Elder.id, CarePlan.id)
+        )
+        for row in rows:
+            elder_id = row._mapping['elder__id']
+            if elder_id not in elders:
+                elders[elder_id] = dict(ELDER_SUMMARY.to_dict(row, 'elder'), active_care_plans=[])
+            if row._mapping['care_plan__id'] is not None:
+                elders[elder_id]['active_care_plans'].append(CARE_PLAN_SUMMARY.to_dict(row, 'care_plan'))
+
+        upcoming = db.session.execute(
+            upcoming_booking_select('family').where(
+                Booking.family_user_id == user_id,
+                Booking.scheduled_date > datetime.utcnow(),
+                Booking.status.in_(UPCOMING_STATUSES)
+            ).order_by(Booking.scheduled_date.asc()).limit(DASHBOARD_LIST_SIZE)
+        )
+
+        return jsonify({
+            'user': PERSON_SUMMARY.to_dict(user, 'user'),
+            'unread_messages': user.unread_messages or 0,
+            'elders': list(elders.values()),
+            'upcoming_bookings': [upcoming_booking_item(row, 'family') for row in upcoming],
+            'recent_activity': recent_activity(Booking.family_user_id == user_id),
+            'stats': booking_stats(Booking.family_user_id == user_id, 'total_spent')
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@dashboards_bp.route('/dashboard/provider/<int:user_id>', methods=['GET'])
+@query_budget(5)
+@response_cache.cached(provider_dashboard_scopes, max_age=DASHBOARD_MAX_AGE)
+def get_provider_dashboard(user_id):
+    """Get everything the provider dashboard shows in one response"""
+    try:
+        profile = db.session.execute(
+            select(*PROVIDER_SUMMARY.columns('provider'), ProviderProfile.total_reviews, User.unread_messages)
+            .join(User, User.id == ProviderProfile.user_id)
+            .where(ProviderProfile.user_id == user_id)
+        ).first()
+        if profile is None:
+            return jsonify({'error': 'Provider not found'}), 404
+        provider = PROVIDER_SUMMARY.to_dict(profile, 'provider')
+        provider['total_reviews'] = profile.total_reviews or 0
+        provider_id = provider['id']
+        _provider_ids.set(user_id, provider_id)
+
+        upcoming = db.session.execute(
+            upcoming_booking_select('provider').where(
+                Booking.provider_id == provider_id,
+                Booking.scheduled_date > datetime.utcnow(),
+                Booking.status.in_(UPCOMING_STATUSES)
+            ).order_by(Booking.scheduled_date.asc()).limit(DASHBOARD_LIST_SIZE)
+        )
+        reviews = db.session.execute(
+            review_list_select().where(Review.provider_id == provider_id)
+            .order_by(Review.created_at.desc(), Review.id.desc()).limit(DASHBOARD_LIST_SIZE)
+        )
+
+        return jsonify({
+            'provider': provider,
+            'unread_messages': profile.unread_messages or 0,
+            'upcoming_bookings': [upcoming_booking_item(row, 'provider') for row in upcoming],
+            'recent_activity': recent_activity(Booking.provider_id == provider_id),
+            'recent_reviews': [review_list_item(row) for row in reviews],
+            'stats': booking_stats(Booking.provider_id == provider_id, 'revenue')
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def recent_activity(party_filter):
+    """The most recently created or changed bookings of one party"""
+    query = booking_list_select().where(party_filter)\
+        .order_by(Booking.updated_at.desc(), Booking.id.desc()).limit(DASHBOARD_LIST_SIZE)
+    return [booking_list_item(row) for row in db.session.execute(query)]
+
+def booking_stats(party_filter, amount_name):
+    """Booking counts per status and the amount of completed bookings, in one grouped query"""
+    rows = db.session.execute(
+        select(Booking.status, func.count(), func.sum(Booking.total_cost))
+        .where(party_filter).group_by(Booking.status)
+    ).all()
+    by_status = {status.value: 0 for status in BookingStatus}
+    amount = 0.0
+    for status, count, total in rows:
+        if status is None:
+            continue
+        by_status[status.value] = count
+        if status == BookingStatus.COMPLETED:
+            amount = float(total or 0)
+    return {
+        'total_bookings': sum(count for _, count, _ in rows),
+        'bookings_by_status': by_status,
+        amount_name: round(amount, 2)
+    }
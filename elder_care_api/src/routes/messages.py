@@ -0,0 +1,373 @@
+from flask import Blueprint, current_app, request, jsonify, stream_with_context
+from src.models.care_models import db, Booking, Message, ProviderProfile, User
+from src.utils.pagination import normalize_page_args, build_cursor_pagination, decode_cursor, encode_cursor, keyset_before
+from src.utils.projections import MESSAGE, PERSON_SUMMARY, message_list_select, message_list_item
+from src.utils.query_budget import query_budget
+from src.utils.message_bus import message_bus, message_item, publish_after_commit
+from src.utils import change_feed, unread_counts
+from sqlalchemy import and_, case, func, or_, select, update
+from datetime import datetime
+import time
+
+messages_bp = Blueprint('messages', __name__)
+
+# Most message ids a single mark-as-read request may name
+MAX_READ_IDS = 500
+
+# Seconds between keep-alive comments on an idle stream
+STREAM_HEARTBEAT_SECONDS = 15
+
+# Reconnection delay suggested to EventSource clients
+STREAM_RETRY_MS = 3000
+
+# Most missed messages a reconnecting stream replays
+STREAM_REPLAY_LIMIT = 200
+
+# Streams one process serves at once (``MESSAGE_STREAM_LIMIT``); each holds a
+# worker thread while it is connected
+DEFAULT_STREAM_LIMIT = 8
+
+# Seconds a stream stays open before the client is sent away to reconnect
+# (``MESSAGE_STREAM_MAX_SECONDS``), so idle tabs give their thread back
+DEFAULT_STREAM_MAX_SECONDS = 300
+
+@messages_bp.route('/messages', methods=['POST'])
+@query_budget(4)
+def send_message():
+    """Send a message to another user"""
+    try:
+        data = request.get_json()
+
+        # Validate required fields
+        required_fields = ['sender_id', 'recipient_id', 'content']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        if not str(data['content']).strip():
+            return jsonify({'error': 'content must not be empty'}), 400
+
+        # Validate that both users exist, in one query
+        users = {user.id: user for user in User.query.filter(User.id.in_([data['sender_id'], data['recipient_id']]))}
+        if data['sender_id'] not in users:
+            return jsonify({'error': 'Sender not found'}), 404
+        if data['recipient_id'] not in users:
+            return jsonify({'error': 'Recipient not found'}), 404
+
+        # A message about a booking must be between its family and its provider
+        booking_id = data.get('booking_id')
+        if booking_id is not None:
+            participants = db.session.execute(
+                select(Booking.family_user_id, ProviderProfile.user_id)
+                .join(ProviderProfile, ProviderProfile.id == Booking.provider_id)
+                .where(Booking.id == booking_id)
+            ).first()
+            if participants is None:
+                return jsonify({'error': 'Booking not found'}), 404
+            if not {data['sender_id'], data['recipient_id']} <= set(participants):
+                return jsonify({'error': 'Sender and recipient must be the family and provider of the booking'}), 400
+
+        message = Message(
+            sender_id=data['sender_id'],
+            recipient_id=data['recipient_id'],
+            booking_id=booking_id,
+            subject=data.get('subject'),
+            content=data['content'],
+            is_read=False
+        )
+
+        db.session.add(message)
+        # Build the response from the flushed row; committing expires it
+        db.session.flush()
+        message_data = message_item(message, users[data['sender_id']])
+        db.session.commit()
+
+        return jsonify(message_data), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@messages_bp.route('/messages', methods=['GET'])
+@query_budget(1)
+def get_messages():
+    """Get the messages a user received, newest first"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+
+        filters = [Message.recipient_id == user_id]
+        if request.args.get('unread_only', '').lower() == 'true':
+            filters.append(Message.is_read.is_not(True))
+        booking_id = request.args.get('booking_id', type=int)
+        if booking_id:
+            filters.append(Message.booking_id == booking_id)
+
+        return keyset_page(filters)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@messages_bp.route('/messages/conversations', methods=['GET'])
+@query_budget(1)
+def get_conversations():
+    """Get a user's conversations, the one with the latest message first"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+        _, per_page = normalize_page_args(1, request.args.get('per_page', 20, type=int))
+
+        # One row per counterpart: latest message id, message and unread counts.
+        # Ids grow with time, so the latest message has the highest id
+        counterpart = case((Message.sender_id == user_id, Message.recipient_id), else_=Message.sender_id)
+        last_message_id = func.max(Message.id)
+        unread = and_(Message.recipient_id == user_id, Message.is_read.is_not(True))
+        conversations = select(
+            counterpart.label('user_id'),
+            last_message_id.label('last_message_id'),
+            func.count().label('message_count'),
+            func.sum(case((unread, 1), else_=0)).label('unread_count')
+        ).where(or_(Message.sender_id == user_id, Message.recipient_id == user_id)).group_by(counterpart)
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                after, = decode_cursor(cursor, (int,))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            conversations = conversations.having(last_message_id < after)
+        conversations = conversations.order_by(last_message_id.desc()).limit(per_page + 1).subquery()
+
+        query = select(
+            conversations.c.message_count, conversations.c.unread_count,
+            *PERSON_SUMMARY.columns('user'), *MESSAGE.columns('message')
+        ).select_from(conversations)\
+            .join(User, User.id == conversations.c.user_id)\
+            .join(Message, Message.id == conversations.c.last_message_id)\
+            .order_by(conversations.c.last_message_id.desc())
+        rows = db.session.execute(query).all()
+
+        result = [{
+            'user': PERSON_SUMMARY.to_dict(row, 'user'),
+            'last_message': MESSAGE.to_dict(row, 'message'),
+            'message_count': row.message_count,
+            'unread_count': row.unread_count
+        } for row in rows[:per_page]]
+        next_cursor = None
+        if len(rows) > per_page:
+            next_cursor = encode_cursor(result[-1]['last_message']['id'])
+
+        return jsonify({
+            'conversations': result,
+            'pagination': build_cursor_pagination(per_page, next_cursor)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@messages_bp.route('/messages/conversations/<int:other_user_id>', methods=['GET'])
+@query_budget(1)
+def get_conversation(other_user_id):
+    """Get the messages between a user and another user, newest first"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+
+        filters = [or_(
+            and_(Message.sender_id == user_id, Message.recipient_id == other_user_id),
+            and_(Message.sender_id == other_user_id, Message.recipient_id == user_id)
+        )]
+        booking_id = request.args.get('booking_id', type=int)
+        if booking_id:
+            filters.append(Message.booking_id == booking_id)
+
+        return keyset_page(filters)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@messages_bp.route('/messages/unread-count', methods=['GET'])
+@query_budget(1)
+def get_unread_count():
+    """Get the number of unread messages of a user"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+
+        # Maintained on the user row, see src/utils/unread_counts.py
+        unread = db.session.execute(select(User.unread_messages).where(User.id == user_id)).first()
+        if unread is None:
+            return jsonify({'error': 'User not found'}), 404
+
+        return jsonify({'user_id': user_id, 'unread_count': unread[0] or 0}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@messages_bp.route('/messages/read', methods=['POST'])
+@query_budget(3)
+def mark_messages_read():
+    """Mark a user's received messages as read: given ids, a conversation, or all"""
+    try:
+        data = request.get_json()
+
+        if 'user_id' not in data:
+            return jsonify({'error': 'Missing required field: user_id'}), 400
+        user_id = data['user_id']
+
+        filters = [Message.recipient_id == user_id, Message.is_read.is_not(True)]
+        if 'message_ids' in data:
+            message_ids = data['message_ids']
+            if not isinstance(message_ids, list) or not message_ids:
+                return jsonify({'error': 'message_ids must be a non-empty list'}), 400
+            if len(message_ids) > MAX_READ_IDS:
+                return jsonify({'error': f'At most {MAX_READ_IDS} message ids per request'}), 400
+            filters.append(Message.id.in_(message_ids))
+        if 'with_user_id' in data:
+            filters.append(Message.sender_id == data['with_user_id'])
+        if 'booking_id' in data:
+            filters.append(Message.booking_id == data['booking_id'])
+
+        # One UPDATE for every matching message, then the same change to the unread count
+        read_ids = db.session.execute(
+            update(Message).where(*filters).values(is_read=True).returning(Message.id),
+            execution_options={'synchronize_session': False}
+        ).scalars().all()
+        if read_ids:
+            unread_counts.apply_deltas(db.session.connection(), {user_id: -len(read_ids)})
+            # Core UPDATE: tell the caches the flush did not see it
+            change_feed.mark_changed(db.session, 'message', user_id)
+        unread = db.session.execute(select(User.unread_messages).where(User.id == user_id)).scalar()
+        if read_ids:
+            # Let the user's other open streams update their badges
+            publish_after_commit(db.session, user_id, ('read', None, {
+                'message_ids': sorted(read_ids), 'unread_count': unread
+            }))
+        db.session.commit()
+
+        return jsonify({'updated': len(read_ids), 'unread_count': unread or 0}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@messages_bp.route('/messages/stream', methods=['GET'])
+@query_budget(1)
+def message_stream():
+    """Server-Sent Events stream of the messages a user receives"""
+    subscription = None
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+
+        # EventSource sends Last-Event-ID when it reconnects
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        if last_event_id:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+        else:
+            last_event_id = None
+
+        # Subscribe before reading the missed messages, so none falls in between
+        subscription = message_bus.subscribe(
+            user_id, limit=current_app.config.get('MESSAGE_STREAM_LIMIT', DEFAULT_STREAM_LIMIT)
+        )
+        if subscription is None:
+            return jsonify({'error': 'Too many open message streams; try again shortly'}), 503, \
+                {'Retry-After': str(STREAM_RETRY_MS // 1000)}
+        missed = []
+        if last_event_id is not None:
+            missed = [message_list_item(row) for row in db.session.execute(
+                message_list_select()
+                .where(Message.recipient_id == user_id, Message.id > last_event_id)
+                .order_by(Message.id).limit(STREAM_REPLAY_LIMIT)
+            )]
+            resume_id = last_event_id
+        else:
+            # Where the client resumes from after the stream ends
+            resume_id = db.session.execute(
+                select(func.coalesce(func.max(Message.id), 0)).where(Message.recipient_id == user_id)
+            ).scalar()
+        # New messages come from the bus; release the connection (and its snapshot) for the stream's lifetime
+        db.session.close()
+
+        max_seconds = current_app.config.get('MESSAGE_STREAM_MAX_SECONDS', DEFAULT_STREAM_MAX_SECONDS)
+        response = current_app.response_class(
+            stream_with_context(stream_events(subscription, missed, last_event_id, resume_id, max_seconds)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        response.call_on_close(lambda: message_bus.unsubscribe(subscription))
+        return response
+
+    except Exception as e:
+        if subscription is not None:
+            message_bus.unsubscribe(subscription)
+        return jsonify({'error': str(e)}), 500
+
+def keyset_page(filters):
+    """One page of messages matching ``filters``, newest first, with keyset pagination on (created_at, id)"""
+    _, per_page = normalize_page_args(1, request.args.get('per_page', 20, type=int))
+    query = message_list_select().where(*filters)
+    cursor = request.args.get('cursor')
+    if cursor:
+        after = decode_cursor(cursor, (datetime, int))
+        query = query.where(keyset_before((Message.created_at, Message.id), after))
+    rows = db.session.execute(
+        query.order_by(Message.created_at.desc(), Message.id.desc()).limit(per_page + 1)
+    ).all()
+    result = [message_list_item(row) for row in rows[:per_page]]
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor(result[-1]['created_at'], result[-1]['id'])
+    return jsonify({
+        'messages': result,
+        'pagination': build_cursor_pagination(per_page, next_cursor)
+    }), 200
+
+def stream_events(subscription, missed, last_event_id, resume_id, max_seconds):
+    """Server-Sent Events: missed messages, then events from the bus until the client goes away
+
+    After ``max_seconds`` the stream ends with the id the client resumes from;
+    EventSource reconnects on its own and replays what it missed meanwhile.
+    """
+    dumps = current_app.json.dumps
+    deadline = time.monotonic() + max_seconds
+    yield f'retry: {STREAM_RETRY_MS}\n\n'
+    for item in missed:
+        last_event_id = resume_id = item['id']
+        yield sse_event('message', item['id'], dumps(item))
+    while not subscription.dropped:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # Sets Last-Event-ID for the reconnect without dispatching an event
+            yield f'id: {resume_id}\n\n'
+            return
+        event = subscription.get(min(STREAM_HEARTBEAT_SECONDS, remaining))
+        if event is None:
+            # Keeps proxies from closing an idle connection, and finds out when the client is gone
+            yield ': keep-alive\n\n'
+            continue
+        name, event_id, data = event
+        if event_id is not None and last_event_id is not None and event_id <= last_event_id:
+            # Already sent as a missed message
+            continue
+        if event_id is not None:
+            resume_id = max(resume_id, event_id)
+        yield sse_event(name, event_id, dumps(data))
+
+def sse_event(name, event_id, data):
+    lines = [f'event: {name}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
@@ -1,12 +1,42 @@
 from flask import Blueprint, request, jsonify
-from src.models.care_models import db, ProviderProfile, Service, Review, User, ServiceType, ProviderType
-from sqlalchemy import and_, or_
-from datetime import datetime
-import json
+from src.models.care_models import db, ProviderProfile, Review, Booking, ServiceType, ProviderType
+from src.utils import fulltext
+from src.utils.availability import parse_schedule, parse_windows, free_slots
+from src.utils.availability_index import free_slot_index
+from src.utils.booking_conflicts import blocking_statuses
+from src.utils.database import reads_only
+from src.utils.geo import parse_near, parse_radius
+from src.utils.exports import export_response, FORMATS as EXPORT_FORMATS
+from src.utils.json_provider import stream_json
+from src.utils.pagination import (
+    normalize_page_args, build_pagination, build_cursor_pagination, decode_cursor, encode_cursor,
+    keyset_before, wants_total, cached_count
+)
+from src.utils.projections import provider_cards, review_list_select, review_list_item
+from src.utils.query_budget import query_budget
+from src.utils.provider_index import provider_index, bits_from_flags
+from src.utils.response_cache import response_cache, provider_scope, CATALOG, USERS
+from src.utils.scoring import candidate_distances, score_candidates, top_k
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+import numpy as np
+import math
+import operator
 
 providers_bp = Blueprint('providers', __name__)
 
+# Longest date range served by the availability endpoint
+MAX_AVAILABILITY_DAYS = 366
+
+# Search results above this many providers are streamed in batches
+STREAM_MIN_RESULTS = 500
+STREAM_BATCH_SIZE = 200
+
 @providers_bp.route('/providers', methods=['GET'])
+@query_budget(5)
+@response_cache.cached(lambda: (CATALOG, USERS))
 def get_providers():
     """Get all providers with optional filtering"""
     try:
@@ -17,78 +47,112 @@ def get_providers():
         state = request.args.get('state')
         min_rating = request.args.get('min_rating', type=float)
         verified_only = request.args.get('verified_only', type=bool, default=False)
+        q = request.args.get('q')
+        near = request.args.get('near')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        # Build query
-        query = ProviderProfile.query.join(User).filter(User.is_active == True)
-        
-        if provider_type:
-            query = query.filter(ProviderProfile.provider_type == ProviderType(provider_type))
-        
-        if city:
-            query = query.filter(ProviderProfile.city.ilike(f'%{city}%'))
-            
-        if state:
-            query = query.filter(ProviderProfile.state.ilike(f'%{state}%'))
-            
-        if min_rating:
-            query = query.filter(ProviderProfile.rating >= min_rating)
-            
-        if verified_only:
-            query = query.filter(ProviderProfile.is_verified == True)
-        
-        if service_type:
-            query = query.join(Service).filter(
-                and_(
-                    Service.service_type == ServiceType(service_type),
-                    Service.is_active == True
-                )
+        # Radius search around a ZIP code, district or "lat,lng"
+        near_point = None
+        try:
+            if near:
+                near_point = parse_near(near)
+            radius_km = parse_radius(request.args.get('radius_km'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Free-text query, ranked by BM25
+        ranked_ids = fulltext.search(db.session, q) if q else None
+        
+        # One consistent view of the catalog index for the filters, order and facets
+        with provider_index.snapshot():
+            # Answer the filters from the in-process catalog index
+            matches = provider_index.search(
+                provider_type=ProviderType(provider_type) if provider_type else None,
+                service_types=[ServiceType(service_type)] if service_type else None,
+                city=city,
+                state=state,
+                min_rating=min_rating or None,
+                verified_only=verified_only,
+                provider_ids=ranked_ids,
+                near=near_point,
+                radius_km=radius_km
             )
         
-        # Execute query with pagination
-        providers = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        result = []
-        for provider in providers.items:
-            provider_data = provider.to_dict()
-            # Add user information
-            provider_data['user'] = provider.user.to_dict()
-            # Add services
-            provider_data['services'] = [service.to_dict() for service in provider.services if service.is_active]
-            result.append(provider_data)
+            # Order by distance for radius searches, BM25 rank for text searches, id otherwise;
+            # sort_keys holds the ascending sort key of each provider for keyset paging
+            distances = {}
+            if near_point:
+                columns = provider_index.columns()
+                slots = matches.slot_array()
+                slot_distances = candidate_distances(columns, slots, near_point)
+                slot_ids = columns['id'][slots]
+                order = np.lexsort((slot_ids, slot_distances))
+                provider_ids = slot_ids[order].tolist()
+                distances = dict(zip(provider_ids, slot_distances[order].tolist()))
+                sort_keys = [(distances[provider_id], provider_id) for provider_id in provider_ids]
+            elif q:
+                provider_ids = matches.ordered(ranked_ids)
+                sort_keys = [(position, provider_id) for position, provider_id in enumerate(provider_ids)]
+            else:
+                provider_ids = matches.ids()
+                sort_keys = [(provider_id,) for provider_id in provider_ids]
+            facets = matches.facets()
+        
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            # Keyset pagination: continue after the sort key held in the cursor
+            page, per_page = normalize_page_args(1, per_page)
+            start = 0
+            if cursor:
+                try:
+                    start = bisect_right(sort_keys, tuple(decode_cursor(cursor)))
+                except (ValueError, TypeError):
+                    return jsonify({'error': 'Invalid cursor'}), 400
+            page_ids = provider_ids[start:start + per_page]
+            next_cursor = None
+            if start + per_page < len(provider_ids):
+                next_cursor = encode_cursor(*sort_keys[start + per_page - 1])
+            pagination = build_cursor_pagination(
+                per_page, next_cursor, len(provider_ids) if wants_total() else None
+            )
+        else:
+            # Paginate over the matching ids
+            page, per_page = normalize_page_args(page, per_page)
+            page_ids = provider_ids[(page - 1) * per_page:page * per_page]
+            pagination = build_pagination(page, per_page, len(provider_ids))
+        
+        # Provider, user and active services for the page, built from projected rows
+        result = provider_cards(page_ids)
+        for provider_data in result:
+            if provider_data['id'] in distances:
+                provider_data['distance_km'] = round(distances[provider_data['id']], 2)
         
         return jsonify({
             'providers': result,
-            'pagination': {
-                'page': providers.page,
-                'pages': providers.pages,
-                'per_page': providers.per_page,
-                'total': providers.total,
-                'has_next': providers.has_next,
-                'has_prev': providers.has_prev
-            }
+            'pagination': pagination,
+            'facets': facets
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @providers_bp.route('/providers/<int:provider_id>', methods=['GET'])
+@query_budget(4)
+@response_cache.cached(lambda provider_id: (provider_scope(provider_id), USERS))
 def get_provider(provider_id):
     """Get detailed provider information"""
     try:
         provider = ProviderProfile.query.get_or_404(provider_id)
         
         provider_data = provider.to_dict()
+        provider_data['rating_histogram'] = provider.rating_histogram()
         provider_data['user'] = provider.user.to_dict()
         provider_data['services'] = [service.to_dict() for service in provider.services if service.is_active]
         
-        # Get recent reviews
+        # Get recent reviews, with their authors in the same query
         recent_reviews = Review.query.filter_by(provider_id=provider_id)\
+            .options(joinedload(Review.family_user))\
             .order_by(Review.created_at.desc())\
             .limit(10)\
             .all()
@@ -108,6 +172,8 @@ def get_provider(provider_id):
         return jsonify({'error': str(e)}), 500
 
 @providers_bp.route('/providers/search', methods=['POST'])
+@query_budget(5)
+@reads_only
 def search_providers():
     """Advanced provider search with multiple criteria"""
     try:
@@ -119,67 +185,131 @@ def search_providers():
         availability = data.get('availability', {})
         budget_range = data.get('budget_range', {})
         preferences = data.get('preferences', {})
-        
-        # Build base query
-        query = ProviderProfile.query.join(User).filter(User.is_active == True)
-        
-        # Location filtering
-        if location.get('city'):
-            query = query.filter(ProviderProfile.city.ilike(f"%{location['city']}%"))
-        if location.get('state'):
-            query = query.filter(ProviderProfile.state.ilike(f"%{location['state']}%"))
-        if location.get('zip_code'):
-            query = query.filter(ProviderProfile.zip_code == location['zip_code'])
-        
-        # Service filtering
+        q = data.get('q') or request.args.get('q')
+        
+        # Page requested with limit/offset (all results when no limit is given)
+        try:
+            limit = data.get('limit', request.args.get('limit'))
+            limit = non_negative_int(limit, 'limit') if limit is not None else None
+            offset = non_negative_int(data.get('offset', request.args.get('offset')) or 0, 'offset')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Budget and rating bounds, given as JSON numbers or numeric strings
+        try:
+            min_hourly = optional_number(budget_range.get('min_hourly'), 'budget_range.min_hourly')
+            max_hourly = optional_number(budget_range.get('max_hourly'), 'budget_range.max_hourly')
+            min_rating = optional_number(preferences.get('min_rating'), 'preferences.min_rating')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Radius search around a ZIP code, district or {lat, lng}
+        near_point = None
+        try:
+            if location.get('near'):
+                near_point = parse_near(location['near'])
+            radius_km = parse_radius(location.get('radius_km'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Requested availability windows: {date|day, start_time, end_time} or {windows: [...]}
+        try:
+            windows = parse_windows(availability)
+        except (ValueError, TypeError, AttributeError) as e:
+            return jsonify({'error': f'Invalid availability: {e}'}), 400
+        flexible = bool(availability.get('flexible')) if isinstance(availability, dict) else False
+        
+        # Free-text query, ranked by BM25
+        ranked_ids = fulltext.search(db.session, q) if q else None
+        
+        # Service filtering (unknown service types never match)
+        service_types = None
         if services_needed:
             service_types = [ServiceType(service) for service in services_needed if service in [e.value for e in ServiceType]]
-            query = query.join(Service).filter(
-                and_(
-                    Service.service_type.in_(service_types),
-                    Service.is_active == True
-                )
-            )
         
-        # Budget filtering
-        if budget_range.get('min_hourly'):
-            query = query.filter(ProviderProfile.hourly_rate >= budget_range['min_hourly'])
-        if budget_range.get('max_hourly'):
-            query = query.filter(ProviderProfile.hourly_rate <= budget_range['max_hourly'])
-        
-        # Preferences filtering
-        if preferences.get('verified_only'):
-            query = query.filter(ProviderProfile.is_verified == True)
-        if preferences.get('min_rating'):
-            query = query.filter(ProviderProfile.rating >= preferences['min_rating'])
-        
-        # Execute query
-        providers = query.distinct().all()
-        
-        result = []
-        for provider in providers:
-            provider_data = provider.to_dict()
-            provider_data['user'] = provider.user.to_dict()
-            provider_data['services'] = [service.to_dict() for service in provider.services if service.is_active]
-            
-            # Calculate match score (simple implementation)
-            match_score = calculate_match_score(provider, data)
-            provider_data['match_score'] = match_score
+        end = offset + limit if limit is not None else None
+        
+        # One consistent view of the catalog and free-slot indexes: slot numbers
+        # in ``matches`` must not be reassigned by a rebuild before they are scored
+        with provider_index.snapshot():
+            # Answer location, service, budget and preference filters from the catalog index
+            matches = provider_index.search(
+                service_types=service_types,
+                city=location.get('city'),
+                state=location.get('state'),
+                zip_code=location.get('zip_code'),
+                min_hourly=min_hourly or None,
+                max_hourly=max_hourly or None,
+                verified_only=preferences.get('verified_only'),
+                min_rating=min_rating or None,
+                provider_ids=ranked_ids,
+                near=near_point,
+                radius_km=radius_km
+            )
             
-            result.append(provider_data)
+            # Score candidates in one vectorized pass and keep only the requested page
+            columns = provider_index.columns()
+            ratios = None
+            if windows:
+                # Share of the requested time each provider has free; unless the
+                # search is flexible, only providers free for all of it match
+                ratios = free_slot_index.window_ratios(windows)
+                if not flexible:
+                    matches = matches.restrict(bits_from_flags(ratios >= 1))
+            if q:
+                # Free-text searches keep their BM25 order
+                ranked = matches.ordered(ranked_ids)
+                total_found = len(ranked)
+                page_slots = provider_index.slots_for(ranked[offset:end])
+                page_distances = candidate_distances(columns, page_slots, near_point) if near_point else None
+                page_ratios = ratios[page_slots] if ratios is not None else None
+                page_scores = score_candidates(columns, page_slots, data, page_distances, page_ratios)
+            else:
+                slots = matches.slot_array()
+                total_found = len(slots)
+                slot_distances = candidate_distances(columns, slots, near_point) if near_point else None
+                slot_ratios = ratios[slots] if ratios is not None else None
+                scores = score_candidates(columns, slots, data, slot_distances, slot_ratios)
+                best = top_k(scores, columns['id'][slots], total_found if end is None else min(end, total_found))
+                page_slots = slots[best[offset:]]
+                page_scores = scores[best[offset:]]
+                page_distances = slot_distances[best[offset:]] if near_point else None
+                page_ratios = slot_ratios[best[offset:]] if ratios is not None else None
+            page_ids = columns['id'][page_slots].tolist()
+            match_scores = dict(zip(page_ids, page_scores.tolist()))
+            distances = dict(zip(page_ids, page_distances.tolist())) if near_point else {}
+            availability_ratios = dict(zip(page_ids, page_ratios.tolist())) if ratios is not None else {}
+            facets = matches.facets()
+        
+        def cards(provider_ids):
+            for provider_data in provider_cards(provider_ids):
+                provider_data['match_score'] = match_scores[provider_data['id']]
+                if provider_data['id'] in distances:
+                    provider_data['distance_km'] = round(distances[provider_data['id']], 2)
+                if provider_data['id'] in availability_ratios:
+                    provider_data['availability_ratio'] = round(availability_ratios[provider_data['id']], 2)
+                yield provider_data
+        
+        envelope = {
+            'total_found': total_found,
+            'offset': offset,
+            'limit': limit,
+            'facets': facets
+        }
         
-        # Sort by match score
-        result.sort(key=lambda x: x['match_score'], reverse=True)
+        # Wide searches are streamed, loading and encoding the cards a batch at a time
+        if len(page_ids) > STREAM_MIN_RESULTS:
+            batches = (page_ids[start:start + STREAM_BATCH_SIZE]
+                       for start in range(0, len(page_ids), STREAM_BATCH_SIZE))
+            return stream_json((card for batch in batches for card in cards(batch)), envelope, 'providers')
         
-        return jsonify({
-            'providers': result,
-            'total_found': len(result)
-        }), 200
+        return jsonify(dict(envelope, providers=list(cards(page_ids)))), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @providers_bp.route('/providers/<int:provider_id>/availability', methods=['GET'])
+@query_budget(3)
 def get_provider_availability(provider_id):
     """Get provider availability for a specific date range"""
     try:
@@ -191,36 +321,33 @@ def get_provider_availability(provider_id):
         if not start_date or not end_date:
             return jsonify({'error': 'start_date and end_date are required'}), 400
         
-        # Parse availability schedule (assuming JSON format)
-        availability_schedule = {}
-        if provider.availability_schedule:
-            try:
-                availability_schedule = json.loads(provider.availability_schedule)
-            except json.JSONDecodeError:
-                availability_schedule = {}
+        try:
+            first_day = datetime.fromisoformat(start_date).date()
+            last_day = datetime.fromisoformat(end_date).date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use ISO format.'}), 400
+        if (last_day - first_day).days > MAX_AVAILABILITY_DAYS:
+            return jsonify({'error': f'Date range cannot exceed {MAX_AVAILABILITY_DAYS} days'}), 400
+        
+        # Parsed schedule bitmaps, cached per schedule text
+        schedule = parse_schedule(provider.availability_schedule)
         
-        # Get existing bookings for the date range
-        from src.models.care_models import Booking, BookingStatus
+        # Bookings overlapping the requested days
+        range_start = datetime.combine(first_day, time())
+        range_end = datetime.combine(last_day + timedelta(days=1), time())
         existing_bookings = Booking.query.filter(
-            and_(
-                Booking.provider_id == provider_id,
-                Booking.scheduled_date >= datetime.fromisoformat(start_date),
-                Booking.scheduled_date <= datetime.fromisoformat(end_date),
-                Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS])
-            )
-        ).all()
+            Booking.provider_id == provider_id,
+            Booking.end_time > range_start,
+            Booking.scheduled_date < range_end,
+            Booking.status.in_(blocking_statuses())
+        ).order_by(Booking.scheduled_date).all()
         
         # Calculate available time slots
-        available_slots = calculate_available_slots(
-            availability_schedule, 
-            existing_bookings, 
-            start_date, 
-            end_date
-        )
+        available_slots = calculate_available_slots(schedule, existing_bookings, first_day, last_day)
         
         return jsonify({
             'provider_id': provider_id,
-            'availability_schedule': availability_schedule,
+            'availability_schedule': schedule.source,
             'existing_bookings': [booking.to_dict() for booking in existing_bookings],
             'available_slots': available_slots
         }), 200
@@ -229,116 +356,125 @@ def get_provider_availability(provider_id):
         return jsonify({'error': str(e)}), 500
 
 @providers_bp.route('/providers/<int:provider_id>/reviews', methods=['GET'])
+@query_budget(2)
+@response_cache.cached(lambda provider_id: (provider_scope(provider_id), USERS))
 def get_provider_reviews(provider_id):
     """Get all reviews for a provider"""
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        reviews = Review.query.filter_by(provider_id=provider_id)\
-            .order_by(Review.created_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
-        
-        result = []
-        for review in reviews.items:
-            review_data = review.to_dict()
-            review_data['family_user'] = {
-                'first_name': review.family_user.first_name,
-                'last_name': review.family_user.last_name[0] + '.'  # Privacy protection
-            }
-            result.append(review_data)
+        # Keyset pagination on (created_at, id) when a cursor is given
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            page, per_page = normalize_page_args(1, per_page)
+            query = review_list_select().where(Review.provider_id == provider_id)
+            if cursor:
+                try:
+                    after = decode_cursor(cursor, (datetime, int))
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                query = query.where(keyset_before((Review.created_at, Review.id), after))
+            rows = db.session.execute(
+                query.order_by(Review.created_at.desc(), Review.id.desc()).limit(per_page + 1)
+            ).all()
+            result = [review_list_item(row) for row in rows[:per_page]]
+            next_cursor = None
+            if len(rows) > per_page:
+                next_cursor = encode_cursor(result[-1]['created_at'], result[-1]['id'])
+            total = None
+            if wants_total():
+                total = cached_count(('reviews', provider_id), lambda: db.session.execute(
+                    select(func.count()).select_from(Review).where(Review.provider_id == provider_id)
+                ).scalar())
+            return jsonify({
+                'reviews': result,
+                'pagination': build_cursor_pagination(per_page, next_cursor, total)
+            }), 200
+        
+        page, per_page = normalize_page_args(page, per_page)
+        total = db.session.execute(
+            select(func.count()).select_from(Review).where(Review.provider_id == provider_id)
+        ).scalar()
+        query = review_list_select().where(Review.provider_id == provider_id)\
+            .order_by(Review.created_at.desc(), Review.id.desc())\
+            .limit(per_page).offset((page - 1) * per_page)
+        
+        result = [review_list_item(row) for row in db.session.execute(query)]
         
         return jsonify({
             'reviews': result,
-            'pagination': {
-                'page': reviews.page,
-                'pages': reviews.pages,
-                'per_page': reviews.per_page,
-                'total': reviews.total,
-                'has_next': reviews.has_next,
-                'has_prev': reviews.has_prev
-            }
+            'pagination': build_pagination(page, per_page, total)
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def calculate_match_score(provider, search_criteria):
-    """Calculate a match score for a provider based on search criteria"""
-    score = 0
-    
-    # Base score for verified providers
-    if provider.is_verified:
-        score += 20
-    
-    # Rating score (0-25 points)
-    score += (provider.rating / 5.0) * 25
-    
-    # Service match score
-    services_needed = search_criteria.get('services', [])
-    if services_needed:
-        provider_services = [service.service_type.value for service in provider.services if service.is_active]
-        matching_services = set(services_needed) & set(provider_services)
-        service_match_ratio = len(matching_services) / len(services_needed)
-        score += service_match_ratio * 30
-    
-    # Budget compatibility score
-    budget_range = search_criteria.get('budget_range', {})
-    if budget_range.get('max_hourly') and provider.hourly_rate:
-        if provider.hourly_rate <= budget_range['max_hourly']:
-            score += 15
-    
-    # Review count bonus
-    if provider.total_reviews > 10:
-        score += 10
-    elif provider.total_reviews > 5:
-        score += 5
-    
-    return min(score, 100)  # Cap at 100
+@providers_bp.route('/reviews/export', methods=['GET'])
+@query_budget(1)
+def export_reviews():
+    """Stream reviews as NDJSON or CSV, optionally by provider, family user, rating and date range"""
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Invalid format. Must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+        
+        filters = []
+        provider_id = request.args.get('provider_id', type=int)
+        if provider_id:
+            filters.append(Review.provider_id == provider_id)
+        family_user_id = request.args.get('family_user_id', type=int)
+        if family_user_id:
+            filters.append(Review.family_user_id == family_user_id)
+        min_rating = request.args.get('min_rating', type=int)
+        if min_rating:
+            filters.append(Review.rating >= min_rating)
+        max_rating = request.args.get('max_rating', type=int)
+        if max_rating:
+            filters.append(Review.rating <= max_rating)
+        
+        # Date range on when the review was written
+        for name, compare in (('start_date', operator.ge), ('end_date', operator.le)):
+            if request.args.get(name):
+                try:
+                    filters.append(compare(Review.created_at, datetime.fromisoformat(request.args[name])))
+                except ValueError:
+                    return jsonify({'error': f'Invalid {name} format'}), 400
+        
+        query = review_list_select().where(*filters).order_by(Review.created_at, Review.id)
+        return export_response(query, review_list_item, export_format, 'reviews')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def non_negative_int(value, name):
+    """Parse a whole-number argument given as a JSON number or a string; raises ``ValueError``"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'{name} must be a non-negative integer')
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a non-negative integer')
+    if number < 0:
+        raise ValueError(f'{name} must be a non-negative integer')
+    return number
 
-def calculate_available_slots(availability_schedule, existing_bookings, start_date, end_date):
-    """Calculate available time slots for a provider"""
-    # This is a simplified implementation
-    # In a real application, this would be more sophisticated
-    
-    available_slots = []
-    
-    # Default availability if no schedule is set
-    if not availability_schedule:
-        availability_schedule = {
-            'monday': {'start': '09:00', 'end': '17:00'},
-            'tuesday': {'start': '09:00', 'end': '17:00'},
-            'wednesday': {'start': '09:00', 'end': '17:00'},
-            'thursday': {'start': '09:00', 'end': '17:00'},
-            'friday': {'start': '09:00', 'end': '17:00'},
-            'saturday': {'start': '10:00', 'end': '16:00'},
-            'sunday': {'start': '10:00', 'end': '16:00'}
-        }
-    
-    # Generate sample available slots
-    from datetime import datetime, timedelta
-    current_date = datetime.fromisoformat(start_date)
-    end_date_obj = datetime.fromisoformat(end_date)
-    
-    while current_date <= end_date_obj:
-        day_name = current_date.strftime('%A').lower()
-        if day_name in availability_schedule:
-            day_schedule = availability_schedule[day_name]
-            # Add morning slot
-            available_slots.append({
-                'date': current_date.date().isoformat(),
-                'start_time': day_schedule.get('start', '09:00'),
-                'end_time': '12:00',
-                'available': True
-            })
-            # Add afternoon slot
-            available_slots.append({
-                'date': current_date.date().isoformat(),
-                'start_time': '13:00',
-                'end_time': day_schedule.get('end', '17:00'),
-                'available': True
-            })
-        
-        current_date += timedelta(days=1)
-    
-    return available_slots
+def optional_number(value, name):
+    """Parse a numeric criterion given as a JSON number or a string; None when not given. Raises ``ValueError``"""
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a number')
+    if isinstance(value, bool) or not math.isfinite(number):
+        raise ValueError(f'{name} must be a number')
+    return number
+
+def calculate_available_slots(schedule, existing_bookings, first_day, last_day):
+    """Calculate available time slots for a provider
+
+    ``schedule`` is a parsed ``WeeklySchedule``; slots are the schedule's
+    working hours on each date minus the time taken by ``existing_bookings``.
+    """
+    return free_slots(schedule, existing_bookings, first_day, last_day)
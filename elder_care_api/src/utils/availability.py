@@ -0,0 +1,207 @@
+import json
+from datetime import date, datetime, time, timedelta
+from src.utils.cache import TTLCache
+
+# Weekly availability as bitmaps of 15-minute slots.
+#
+# A provider's ``availability_schedule`` JSON is parsed once into a
+# ``WeeklySchedule``: seven 96-bit masks (bit ``n`` set when the provider
+# works ``[n*15, n*15+15)`` minutes after midnight) plus masks for specific
+# dates that override the weekly pattern. Parsed schedules are cached by their
+# JSON text, so an edited schedule is simply a new key. Free time for a day is
+# the day's mask with the slots of overlapping bookings cleared, and free slots
+# are the runs of set bits left in it.
+#
+# Schedule format (all keys optional)::
+#
+#     {"monday": {"start": "09:00", "end": "17:00"},
+#      "tuesday": [{"start": "09:00", "end": "12:00"}, {"start": "13:00", "end": "18:00"}],
+#      "exceptions": {"2025-12-25": null, "2025-12-24": {"start": "09:00", "end": "12:00"}}}
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# Used when a provider has not set a schedule
+DEFAULT_SCHEDULE = {
+    'monday': {'start': '09:00', 'end': '17:00'},
+    'tuesday': {'start': '09:00', 'end': '17:00'},
+    'wednesday': {'start': '09:00', 'end': '17:00'},
+    'thursday': {'start': '09:00', 'end': '17:00'},
+    'friday': {'start': '09:00', 'end': '17:00'},
+    'saturday': {'start': '10:00', 'end': '16:00'},
+    'sunday': {'start': '10:00', 'end': '16:00'}
+}
+
+def slot_of(value, round_up=False):
+    """Slot number of an ``HH:MM`` string or ``time``, rounding partial slots down (or up)"""
+    if isinstance(value, str):
+        hours, minutes = value.split(':')[:2]
+        seconds = (int(hours) * 60 + int(minutes)) * 60
+    else:
+        seconds = value.hour * 3600 + value.minute * 60 + value.second + (1 if value.microsecond else 0)
+    if not 0 <= seconds <= 24 * 3600:
+        raise ValueError(f'Invalid time of day: {value}')
+    slot, remainder = divmod(seconds, SLOT_MINUTES * 60)
+    return slot + 1 if round_up and remainder else slot
+
+def time_of(slot):
+    """``HH:MM`` label of a slot boundary (``24:00`` for the end of the day)"""
+    minutes = slot * SLOT_MINUTES
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+def range_mask(start_slot, end_slot):
+    """Mask with the slots ``[start_slot, end_slot)`` set"""
+    if end_slot <= start_slot:
+        return 0
+    return ((1 << end_slot) - 1) ^ ((1 << start_slot) - 1)
+
+def hours_mask(hours):
+    """Mask of a day's working hours: None, one ``{start, end}`` range or a list of them"""
+    if not hours:
+        return 0
+    if isinstance(hours, dict):
+        hours = [hours]
+    mask = 0
+    for interval in hours:
+        mask |= range_mask(slot_of(interval.get('start', '09:00')),
+                           slot_of(interval.get('end', '17:00'), round_up=True))
+    return mask
+
+def runs(mask):
+    """Yield ``(start_slot, end_slot)`` for each run of set bits, in order"""
+    offset = 0
+    while mask:
+        skip = (mask & -mask).bit_length() - 1
+        mask >>= skip
+        offset += skip
+        length = (mask ^ (mask + 1)).bit_length() - 1
+        yield offset, offset + length
+        mask >>= length
+        offset += length
+
+class WeeklySchedule:
+    """Weekly working-hours bitmaps with date-specific overrides"""
+
+    __slots__ = ('days', 'exceptions', 'source')
+
+    def __init__(self, days, exceptions=None, source=None):
+        self.days = tuple(days)
+        self.exceptions = exceptions or {}
+        self.source = source if source is not None else {}
+
+    @classmethod
+    def from_dict(cls, schedule):
+        days = [hours_mask(schedule.get(day)) for day in DAYS]
+        exceptions = {
+            date.fromisoformat(day): hours_mask(hours)
+            for day, hours in (schedule.get('exceptions') or {}).items()
+        }
+        return cls(days, exceptions, schedule)
+
+    def day_mask(self, day):
+        """Working slots on a given date"""
+        mask = self.exceptions.get(day)
+        return self.days[day.weekday()] if mask is None else mask
+
+_schedules = TTLCache(maxsize=4096, ttl=None)
+
+def parse_schedule(text):
+    """Return the cached ``WeeklySchedule`` for an ``availability_schedule`` value
+
+    Missing or malformed schedules fall back to ``DEFAULT_SCHEDULE`` (the
+    reported ``source`` stays empty, as before).
+    """
+    key = text or ''
+    schedule = _schedules.get(key)
+    if schedule is None:
+        try:
+            source = json.loads(text) if text else {}
+            if not isinstance(source, dict):
+                raise ValueError
+            schedule = WeeklySchedule.from_dict(source or DEFAULT_SCHEDULE)
+            schedule.source = source
+        except (ValueError, TypeError, AttributeError):
+            schedule = WeeklySchedule.from_dict(DEFAULT_SCHEDULE)
+            schedule.source = {}
+        _schedules.set(key, schedule)
+    return schedule
+
+def booked_masks(bookings, first_day, last_day):
+    """``{date: mask}`` of the slots taken by ``bookings`` between two dates (inclusive)
+
+    Partially covered slots count as taken; bookings running past midnight
+    take slots on every day they touch.
+    """
+    masks = {}
+    for booking in bookings:
+        start = booking.scheduled_date
+        end = start + timedelta(minutes=booking.duration_minutes or 0)
+        day = max(start.date(), first_day)
+        while day <= last_day and datetime.combine(day, time()) < end:
+            day_start = datetime.combine(day, time())
+            start_slot = slot_of(start.time()) if start > day_start else 0
+            end_slot = SLOTS_PER_DAY if end >= day_start + timedelta(days=1) else slot_of(end.time(), round_up=True)
+            masks[day] = masks.get(day, 0) | range_mask(start_slot, end_slot)
+            day += timedelta(days=1)
+    return masks
+
+def free_masks(schedule, bookings, first_day, last_day):
+    """Yield ``(date, free_mask)`` for each date in the range"""
+    booked = booked_masks(bookings, first_day, last_day)
+    day = first_day
+    while day <= last_day:
+        yield day, schedule.day_mask(day) & ~booked.get(day, 0)
+        day += timedelta(days=1)
+
+def free_slots(schedule, bookings, first_day, last_day):
+    """Free time between two dates (inclusive) as ``{date, start_time, end_time, available}`` dicts"""
+    slots = []
+    for day, mask in free_masks(schedule, bookings, first_day, last_day):
+        if mask:
+            day_label = day.isoformat()
+            for start_slot, end_slot in runs(mask):
+                slots.append({
+                    'date': day_label,
+                    'start_time': time_of(start_slot),
+                    'end_time': time_of(end_slot),
+                    'available': True
+                })
+    return slots
+
+# Most windows a single search may ask about
+MAX_WINDOWS = 14
+
+def parse_window(window, today=None):
+    """``(date, mask)`` for a ``{date|day, start_time, end_time}`` request window
+
+    ``day`` names a weekday and means its next occurrence from ``today`` on.
+    Raises ``ValueError`` for malformed windows.
+    """
+    if not isinstance(window, dict):
+        raise ValueError('Availability windows must be objects')
+    if window.get('date'):
+        day = date.fromisoformat(str(window['date'])[:10])
+    elif str(window.get('day', '')).lower() in DAYS:
+        today = today or date.today()
+        day = today + timedelta(days=(DAYS.index(window['day'].lower()) - today.weekday()) % 7)
+    else:
+        raise ValueError('Availability windows need a date or a day of the week')
+    mask = range_mask(slot_of(window.get('start_time', '00:00')),
+                      slot_of(window.get('end_time', '24:00'), round_up=True))
+    if not mask:
+        raise ValueError('Availability window end_time must be after start_time')
+    return day, mask
+
+def parse_windows(availability, today=None):
+    """Request windows from a search ``availability`` block: one window or ``{"windows": [...]}``"""
+    if not availability:
+        return []
+    windows = availability.get('windows') if isinstance(availability, dict) and 'windows' in availability \
+        else [availability]
+    if not isinstance(windows, list):
+        raise ValueError('availability.windows must be a list')
+    if len(windows) > MAX_WINDOWS:
+        raise ValueError(f'At most {MAX_WINDOWS} availability windows are allowed')
+    return [parse_window(window, today) for window in windows]
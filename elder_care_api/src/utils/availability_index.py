@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+import numpy as np
+from sqlalchemy import select
+from src.models.care_models import db, Booking, ProviderProfile
+from src.utils import change_feed
+from src.utils.availability import parse_schedule, booked_masks
+from src.utils.booking_conflicts import blocking_statuses
+from src.utils.provider_index import provider_index
+
+# Per-day free-slot index for availability-aware search.
+#
+# For each date a search asks about, every provider's free time that day (its
+# schedule's bitmap minus the slots of its blocking bookings) is stored as two
+# 64-bit words per catalog index slot, so "who is free for this window" is one
+# vectorized AND/compare over all providers. Dates are materialized on first
+# use with a single bookings query and kept for the ``MAX_DAYS`` most recently
+# used dates. Committed booking and provider changes mark the provider stale
+# through ``change_feed``; its rows on the materialized dates are recomputed on
+# the next read, the rest of the index is left alone.
+
+MAX_DAYS = 60
+
+LOW_WORD = (1 << 64) - 1
+
+def mask_words(mask):
+    return mask & LOW_WORD, mask >> 64
+
+class FreeSlotIndex:
+    """Free 15-minute slots per catalog index slot for recently queried dates"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._generation = None
+        self._stale = set()
+        self._reset()
+        change_feed.subscribe('provider', self._mark_stale)
+        change_feed.subscribe('booking', self._bookings_changed)
+
+    def _reset(self):
+        self._days = OrderedDict()
+        self._schedules = {}
+
+    def _mark_stale(self, provider_ids):
+        with self.catalog.lock:
+            self._stale.update(provider_ids)
+
+    def _bookings_changed(self, keys):
+        self._mark_stale(provider_id for _, provider_id, _ in keys)
+
+    def invalidate(self):
+        with self.catalog.lock:
+            self._generation = None
+
+    # -- maintenance --------------------------------------------------------
+
+    def _load_schedules(self, provider_ids=None):
+        query = select(ProviderProfile.id, ProviderProfile.availability_schedule)
+        if provider_ids is not None:
+            query = query.where(ProviderProfile.id.in_(provider_ids))
+        for provider_id, text in db.session.execute(query):
+            self._schedules[provider_id] = parse_schedule(text)
+
+    def _load_bookings(self, first_day, last_day, provider_ids=None):
+        """Blocking bookings overlapping the dates, grouped by provider"""
+        query = select(Booking.provider_id, Booking.scheduled_date, Booking.duration_minutes).where(
+            Booking.end_time > datetime.combine(first_day, time()),
+            Booking.scheduled_date < datetime.combine(last_day + timedelta(days=1), time()),
+            Booking.status.in_(blocking_statuses())
+        )
+        if provider_ids is not None:
+            query = query.where(Booking.provider_id.in_(provider_ids))
+        bookings = {}
+        for row in db.session.execute(query):
+            bookings.setdefault(row.provider_id, []).append(row)
+        return bookings
+
+    def _grow(self, words):
+        size = self.catalog.size
+        if len(words) >= size:
+            return words
+        grown = np.zeros((max(size, 2 * len(words)), 2), dtype=np.uint64)
+        grown[:len(words)] = words
+        return grown
+
+    def _set_row(self, words, slot, day, schedule, booked):
+        free = schedule.day_mask(day) & ~booked.get(day, 0) if schedule is not None else 0
+        words[slot] = mask_words(free)
+
+    def _build_day(self, day):
+        words = np.zeros((self.catalog.size, 2), dtype=np.uint64)
+        bookings = self._load_bookings(day, day)
+        for provider_id, schedule in self._schedules.items():
+            slot = self.catalog.slot_of(provider_id)
+            if slot is not None:
+                self._set_row(words, slot, day, schedule, booked_masks(bookings.get(provider_id, ()), day, day))
+        return words
+
+    def _refresh(self, provider_ids):
+        """Recompute the rows of some providers on every materialized date"""
+        for provider_id in provider_ids:
+            self._schedules.pop(provider_id, None)
+        self._load_schedules(provider_ids)
+        if not self._days:
+            return
+        first_day, last_day = min(self._days), max(self._days)
+        bookings = self._load_bookings(first_day, last_day, provider_ids)
+        for provider_id in provider_ids:
+            slot = self.catalog.slot_of(provider_id)
+            if slot is None:
+                continue
+            schedule = self._schedules.get(provider_id)
+            booked = booked_masks(bookings.get(provider_id, ()), first_day, last_day)
+            for day in list(self._days):
+                self._days[day] = words = self._grow(self._days[day])
+                self._set_row(words, slot, day, schedule, booked)
+
+    def ensure_days(self, days):
+        """Materialize the given dates, bringing stale providers up to date first"""
+        self.catalog.ensure_fresh()
+        with self.catalog.lock:
+            if self._generation != self.catalog.generation:
+                self._reset()
+                self._stale.clear()
+                self._load_schedules()
+                self._generation = self.catalog.generation
+            if self._stale:
+                provider_ids = list(self._stale)
+                self._stale.clear()
+                self._refresh(provider_ids)
+            for day in days:
+                if day in self._days:
+                    self._days.move_to_end(day)
+                else:
+                    self._days[day] = self._build_day(day)
+            while len(self._days) > max(MAX_DAYS, len(set(days))):
+                self._days.popitem(last=False)
+
+    # -- queries ------------------------------------------------------------
+
+    def window_ratios(self, windows):
+        """Fraction of the requested ``(date, mask)`` windows each catalog slot has free
+
+        Returns a float array indexed by catalog slot. Callers should hold a
+        catalog ``snapshot`` so slot numbers stay put while they use it.
+        """
+        with self.catalog.lock:
+            self.ensure_days([day for day, _ in windows])
+            size = self.catalog.size
+            free_count = np.zeros(size, dtype=np.int64)
+            total = 0
+            for day, mask in windows:
+                words = self._grow(self._days[day])[:size]
+                low, high = mask_words(mask)
+                free_count += np.bitwise_count(words[:, 0] & np.uint64(low)).astype(np.int64)
+                free_count += np.bitwise_count(words[:, 1] & np.uint64(high)).astype(np.int64)
+                total += mask.bit_count()
+            return free_count / total
+
+free_slot_index = FreeSlotIndex(provider_index)
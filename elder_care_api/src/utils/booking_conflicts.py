@@ -0,0 +1,92 @@
+from bisect import bisect_left
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import select
+from src.models.care_models import db, Booking, BookingStatus
+
+# Interval overlap checks between a provider's bookings.
+#
+# A booking occupies ``[scheduled_date, end_time)``. Two bookings conflict when
+# each starts before the other ends. Bookings last at most
+# ``MAX_BOOKING_MINUTES``, so one overlapping ``[start, end)`` must also end
+# before ``end + MAX_BOOKING_MINUTES``; the check reads that bounded
+# ``end_time`` range of the ``(provider_id, end_time)`` index, whose size
+# depends on how busy the provider is around the requested time and not on
+# their booking history. Bookings that are
+# CONFIRMED or IN_PROGRESS always block; PENDING ones block too when the
+# ``BOOKING_CONFLICTS_INCLUDE_PENDING`` config flag is set.
+
+BLOCKING_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS)
+
+# Longest booking the API accepts
+MAX_BOOKING_MINUTES = 24 * 60
+
+def blocking_statuses(include_pending=None):
+    if include_pending is None:
+        include_pending = current_app.config.get('BOOKING_CONFLICTS_INCLUDE_PENDING', False)
+    if include_pending:
+        return BLOCKING_STATUSES + (BookingStatus.PENDING,)
+    return BLOCKING_STATUSES
+
+def find_conflict(provider_id, start, duration_minutes, exclude_id=None, include_pending=None):
+    """Return the first booking of ``provider_id`` overlapping the interval, or None"""
+    end = start + timedelta(minutes=duration_minutes)
+    query = select(Booking).where(
+        Booking.provider_id == provider_id,
+        Booking.end_time > start,
+        Booking.end_time < end + timedelta(minutes=MAX_BOOKING_MINUTES),
+        Booking.scheduled_date < end,
+        Booking.status.in_(blocking_statuses(include_pending))
+    )
+    if exclude_id is not None:
+        query = query.where(Booking.id != exclude_id)
+    with db.session.no_autoflush:
+        return db.session.execute(query.order_by(Booking.end_time).limit(1)).scalar()
+
+def booking_conflict(booking, include_pending=None):
+    """Return a booking that overlaps ``booking``'s (possibly unsaved) time slot, or None"""
+    return find_conflict(
+        booking.provider_id, booking.scheduled_date, booking.duration_minutes,
+        exclude_id=booking.id, include_pending=include_pending
+    )
+
+def find_conflicts(provider_id, intervals, exclude_ids=(), include_pending=None):
+    """Check many ``(start, end)`` intervals against a provider's bookings at once
+
+    Loads the provider's blocking bookings over the span of all intervals
+    with one query and returns, for each interval, a booking that overlaps
+    it or None.
+    """
+    if not intervals:
+        return []
+    span_start = min(start for start, _ in intervals)
+    span_end = max(end for _, end in intervals)
+    query = select(Booking).where(
+        Booking.provider_id == provider_id,
+        Booking.end_time > span_start,
+        Booking.end_time < span_end + timedelta(minutes=MAX_BOOKING_MINUTES),
+        Booking.scheduled_date < span_end,
+        Booking.status.in_(blocking_statuses(include_pending))
+    )
+    if exclude_ids:
+        query = query.where(Booking.id.notin_(exclude_ids))
+    with db.session.no_autoflush:
+        existing = db.session.execute(query.order_by(Booking.scheduled_date, Booking.id)).scalars().all()
+
+    # Latest-ending booking among those starting before each position
+    starts = [booking.scheduled_date for booking in existing]
+    latest = []
+    for booking in existing:
+        if not latest or booking.end_time > latest[-1].end_time:
+            latest.append(booking)
+        else:
+            latest.append(latest[-1])
+
+    conflicts = []
+    for start, end in intervals:
+        position = bisect_left(starts, end)
+        if position and latest[position - 1].end_time > start:
+            conflicts.append(latest[position - 1])
+        else:
+            conflicts.append(None)
+    return conflicts
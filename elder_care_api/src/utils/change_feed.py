@@ -0,0 +1,60 @@
+from collections import defaultdict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models.care_models import ProviderProfile, Service, Review, User, Booking, Message
+
+# Commit-time change notifications.
+#
+# In-process structures (indexes, caches) subscribe to a topic and are told
+# which keys changed once the surrounding transaction commits. Changes seen in
+# a flush are held on the session until then and dropped on rollback, so
+# subscribers never observe writes that did not make it to the database.
+
+_subscribers = defaultdict(list)
+
+def subscribe(topic, callback):
+    """Call ``callback(keys)`` after every commit that touched ``topic``
+
+    Topics and their keys: ``provider`` (provider ids), ``user`` (user ids),
+    ``review`` (provider ids), ``booking`` (``(booking_id, provider_id,
+    family_user_id)`` tuples) and ``message`` (recipient user ids).
+    """
+    _subscribers[topic].append(callback)
+
+def mark_changed(session, topic, *keys):
+    """Record changed keys for writes the ORM does not see (bulk/Core statements)"""
+    pending = session.info.setdefault('change_feed', defaultdict(set))
+    pending[topic].update(key for key in keys if key is not None)
+
+def _collect(session, obj):
+    if isinstance(obj, ProviderProfile):
+        mark_changed(session, 'provider', obj.id)
+    elif isinstance(obj, Service):
+        mark_changed(session, 'provider', obj.provider_id)
+    elif isinstance(obj, Review):
+        mark_changed(session, 'provider', obj.provider_id)
+        mark_changed(session, 'review', obj.provider_id)
+    elif isinstance(obj, Booking):
+        mark_changed(session, 'booking', (obj.id, obj.provider_id, obj.family_user_id))
+    elif isinstance(obj, Message):
+        mark_changed(session, 'message', obj.recipient_id)
+    elif isinstance(obj, User):
+        mark_changed(session, 'user', obj.id)
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        _collect(session, obj)
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    pending = session.info.pop('change_feed', None)
+    if not pending:
+        return
+    for topic, keys in pending.items():
+        for callback in _subscribers.get(topic, []):
+            callback(keys)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_rollback(session, previous_transaction):
+    session.info.pop('change_feed', None)
@@ -0,0 +1,91 @@
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+# Counters on parent rows maintained incrementally from their child rows.
+#
+# An ``IncrementalCounter`` hooks every ORM flush. Before the flush it turns
+# the child rows about to be inserted, edited or deleted into deltas, calling
+# ``add(deltas, *values, sign)`` with the row's new values (sign 1) and its
+# stored ones (sign -1). Stored values are read back from the table because
+# attribute history misses them when a row was expired before being edited
+# (e.g. after a commit). After the flush it applies the deltas with
+# ``apply_deltas(connection, deltas)`` on the flush's own connection, so the
+# counters commit or roll back together with the rows, and expires the
+# counter attributes of parents loaded in the session. A rollback drops
+# deltas not applied yet.
+
+def _nonzero(delta):
+    if isinstance(delta, dict):
+        return any(_nonzero(value) for value in delta.values())
+    return delta != 0
+
+class IncrementalCounter:
+    """Counters on ``parent`` rows kept in step with flushes of ``child`` rows
+
+    ``columns`` are the child attributes passed to ``add``, the first being
+    the parent id; ``attributes`` are the parent's counter attributes.
+    """
+
+    def __init__(self, name, child, columns, add, apply_deltas, parent, attributes):
+        self.child = child
+        self.columns = columns
+        self.add = add
+        self.apply_deltas = apply_deltas
+        self.parent = parent
+        self.attributes = attributes
+        self._deltas_key = f'{name}_deltas'
+        self._applied_key = f'{name}_applied'
+        event.listen(Session, 'before_flush', self._before_flush)
+        event.listen(Session, 'after_flush', self._after_flush)
+        event.listen(Session, 'after_flush_postexec', self._after_flush_postexec)
+        event.listen(Session, 'after_soft_rollback', self._after_rollback)
+
+    def _values(self, row):
+        return [getattr(row, column.key) for column in self.columns]
+
+    def _stored_values(self, session, rows):
+        """``{row id: values}`` as currently stored in the database"""
+        ids = [row.id for row in rows if row.id is not None]
+        if not ids:
+            return {}
+        with session.no_autoflush:
+            stored = session.execute(select(self.child.id, *self.columns).where(self.child.id.in_(ids)))
+            return {row_id: values for row_id, *values in stored}
+
+    def collect_deltas(self, session):
+        """Counter changes implied by the child rows about to be flushed"""
+        deltas = {}
+        for row in session.new:
+            if isinstance(row, self.child):
+                self.add(deltas, *self._values(row), 1)
+        changed = [row for row in session.dirty if isinstance(row, self.child) and session.is_modified(row)]
+        deleted = [row for row in session.deleted if isinstance(row, self.child)]
+        stored = self._stored_values(session, changed + deleted)
+        for row in changed:
+            if row.id in stored:
+                self.add(deltas, *stored[row.id], -1)
+            self.add(deltas, *self._values(row), 1)
+        for row in deleted:
+            if row.id in stored:
+                self.add(deltas, *stored[row.id], -1)
+        return {parent_id: delta for parent_id, delta in deltas.items() if _nonzero(delta)}
+
+    def _before_flush(self, session, flush_context, instances):
+        session.info[self._deltas_key] = self.collect_deltas(session)
+
+    def _after_flush(self, session, flush_context):
+        deltas = session.info.pop(self._deltas_key, None)
+        if deltas:
+            self.apply_deltas(session.connection(), deltas)
+            session.info.setdefault(self._applied_key, set()).update(deltas)
+
+    def _after_flush_postexec(self, session, flush_context):
+        # Loaded parents now hold stale counters; reload them on next access
+        for parent_id in session.info.pop(self._applied_key, ()):
+            parent = session.identity_map.get(session.identity_key(self.parent, parent_id))
+            if parent is not None:
+                session.expire(parent, self.attributes)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(self._deltas_key, None)
+        session.info.pop(self._applied_key, None)
@@ -0,0 +1,132 @@
+import threading
+from flask import current_app, g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# SQLite connection setup.
+#
+# In the default mode the app uses Flask-SQLAlchemy's stock engine. Setting
+# ``DATABASE_MODE = 'production'`` (for a file-based SQLite database) turns on
+# the concurrency setup:
+#
+# * every connection runs in WAL mode with ``busy_timeout``, ``synchronous``,
+#   ``cache_size`` and ``mmap_size`` tuned, so readers never block the writer;
+# * safe (GET/HEAD/OPTIONS) requests, and requests to views marked
+#   ``reads_only``, read through a separate pool of ``query_only``
+#   connections, each request in one snapshot transaction;
+# * other requests go through a single writer path: one request at a time per
+#   process (``write_lock``), each in a ``BEGIN IMMEDIATE`` transaction, so a
+#   check-then-write such as a booking conflict check and the insert that
+#   follows it cannot interleave with another worker's writes.
+
+READ_BIND = 'read_only'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+DEFAULTS = {
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_CACHE_SIZE_KB': 64000,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_READ_POOL_SIZE': 8,
+}
+
+# Seconds between catalog index rebuilds in production mode
+PRODUCTION_INDEX_MAX_AGE = 60
+
+# Serializes writing requests within this process
+write_lock = threading.Lock()
+
+class RoutingSession(Session):
+    """Session that sends reads of safe requests to the read-only pool when there is one"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and reads_routed():
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def reads_only(view):
+    """Route requests to ``view`` like safe ones although its method is not (a POST that only reads)"""
+    view.reads_only = True
+    return view
+
+def is_read_request():
+    view = current_app.view_functions.get(request.endpoint)
+    return request.method in SAFE_METHODS or getattr(view, 'reads_only', False)
+
+def reads_routed():
+    return has_request_context() and g.get('database_reads_routed', False)
+
+def is_production(app):
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    return app.config.get('DATABASE_MODE') == 'production' and uri.startswith('sqlite:///') \
+        and ':memory:' not in uri
+
+def pragmas(config):
+    return (
+        ('journal_mode', 'WAL'),
+        ('busy_timeout', int(config['SQLITE_BUSY_TIMEOUT_MS'])),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('cache_size', -int(config['SQLITE_CACHE_SIZE_KB'])),
+        ('mmap_size', int(config['SQLITE_MMAP_SIZE'])),
+    )
+
+def _install_connection_events(engine, settings, begin_statement):
+    @event.listens_for(engine, 'connect')
+    def _connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy's begin event issue BEGIN instead of the sqlite3 module
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in settings:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def _begin(connection):
+        connection.exec_driver_sql(begin_statement)
+
+def init_app(app, db):
+    """Initialize ``db`` for ``app``, with the production SQLite setup when enabled"""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    production = is_production(app)
+    if production:
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        # A single writer per process needs only a small pool
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {'pool_size': 2, 'max_overflow': 2})
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[READ_BIND] = {
+            'url': uri,
+            'pool_size': app.config['SQLITE_READ_POOL_SIZE'],
+            'max_overflow': app.config['SQLITE_READ_POOL_SIZE'],
+        }
+        app.config['SQLALCHEMY_BINDS'] = binds
+        # Other workers' writes reach the in-process catalog and free-slot
+        # indexes only when they are rebuilt
+        app.config.setdefault('PROVIDER_INDEX_MAX_AGE', PRODUCTION_INDEX_MAX_AGE)
+
+    db.init_app(app)
+
+    if not production:
+        return
+    settings = pragmas(app.config)
+    with app.app_context():
+        _install_connection_events(db.engines[None], settings, 'BEGIN IMMEDIATE')
+        _install_connection_events(db.engines[READ_BIND], settings + (('query_only', 'ON'),), 'BEGIN')
+
+    @app.before_request
+    def _route_request():
+        if is_read_request():
+            g.database_reads_routed = True
+        else:
+            write_lock.acquire()
+            g.database_write_lock = True
+
+    @app.teardown_request
+    def _release_write_lock(exc):
+        if g.pop('database_write_lock', False):
+            # Close the transaction before letting the next writer in
+            db.session.remove()
+            write_lock.release()
@@ -0,0 +1,75 @@
+import csv
+import io
+from flask import current_app, stream_with_context
+from src.models.care_models import db
+
+# Streaming bulk exports.
+#
+# An export runs one query and writes its rows as NDJSON (one JSON object per
+# line) or CSV while the response is being sent. Rows are fetched
+# ``EXPORT_BATCH_SIZE`` at a time (``yield_per``) and each batch is encoded and
+# flushed before the next is read, so memory stays constant however many rows
+# match. CSV columns are the row dicts flattened with dotted names
+# (``service.name``), taken from the first row. In the production database
+# mode the whole export reads from one snapshot transaction.
+
+EXPORT_BATCH_SIZE = 1000
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+def flatten(data, prefix=''):
+    """Flatten nested dicts into one level with dotted keys"""
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+def _dumpb():
+    provider = current_app.json
+    if hasattr(provider, 'dumpb'):
+        return provider.dumpb
+    return lambda obj: provider.dumps(obj, separators=(',', ':')).encode()
+
+def iter_ndjson(batches, to_dict):
+    dumpb = _dumpb()
+    for rows in batches:
+        yield b''.join(dumpb(to_dict(row)) + b'\n' for row in rows)
+
+def iter_csv(batches, to_dict):
+    buffer = io.StringIO()
+    writer = None
+    for rows in batches:
+        for row in rows:
+            data = flatten(to_dict(row))
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(data), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow(data)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+def export_response(query, to_dict, export_format, name):
+    """Stream the rows of ``query`` converted by ``to_dict`` as an NDJSON or CSV download
+
+    ``export_format`` must be a key of ``FORMATS``.
+    """
+    mimetype, extension = FORMATS[export_format]
+    encode = iter_csv if export_format == 'csv' else iter_ndjson
+
+    def generate():
+        result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        try:
+            yield from encode(result.partitions(), to_dict)
+        finally:
+            result.close()
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{extension}'
+    return response
@@ -0,0 +1,114 @@
+import re
+from sqlalchemy import text
+
+# SQLite FTS5 full-text search over provider profiles.
+#
+# ``provider_search`` holds one row per provider (rowid = provider id) with the
+# free-text profile columns plus the names and descriptions of the provider's
+# active services. Triggers on ``provider_profiles`` and ``services`` keep it in
+# sync for every write, including ones that bypass the ORM.
+
+FTS_TABLE = 'provider_search'
+
+# business_name, specialties, certifications, description, services
+BM25_WEIGHTS = (4.0, 3.0, 2.0, 1.0, 1.5)
+
+_PROVIDER_ROW = """
+    SELECT p.id, p.business_name, p.specialties, p.certifications, p.description,
+           (SELECT group_concat(coalesce(s.name, '') || ' ' || coalesce(s.description, ''), ' ')
+              FROM services s
+             WHERE s.provider_id = p.id AND s.is_active)
+      FROM provider_profiles p
+"""
+
+_INSERT = f"""
+    INSERT INTO {FTS_TABLE} (rowid, business_name, specialties, certifications, description, services)
+"""
+
+def _reindex(provider_id):
+    return f"""
+        DELETE FROM {FTS_TABLE} WHERE rowid = {provider_id};
+        {_INSERT} {_PROVIDER_ROW} WHERE p.id = {provider_id};
+    """
+
+SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        business_name, specialties, certifications, description, services,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS provider_search_profile_insert
+    AFTER INSERT ON provider_profiles BEGIN {_reindex('NEW.id')} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS provider_search_profile_update
+    AFTER UPDATE OF business_name, specialties, certifications, description ON provider_profiles
+    BEGIN {_reindex('NEW.id')} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS provider_search_profile_delete
+    AFTER DELETE ON provider_profiles BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS provider_search_service_insert
+    AFTER INSERT ON services BEGIN {_reindex('NEW.provider_id')} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS provider_search_service_update
+    AFTER UPDATE OF provider_id, name, description, is_active ON services
+    BEGIN {_reindex('OLD.provider_id')} {_reindex('NEW.provider_id')} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS provider_search_service_delete
+    AFTER DELETE ON services BEGIN {_reindex('OLD.provider_id')} END
+    """,
+]
+
+def install(engine):
+    """Create the FTS table and triggers, backfilling it on first install"""
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        for statement in SCHEMA:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            rebuild(connection)
+
+def rebuild(connection):
+    """Repopulate the FTS table from the provider and service tables"""
+    connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+    connection.exec_driver_sql(f"{_INSERT} {_PROVIDER_ROW}")
+
+def build_match_query(q):
+    """Turn free text into an FTS5 query matching every word (last one as a prefix)"""
+    terms = re.findall(r'\w+', q or '')
+    if not terms:
+        return None
+    quoted = ['"{}"'.format(term) for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def search(session, q, limit=None):
+    """Return provider ids matching ``q``, best BM25 rank first"""
+    match = build_match_query(q)
+    if match is None:
+        return []
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    sql = f"""
+        SELECT rowid FROM {FTS_TABLE}
+         WHERE {FTS_TABLE} MATCH :match
+         ORDER BY bm25({FTS_TABLE}, {weights})
+    """
+    params = {'match': match}
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params['limit'] = limit
+    return list(session.execute(text(sql), params).scalars())
@@ -0,0 +1,122 @@
+import csv
+import math
+import os
+import numpy as np
+
+# Location lookups for radius search.
+#
+# Providers are placed at the centroid of their ZIP code or, failing that, of
+# the district named in their city field, using the table bundled in
+# ``src/data/locations.csv``. Centroids are bucketed in a fixed-size lat/lng
+# grid so a radius query only looks at the cells overlapping its bounding box.
+
+LOCATIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'locations.csv')
+
+EARTH_RADIUS_KM = 6371.0
+CELL_DEGREES = 0.25
+DEFAULT_RADIUS_KM = 25.0
+
+def _normalize_key(value):
+    return ' '.join(str(value).split()).casefold() if value is not None else None
+
+class LocationTable:
+    """ZIP / district centroids with a grid index for radius queries"""
+
+    def __init__(self, path=LOCATIONS_PATH):
+        self.path = path
+        self._locations = None
+        self._cells = None
+
+    def _load(self):
+        if self._locations is not None:
+            return
+        locations = {}
+        cells = {}
+        with open(self.path, newline='', encoding='utf-8') as handle:
+            for row in csv.DictReader(handle):
+                key = _normalize_key(row['key'])
+                latitude, longitude = float(row['latitude']), float(row['longitude'])
+                locations[key] = (latitude, longitude)
+                cells.setdefault(self._cell(latitude, longitude), []).append(key)
+        self._locations = locations
+        self._cells = cells
+
+    @staticmethod
+    def _cell(latitude, longitude):
+        return (math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES))
+
+    def lookup(self, key):
+        """Return ``(latitude, longitude)`` for a ZIP code or district name"""
+        self._load()
+        return self._locations.get(_normalize_key(key))
+
+    def resolve(self, zip_code=None, city=None):
+        """Return ``(location_key, latitude, longitude)`` for a provider address"""
+        self._load()
+        for value in (zip_code, city):
+            key = _normalize_key(value)
+            if key and key in self._locations:
+                return (key,) + self._locations[key]
+        return None
+
+    def within(self, latitude, longitude, radius_km):
+        """Return ``{location_key: distance_km}`` for centroids inside the radius"""
+        self._load()
+        lat_span = math.degrees(radius_km / EARTH_RADIUS_KM)
+        cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+        lng_span = min(lat_span / cos_lat, 180.0)
+        low = self._cell(latitude - lat_span, longitude - lng_span)
+        high = self._cell(latitude + lat_span, longitude + lng_span)
+        found = {}
+        for lat_cell in range(low[0], high[0] + 1):
+            for lng_cell in range(low[1], high[1] + 1):
+                for key in self._cells.get((lat_cell, lng_cell), ()):
+                    distance = haversine_km(latitude, longitude, *self._locations[key])
+                    if distance <= radius_km:
+                        found[key] = distance
+        return found
+
+def haversine_km(latitude, longitude, other_latitude, other_longitude):
+    """Great-circle distance in km; the second point may be NumPy arrays"""
+    lat1, lng1 = np.radians(latitude), np.radians(longitude)
+    lat2, lng2 = np.radians(other_latitude), np.radians(other_longitude)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    return float(distance) if np.ndim(distance) == 0 else distance
+
+def parse_near(value):
+    """Parse a ``near`` criterion into ``(latitude, longitude)``
+
+    Accepts a ZIP code or district name, a ``"lat,lng"`` string or a
+    ``{"lat": ..., "lng": ...}`` object. Raises ``ValueError`` when the
+    location is unknown.
+    """
+    if isinstance(value, dict):
+        try:
+            return float(value['lat']), float(value.get('lng', value.get('lon')))
+        except (KeyError, TypeError):
+            raise ValueError('near must include lat and lng')
+    if isinstance(value, str) and ',' in value:
+        try:
+            latitude, longitude = (float(part) for part in value.split(','))
+            return latitude, longitude
+        except ValueError:
+            pass
+    location = locations.lookup(value)
+    if location is None:
+        raise ValueError(f'Unknown location: {value}')
+    return location
+
+def parse_radius(value):
+    """Parse a ``radius_km`` criterion; None when not given. Raises ``ValueError`` unless positive"""
+    if value is None:
+        return None
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('radius_km must be a number')
+    if isinstance(value, bool) or not 0 < radius < math.inf:
+        raise ValueError('radius_km must be greater than 0')
+    return radius
+
+locations = LocationTable()
@@ -0,0 +1,142 @@
+import dataclasses
+import decimal
+import enum
+import json
+from datetime import date, datetime, time
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder is used instead
+    orjson = None
+
+# JSON encoding for the app.
+#
+# ``FastJSONProvider`` replaces Flask's default provider: ``jsonify`` and
+# ``request.get_json`` go through orjson when it is installed and through the
+# stdlib ``json`` module otherwise. Both backends produce the same output:
+# compact, UTF-8 (no ``\uXXXX`` escapes), keys sorted as before, with
+# datetimes/dates/times as ISO 8601 strings, Decimals as numbers, Enums as
+# their values and numpy scalars/arrays as plain numbers/lists.
+#
+# ``stream_json`` writes a large array (optionally inside an envelope object)
+# incrementally from a generator, encoding items as they are produced and
+# flushing in ``STREAM_CHUNK_BYTES`` chunks, so the full list never has to be
+# built in memory.
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+def default(value):
+    """Convert values the encoders do not know natively"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, 'tolist'):
+        # numpy scalars and arrays
+        return value.tolist()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the stdlib ``json``"""
+
+    default = staticmethod(default)
+    ensure_ascii = False
+
+    def _orjson_options(self, sort_keys=None, indent=None):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys if sort_keys is None else sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumpb(self, obj, sort_keys=None, indent=None):
+        """Serialize ``obj`` to compact (or indented) UTF-8 bytes"""
+        if orjson is not None:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(sort_keys, indent))
+        return json.dumps(
+            obj, default=self.default, ensure_ascii=self.ensure_ascii,
+            sort_keys=self.sort_keys if sort_keys is None else sort_keys,
+            indent=indent, separators=None if indent else (',', ':')
+        ).encode()
+
+    def dumps(self, obj, **kwargs):
+        # ``dumpb`` covers the options Flask itself passes, with either backend;
+        # anything else goes to the stdlib
+        if kwargs.keys() <= {'indent', 'separators', 'sort_keys'}:
+            return self.dumpb(obj, kwargs.get('sort_keys'), kwargs.get('indent')).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumpb(obj, indent=2 if indent else None) + b'\n',
+                                        mimetype=self.mimetype)
+
+def init_app(app):
+    """Use ``FastJSONProvider`` for ``app``"""
+    app.json = FastJSONProvider(app)
+
+def _encoder():
+    provider = current_app.json
+    if hasattr(provider, 'dumpb'):
+        return provider.dumpb, provider.sort_keys
+    return (lambda obj: provider.dumps(obj, separators=(',', ':')).encode()), \
+        getattr(provider, 'sort_keys', True)
+
+def iter_json_array(items, dumpb):
+    """Yield a JSON array of ``items`` in chunks of about ``STREAM_CHUNK_BYTES``"""
+    buffer = bytearray(b'[')
+    first = True
+    for item in items:
+        if not first:
+            buffer += b','
+        buffer += dumpb(item)
+        first = False
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b']'
+    yield bytes(buffer)
+
+def stream_json(items, envelope=None, key=None, status=200):
+    """Streamed JSON response of ``items``, or of ``envelope`` with ``items`` under ``key``
+
+    ``items`` may be any iterable (typically a generator); it is consumed
+    while the response is sent, inside the request context.
+    """
+    dumpb, sort_keys = _encoder()
+
+    def generate():
+        if envelope is None:
+            yield from iter_json_array(items, dumpb)
+        else:
+            fields = dict(envelope, **{key: None})
+            names = sorted(fields) if sort_keys else list(fields)
+            for number, name in enumerate(names):
+                prefix = (b'{' if number == 0 else b',') + dumpb(name) + b':'
+                if name == key:
+                    yield prefix
+                    yield from iter_json_array(items, dumpb)
+                else:
+                    yield prefix + dumpb(fields[name])
+            yield b'}'
+        yield b'\n'
+
+    return current_app.response_class(stream_with_context(generate()), status=status,
+                                      mimetype=getattr(current_app.json, 'mimetype', 'application/json'))
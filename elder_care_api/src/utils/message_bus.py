@@ -0,0 +1,121 @@
+import queue
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models.care_models import Message, User
+
+# In-process pub/sub for the message stream.
+#
+# Every connected ``/api/messages/stream`` holds a ``Subscription`` for its
+# user. When a transaction that inserted messages commits, each message is
+# published to the subscriptions of its recipient, so a stream sends it
+# without querying the database. Events are captured at flush (the objects
+# are expired after the commit) and published only after the commit; a
+# rollback drops them. Writes the ORM does not see queue their events with
+# ``publish_after_commit``.
+#
+# Subscriptions are bounded: a client that falls more than
+# ``SUBSCRIPTION_QUEUE_SIZE`` events behind is marked ``dropped`` and its
+# stream ends, and the client catches up when it reconnects (``Last-Event-ID``).
+# The bus only reaches streams of the same process; under several workers a
+# stream sees the messages sent through its own worker live and the others
+# when it reconnects.
+#
+# A connected stream holds its worker thread (or greenlet) for as long as it
+# stays open, so ``subscribe`` refuses new subscriptions beyond a per-process
+# limit; serve the API with a threaded or gevent worker class, not gunicorn's
+# default sync workers.
+
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+class Subscription:
+    """Events for one connected stream, delivered through a bounded queue"""
+
+    def __init__(self, user_id, maxsize=SUBSCRIPTION_QUEUE_SIZE):
+        self.user_id = user_id
+        self.dropped = False
+        self._queue = queue.Queue(maxsize)
+
+    def deliver(self, event):
+        """Queue ``event``; called from the publishing thread"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped = True
+
+    def get(self, timeout):
+        """The next event, or ``None`` when none arrives within ``timeout`` seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class MessageBus:
+    """Subscriptions per user id, and the events published to them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._count = 0
+
+    def subscribe(self, user_id, limit=None):
+        """Subscribe a stream of ``user_id``; None when ``limit`` subscriptions are already open"""
+        subscription = Subscription(user_id)
+        with self._lock:
+            if limit is not None and self._count >= limit:
+                return None
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    @property
+    def count(self):
+        """Subscriptions currently open in this process"""
+        return self._count
+
+    def publish(self, user_id, event):
+        """Deliver ``event``, an ``(event name, event id, data)`` tuple, to the streams of ``user_id``"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+message_bus = MessageBus()
+
+def message_item(message, sender):
+    """A flushed message shaped like an inbox item"""
+    data = message.to_dict()
+    data['sender'] = {'id': sender.id, 'first_name': sender.first_name, 'last_name': sender.last_name} \
+        if sender is not None else None
+    return data
+
+def publish_after_commit(session, user_id, event):
+    """Publish ``event`` to ``user_id`` once the session's transaction commits"""
+    session.info.setdefault('message_bus', []).append((user_id, event))
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    for message in session.new:
+        if isinstance(message, Message):
+            # The route has usually loaded the sender already; otherwise this is one lookup
+            with session.no_autoflush:
+                sender = session.get(User, message.sender_id)
+            publish_after_commit(session, message.recipient_id, ('message', message.id, message_item(message, sender)))
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    for user_id, event in session.info.pop('message_bus', ()):
+        message_bus.publish(user_id, event)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_rollback(session, previous_transaction):
+    session.info.pop('message_bus', None)
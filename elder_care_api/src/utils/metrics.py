@@ -0,0 +1,268 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import deque
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+# Request and SQL instrumentation, exposed at ``/api/metrics``.
+#
+# Every request is timed from ``before_request`` to ``after_request`` (for a
+# streamed response that is until the first byte, not the last) and recorded
+# per blueprint, route rule and method: a latency histogram, a counter per
+# status code, and histograms of the number of SQL statements the request ran
+# and the time they took. The statement timings come from the engines'
+# ``before/after_cursor_execute`` events, so they also cover the read-only
+# pool in the production database mode. Connection pool usage is read from
+# the pools when the metrics are scraped.
+#
+# A statement slower than ``SLOW_QUERY_MS`` is logged (logger
+# ``src.utils.metrics``) with its normalized SQL, the route it ran for and
+# its ``EXPLAIN QUERY PLAN``, and kept in a short in-memory log served at
+# ``/api/metrics/slow-queries``. The plan is taken once per normalized
+# statement. The numbers are per process: under several workers each worker
+# reports its own, and Prometheus sums them.
+#
+# Recording a request costs a few dictionary updates under one lock; set
+# ``METRICS_ENABLED = False`` to skip the instrumentation altogether.
+
+DEFAULTS = {
+    'METRICS_ENABLED': True,
+    'SLOW_QUERY_MS': 100,
+    'SLOW_QUERY_LOG_SIZE': 100,
+}
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """Cumulative histogram per label set, rendered in the Prometheus text format"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self, label_names):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            base = format_labels(label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{base}}} {count}')
+        return lines
+
+class Metrics:
+    """Process-wide request and SQL metrics"""
+
+    ROUTE_LABELS = ('blueprint', 'route', 'method')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.engines = {}
+        self.slow_query_ms = DEFAULTS['SLOW_QUERY_MS']
+        self.slow_queries = deque(maxlen=DEFAULTS['SLOW_QUERY_LOG_SIZE'])
+        self._plans = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = Histogram('http_request_duration_seconds',
+                                     'Time to produce the response, per route', LATENCY_BUCKETS)
+            self.statements = Histogram('http_request_sql_statements',
+                                        'SQL statements run by one request, per route', STATEMENT_BUCKETS)
+            self.sql_time = Histogram('http_request_sql_duration_seconds',
+                                      'Total SQL time of one request, per route', LATENCY_BUCKETS)
+            self.responses = {}
+            self.sql_totals = {}
+            self.slow_total = 0
+            self.slow_queries.clear()
+            self._plans.clear()
+
+    def record_request(self, labels, status, elapsed, statements, sql_time):
+        with self._lock:
+            self.latency.observe(labels, elapsed)
+            self.statements.observe(labels, statements)
+            self.sql_time.observe(labels, sql_time)
+            key = labels + (str(status),)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def record_statement(self, engine_name, elapsed):
+        with self._lock:
+            totals = self.sql_totals.get(engine_name)
+            if totals is None:
+                totals = self.sql_totals[engine_name] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += elapsed
+
+    def record_slow_query(self, cursor, statement, parameters, elapsed, executemany):
+        normalized = normalize_sql(statement)
+        with self._lock:
+            self.slow_total += 1
+            plan = self._plans.get(normalized)
+        if plan is None and not executemany:
+            plan = explain(cursor, statement, parameters)
+            with self._lock:
+                if len(self._plans) >= 1000:
+                    self._plans.clear()
+                self._plans[normalized] = plan
+        entry = {
+            'sql': normalized,
+            'duration_ms': round(elapsed * 1000, 3),
+            'route': request_labels()[1] if has_request_context() else None,
+            'plan': plan or [],
+            'at': time.time(),
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+        logger.warning('slow query (%.1f ms) on %s: %s\n%s', entry['duration_ms'], entry['route'] or '-',
+                       normalized, '\n'.join(entry['plan']))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = self.latency.render(self.ROUTE_LABELS)
+            lines += ['# HELP http_requests_total Responses, per route and status code',
+                      '# TYPE http_requests_total counter']
+            for labels, count in sorted(self.responses.items()):
+                lines.append(f'http_requests_total{{{format_labels(self.ROUTE_LABELS + ("status",), labels)}}} {count}')
+            lines += self.statements.render(self.ROUTE_LABELS)
+            lines += self.sql_time.render(self.ROUTE_LABELS)
+            lines += ['# HELP sql_statements_total SQL statements executed, per engine',
+                      '# TYPE sql_statements_total counter']
+            lines += [f'sql_statements_total{{engine="{name}"}} {count}'
+                      for name, (count, _) in sorted(self.sql_totals.items())]
+            lines += ['# HELP sql_duration_seconds_total Time spent executing SQL, per engine',
+                      '# TYPE sql_duration_seconds_total counter']
+            lines += [f'sql_duration_seconds_total{{engine="{name}"}} {total:.6f}'
+                      for name, (_, total) in sorted(self.sql_totals.items())]
+            lines += ['# HELP sql_slow_queries_total Statements slower than the slow query threshold',
+                      '# TYPE sql_slow_queries_total counter',
+                      f'sql_slow_queries_total {self.slow_total}']
+        lines += self.render_pools()
+        return '\n'.join(lines) + '\n'
+
+    def render_pools(self):
+        gauges = {
+            'db_pool_size': ('Connections the pool keeps open', 'size'),
+            'db_pool_checked_out': ('Connections in use', 'checkedout'),
+            'db_pool_checked_in': ('Idle connections in the pool', 'checkedin'),
+            'db_pool_overflow': ('Connections open beyond the pool size', 'overflow'),
+        }
+        lines = []
+        for metric, (help_text, method) in gauges.items():
+            values = [(name, getattr(engine.pool, method)()) for name, engine in sorted(self.engines.items())
+                      if hasattr(engine.pool, method)]
+            if values:
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+                lines += [f'{metric}{{engine="{name}"}} {value}' for name, value in values]
+        return lines
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def normalize_sql(statement):
+    """Collapse whitespace, literals and expanded IN lists so equal query shapes compare equal"""
+    statement = re.sub(r"'(?:[^']|'')*'", '?', statement)
+    statement = re.sub(r'(?<![\w.])-?\d+(?:\.\d+)?\b', '?', statement)
+    statement = re.sub(r'\s+', ' ', statement).strip()
+    return re.sub(r'\(\?(?:, \?)+\)', '(?, ...)', statement)
+
+def explain(cursor, statement, parameters):
+    """``EXPLAIN QUERY PLAN`` lines of a statement, on the connection that ran it"""
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    try:
+        rows = cursor.connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+    except Exception as e:
+        return [f'(no plan: {e})']
+    return [row[-1] for row in rows]
+
+def request_labels():
+    rule = request.url_rule
+    return (request.blueprint or '', rule.rule if rule is not None else '(unmatched)', request.method)
+
+def _install_engine_events(engine, name):
+    # Timed on the execution context, which goes away with a failed statement
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        metrics.record_statement(name, elapsed)
+        if has_request_context():
+            g.metrics_statements = g.get('metrics_statements', 0) + 1
+            g.metrics_sql_time = g.get('metrics_sql_time', 0.0) + elapsed
+        if elapsed * 1000 >= metrics.slow_query_ms:
+            metrics.record_slow_query(cursor, statement, parameters, elapsed, executemany)
+
+metrics = Metrics()
+
+def metrics_endpoint():
+    """Prometheus metrics of this process"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+def slow_queries_endpoint():
+    """Most recent slow queries of this process, newest first"""
+    return jsonify({
+        'threshold_ms': metrics.slow_query_ms,
+        'queries': list(reversed(metrics.slow_queries)),
+    }), 200
+
+def init_app(app, db):
+    """Instrument ``app`` and the engines of ``db`` and add the metrics endpoints"""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    app.add_url_rule('/api/metrics', view_func=metrics_endpoint, methods=['GET'])
+    app.add_url_rule('/api/metrics/slow-queries', view_func=slow_queries_endpoint, methods=['GET'])
+    if not app.config['METRICS_ENABLED']:
+        return
+    metrics.slow_query_ms = float(app.config['SLOW_QUERY_MS'])
+    metrics.slow_queries = deque(metrics.slow_queries, maxlen=int(app.config['SLOW_QUERY_LOG_SIZE']))
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            name = bind or 'default'
+            if metrics.engines.get(name) is not engine:
+                metrics.engines[name] = engine
+                _install_engine_events(engine, name)
+
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    # Run first, so time spent waiting for the writer lock is included
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_timer)
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            metrics.record_request(request_labels(), response.status_code, time.perf_counter() - started,
+                                   g.pop('metrics_statements', 0), g.pop('metrics_sql_time', 0.0))
+        return response
@@ -0,0 +1,104 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from math import ceil
+from flask import request
+from sqlalchemy import and_, or_
+from src.utils import change_feed
+from src.utils.cache import TTLCache
+
+# Helpers shared by the paginated list endpoints.
+#
+# Endpoints support two schemes: numbered pages (``page``/``per_page``, with an
+# OFFSET and a COUNT per request) and keyset pages, selected by passing a
+# ``cursor`` argument (empty for the first page). A cursor is an opaque token
+# holding the sort key of the last row returned; the next page seeks past it,
+# so deep pages cost the same as the first. Totals are only computed in keyset
+# mode when ``include_total`` is set, and are cached until the underlying rows
+# change or ``COUNT_CACHE_TTL`` expires.
+
+COUNT_CACHE_TTL = 60
+
+count_cache = TTLCache(maxsize=4096, ttl=COUNT_CACHE_TTL)
+
+def normalize_page_args(page, per_page):
+    """Clamp page arguments the same way ``paginate(error_out=False)`` does"""
+    if page is None or page < 1:
+        page = 1
+    if per_page is None or per_page < 1:
+        per_page = 20
+    return page, per_page
+
+def build_pagination(page, per_page, total):
+    """Build the pagination block returned by the list endpoints"""
+    pages = ceil(total / per_page) if total else 0
+    return {
+        'page': page,
+        'pages': pages,
+        'per_page': per_page,
+        'total': total,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    return token.decode().rstrip('=')
+
+def decode_cursor(token, types=None):
+    """Decode a cursor, converting its values to ``types``; raises ``ValueError``"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or (types is not None and len(values) != len(types)):
+            raise ValueError
+        if types is None:
+            return values
+        return [datetime.fromisoformat(value) if kind is datetime else kind(value)
+                for value, kind in zip(values, types)]
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+def keyset_before(columns, values):
+    """Filter for rows after ``values`` in a descending ``(column, id)`` ordering"""
+    (column, id_column), (value, id_value) = columns, values
+    return or_(column < value, and_(column == value, id_column < id_value))
+
+def build_cursor_pagination(per_page, next_cursor, total=None):
+    """Build the pagination block returned in keyset mode"""
+    pagination = {
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None
+    }
+    if total is not None:
+        pagination['total'] = total
+    return pagination
+
+def wants_total():
+    """Whether a keyset request asked for the total count"""
+    return request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+
+def cached_count(key, count):
+    """Return a cached total for ``key``, calling ``count()`` on a miss"""
+    total = count_cache.get(key)
+    if total is None:
+        total = count()
+        count_cache.set(key, total)
+    return total
+
+def filter_key(*ignored):
+    """Cache key for the current request's filters (pagination arguments excluded)"""
+    ignored = set(ignored) | {'cursor', 'page', 'per_page', 'include_total'}
+    return tuple(sorted((name, value) for name, value in request.args.items(multi=True) if name not in ignored))
+
+def _drop_booking_counts(keys):
+    count_cache.discard_where(lambda key: key[0] == 'bookings')
+
+def _drop_review_counts(provider_ids):
+    count_cache.discard_where(lambda key: key[0] == 'reviews' and key[1] in provider_ids)
+
+change_feed.subscribe('booking', _drop_booking_counts)
+change_feed.subscribe('review', _drop_review_counts)
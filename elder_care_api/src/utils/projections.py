@@ -0,0 +1,184 @@
+from sqlalchemy import select
+from src.models.care_models import db, User, ProviderProfile, Service, Booking, Elder, CarePlan, Review, Message
+
+# Column projections for list endpoints.
+#
+# Each ``Projection`` names the columns of one model that a response needs and
+# how to convert them, mirroring the model's ``to_dict`` (or the summary dicts
+# built in the routes). List endpoints select exactly those columns with one
+# joined Core ``select()`` per page, plus one batched query per one-to-many
+# relationship, and build the JSON dicts straight from the row tuples instead
+# of hydrating ORM objects and lazy-loading their relationships row by row.
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+def enum_value(value):
+    return value.value if value is not None else None
+
+def float_or_none(value):
+    return float(value) if value else None
+
+def identity(value):
+    return value
+
+class Projection:
+    """The columns of one model needed to build a response dict"""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = [field if isinstance(field, tuple) else (field, identity) for field in fields]
+
+    def columns(self, prefix, entity=None):
+        """Labelled columns for a select, prefixed so several projections can share a row"""
+        entity = entity if entity is not None else self.model
+        return [getattr(entity, name).label(f'{prefix}__{name}') for name, _ in self.fields]
+
+    def to_dict(self, row, prefix):
+        """Build the response dict from a row selected with ``columns(prefix)``"""
+        mapping = row._mapping
+        return {name: convert(mapping[f'{prefix}__{name}']) for name, convert in self.fields}
+
+USER = Projection(User, [
+    'id', 'username', 'email', 'first_name', 'last_name', 'phone',
+    ('role', enum_value), ('created_at', isoformat), 'is_active'
+])
+
+PROVIDER = Projection(ProviderProfile, [
+    'id', 'user_id', ('provider_type', enum_value), 'business_name', 'license_number',
+    'certifications', 'specialties', 'description', 'address', 'city', 'state', 'zip_code',
+    ('hourly_rate', float_or_none), ('daily_rate', float_or_none), 'is_verified',
+    ('verification_date', isoformat), 'rating', 'total_reviews', 'availability_schedule',
+    ('created_at', isoformat)
+])
+
+SERVICE = Projection(Service, [
+    'id', 'provider_id', ('service_type', enum_value), 'name', 'description',
+    ('price', float_or_none), 'duration_minutes', 'is_active', ('created_at', isoformat)
+])
+
+BOOKING = Projection(Booking, [
+    'id', 'family_user_id', 'provider_id', 'service_id', 'elder_id',
+    ('scheduled_date', isoformat), 'duration_minutes', ('status', enum_value),
+    ('total_cost', float_or_none), 'special_instructions', ('created_at', isoformat),
+    ('updated_at', isoformat)
+])
+
+PROVIDER_SUMMARY = Projection(ProviderProfile, [
+    'id', 'business_name', ('provider_type', enum_value), 'rating', 'is_verified'
+])
+
+PROVIDER_BRIEF = Projection(ProviderProfile, ['id', 'business_name', ('provider_type', enum_value)])
+
+PERSON_SUMMARY = Projection(User, ['id', 'first_name', 'last_name'])
+
+ELDER_SUMMARY = Projection(Elder, ['id', 'first_name', 'last_name'])
+
+CARE_PLAN_SUMMARY = Projection(CarePlan, ['id', 'name', 'description', 'care_goals', ('updated_at', isoformat)])
+
+REVIEW = Projection(Review, [
+    'id', 'booking_id', 'provider_id', 'family_user_id', 'rating', 'comment',
+    ('created_at', isoformat)
+])
+
+MESSAGE = Projection(Message, [
+    'id', 'sender_id', 'recipient_id', 'booking_id', 'subject', 'content', 'is_read',
+    ('created_at', isoformat)
+])
+
+REVIEWER = Projection(User, ['first_name', ('last_name', lambda value: value[0] + '.')])  # Privacy protection
+
+def active_services_by_provider(provider_ids):
+    """Return ``{provider_id: [service dict, ...]}`` for the active services of some providers"""
+    services = {provider_id: [] for provider_id in provider_ids}
+    if not provider_ids:
+        return services
+    query = select(*SERVICE.columns('service'))\
+        .where(Service.provider_id.in_(provider_ids), Service.is_active == True)\
+        .order_by(Service.provider_id, Service.id)
+    for row in db.session.execute(query):
+        service = SERVICE.to_dict(row, 'service')
+        services[service['provider_id']].append(service)
+    return services
+
+def provider_cards(provider_ids):
+    """Provider dicts with ``user`` and active ``services``, in the order of ``provider_ids``"""
+    if not provider_ids:
+        return []
+    query = select(*PROVIDER.columns('provider'), *USER.columns('user'))\
+        .join(User, User.id == ProviderProfile.user_id)\
+        .where(ProviderProfile.id.in_(provider_ids))
+    cards = {}
+    for row in db.session.execute(query):
+        provider_data = PROVIDER.to_dict(row, 'provider')
+        provider_data['user'] = USER.to_dict(row, 'user')
+        cards[provider_data['id']] = provider_data
+    services = active_services_by_provider(list(cards))
+    result = []
+    for provider_id in provider_ids:
+        if provider_id in cards:
+            cards[provider_id]['services'] = services[provider_id]
+            result.append(cards[provider_id])
+    return result
+
+def booking_list_select():
+    """Select for ``get_bookings`` rows: booking, service, provider summary and elder"""
+    return select(
+        *BOOKING.columns('booking'), *SERVICE.columns('service'),
+        *PROVIDER_SUMMARY.columns('provider'), *ELDER_SUMMARY.columns('elder')
+    ).select_from(Booking)\
+        .join(Service, Service.id == Booking.service_id)\
+        .join(ProviderProfile, ProviderProfile.id == Booking.provider_id)\
+        .join(Elder, Elder.id == Booking.elder_id)
+
+def booking_list_item(row):
+    booking_data = BOOKING.to_dict(row, 'booking')
+    booking_data['service'] = SERVICE.to_dict(row, 'service')
+    booking_data['provider'] = PROVIDER_SUMMARY.to_dict(row, 'provider')
+    booking_data['elder'] = ELDER_SUMMARY.to_dict(row, 'elder')
+    return booking_data
+
+def upcoming_booking_select(user_type):
+    """Select for ``get_upcoming_bookings`` rows; the counterpart depends on ``user_type``"""
+    counterpart = PROVIDER_BRIEF.columns('provider') if user_type == 'family' else PERSON_SUMMARY.columns('family_user')
+    query = select(
+        *BOOKING.columns('booking'), *SERVICE.columns('service'),
+        *counterpart, *ELDER_SUMMARY.columns('elder')
+    ).select_from(Booking)\
+        .join(Service, Service.id == Booking.service_id)\
+        .join(Elder, Elder.id == Booking.elder_id)
+    if user_type == 'family':
+        return query.join(ProviderProfile, ProviderProfile.id == Booking.provider_id)
+    return query.join(User, User.id == Booking.family_user_id)
+
+def upcoming_booking_item(row, user_type):
+    booking_data = BOOKING.to_dict(row, 'booking')
+    booking_data['service'] = SERVICE.to_dict(row, 'service')
+    if user_type == 'family':
+        booking_data['provider'] = PROVIDER_BRIEF.to_dict(row, 'provider')
+    else:
+        booking_data['family_user'] = PERSON_SUMMARY.to_dict(row, 'family_user')
+    booking_data['elder'] = ELDER_SUMMARY.to_dict(row, 'elder')
+    return booking_data
+
+def review_list_select():
+    """Select for review rows with the reviewer's (abbreviated) name"""
+    return select(*REVIEW.columns('review'), *REVIEWER.columns('family_user'))\
+        .select_from(Review)\
+        .join(User, User.id == Review.family_user_id)
+
+def review_list_item(row):
+    review_data = REVIEW.to_dict(row, 'review')
+    review_data['family_user'] = REVIEWER.to_dict(row, 'family_user')
+    return review_data
+
+def message_list_select():
+    """Select for message rows with the sender's name"""
+    return select(*MESSAGE.columns('message'), *PERSON_SUMMARY.columns('sender'))\
+        .select_from(Message)\
+        .join(User, User.id == Message.sender_id)
+
+def message_list_item(row):
+    message_data = MESSAGE.to_dict(row, 'message')
+    message_data['sender'] = PERSON_SUMMARY.to_dict(row, 'sender')
+    return message_data
@@ -0,0 +1,500 @@
+import threading
+import time
+import numpy as np
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from contextlib import contextmanager
+from sqlalchemy import select
+from src.models.care_models import db, ProviderProfile, Service, ServiceType, User
+from src.utils import change_feed
+from src.utils.geo import locations, DEFAULT_RADIUS_KM
+
+# In-process provider catalog index.
+#
+# Every provider gets a dense slot number. Filters are answered with posting
+# bitsets (Python ints, bit ``slot`` set when the provider matches) that are
+# AND-ed together, and range filters on rating / hourly rate come from sorted
+# ``(value, slot)`` arrays. Writes committed through the ORM mark providers
+# stale via ``change_feed`` and they are reloaded on the next read, so a
+# search never issues more than the handful of queries needed to refresh them.
+#
+# Writes made by other processes are not observed; set
+# ``PROVIDER_INDEX_MAX_AGE`` (seconds) to rebuild periodically when running
+# several workers (production mode defaults it to a minute).
+
+ProviderRecord = namedtuple('ProviderRecord', [
+    'id', 'user_id', 'provider_type', 'city', 'city_key', 'state_key', 'zip_code',
+    'is_verified', 'is_active', 'rating', 'total_reviews', 'hourly_rate', 'service_types',
+    'location_key', 'latitude', 'longitude'
+])
+
+FACET_FIELDS = ('provider_type', 'service_type', 'city', 'state', 'verified')
+POSTING_FIELDS = FACET_FIELDS + ('zip_code', 'location')
+
+# Bit position of each service type in the ``service_mask`` column
+SERVICE_TYPE_BITS = {service_type: bit for bit, service_type in enumerate(ServiceType)}
+
+COLUMN_DTYPES = {
+    'id': np.int64,
+    'is_verified': np.bool_,
+    'rating': np.float64,
+    'total_reviews': np.int64,
+    'hourly_rate': np.float64,
+    'service_mask': np.int64,
+    'latitude': np.float64,
+    'longitude': np.float64,
+}
+
+def normalize(value):
+    """Normalize a location string for index lookups"""
+    if value is None:
+        return None
+    value = ' '.join(str(value).split()).casefold()
+    return value or None
+
+def bits_from_slots(slots, size):
+    """Build a bitset from an iterable of slot numbers"""
+    buffer = bytearray((size >> 3) + 1)
+    for slot in slots:
+        buffer[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buffer, 'little')
+
+def slots_from_bits(bits):
+    """List the slot numbers set in a bitset, in ascending order"""
+    return slot_array(bits).tolist()
+
+def slot_array(bits):
+    """Return the slot numbers set in a bitset as a NumPy array"""
+    if not bits:
+        return np.empty(0, dtype=np.int64)
+    buffer = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) >> 3, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(buffer, bitorder='little'))
+
+def bits_from_flags(flags):
+    """Build a bitset from a boolean NumPy array indexed by slot"""
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+def column_values(record):
+    """Return the numeric column values stored for a record"""
+    service_mask = 0
+    for service_type in record.service_types:
+        service_mask |= 1 << SERVICE_TYPE_BITS[service_type]
+    return {
+        'id': record.id,
+        'is_verified': record.is_verified,
+        'rating': record.rating or 0.0,
+        'total_reviews': record.total_reviews,
+        'hourly_rate': record.hourly_rate if record.hourly_rate is not None else np.nan,
+        'service_mask': service_mask,
+        'latitude': record.latitude if record.latitude is not None else np.nan,
+        'longitude': record.longitude if record.longitude is not None else np.nan,
+    }
+
+class ProviderSearchResult:
+    """A set of matching providers, held as a bitset over index slots"""
+
+    def __init__(self, index, bits):
+        self.index = index
+        self.bits = bits
+
+    @property
+    def count(self):
+        return self.bits.bit_count()
+
+    def slots(self):
+        return slots_from_bits(self.bits)
+
+    def slot_array(self):
+        return slot_array(self.bits)
+
+    def records(self):
+        records = self.index._records
+        return [records[slot] for slot in self.slots()]
+
+    def ids(self):
+        return sorted(record.id for record in self.records())
+
+    def ordered(self, provider_ids):
+        """Filter an externally ranked id list down to the matching providers"""
+        slots = self.index._slots
+        bits = self.bits
+        return [
+            provider_id for provider_id in provider_ids
+            if provider_id in slots and bits >> slots[provider_id] & 1
+        ]
+
+    def facets(self):
+        return self.index.facets(self.bits)
+
+    def restrict(self, bits):
+        """The matching providers that are also set in ``bits``"""
+        return ProviderSearchResult(self.index, self.bits & bits)
+
+class ProviderCatalogIndex:
+    """Posting-list index over active providers and their active services"""
+
+    def __init__(self):
+        self.lock = self._lock = threading.RLock()
+        self._engine_id = None
+        self._built_at = 0.0
+        # Bumped on every full rebuild, when slot numbers are reassigned
+        self.generation = 0
+        # Depth of ``snapshot`` blocks held by the thread holding the lock
+        self._snapshots = 0
+        self._stale_providers = set()
+        self._stale_users = set()
+        self._reset()
+        change_feed.subscribe('provider', self._mark_providers_stale)
+        change_feed.subscribe('user', self._mark_users_stale)
+
+    def _reset(self):
+        self._slots = {}
+        self._user_slots = {}
+        self._records = []
+        self._postings = {field: {} for field in POSTING_FIELDS}
+        self._labels = {'city': {}, 'state': {}}
+        self._active = 0
+        self._rating = []
+        self._hourly_rate = []
+        self._columns = None
+
+    # -- maintenance --------------------------------------------------------
+
+    def _mark_providers_stale(self, provider_ids):
+        with self._lock:
+            self._stale_providers.update(provider_ids)
+
+    def _mark_users_stale(self, user_ids):
+        with self._lock:
+            self._stale_users.update(user_ids)
+
+    def invalidate(self):
+        """Force a full rebuild on the next read"""
+        with self._lock:
+            self._engine_id = None
+
+    @contextmanager
+    def snapshot(self):
+        """Hold the index still for a group of reads
+
+        The index is brought up to date once, on entry; reads inside the block
+        (``search``, ``columns``, the free-slot index) skip their own freshness
+        check, so slot numbers and result bitsets stay valid across all of them.
+        """
+        with self._lock:
+            self.ensure_fresh()
+            self._snapshots += 1
+            try:
+                yield self
+            finally:
+                self._snapshots -= 1
+
+    def ensure_fresh(self):
+        """Build the index or reload stale providers before answering a read"""
+        from flask import current_app
+        with self._lock:
+            if self._snapshots:
+                return
+            max_age = current_app.config.get('PROVIDER_INDEX_MAX_AGE')
+            expired = max_age is not None and time.monotonic() - self._built_at > max_age
+            if self._engine_id != id(db.engine) or expired:
+                self.rebuild()
+                return
+            if self._stale_users:
+                for user_id in self._stale_users:
+                    slot = self._user_slots.get(user_id)
+                    if slot is not None:
+                        self._stale_providers.add(self._records[slot].id)
+                users = list(self._stale_users)
+                self._stale_users.clear()
+                self._stale_providers.update(db.session.execute(
+                    select(ProviderProfile.id).where(ProviderProfile.user_id.in_(users))
+                ).scalars())
+            if self._stale_providers:
+                provider_ids = list(self._stale_providers)
+                self._stale_providers.clear()
+                self._refresh(provider_ids)
+
+    def rebuild(self):
+        """Load every provider and service into a fresh index"""
+        with self._lock:
+            self._reset()
+            self._stale_providers.clear()
+            self._stale_users.clear()
+            records = self._load(None)
+            for slot, record in enumerate(records):
+                self._slots[record.id] = slot
+                self._user_slots[record.user_id] = slot
+                self._records.append(record)
+            self._build_postings()
+            self._engine_id = id(db.engine)
+            self._built_at = time.monotonic()
+            self.generation += 1
+
+    def _load(self, provider_ids):
+        """Fetch provider records, optionally restricted to some ids"""
+        profile_query = select(
+            ProviderProfile.id, ProviderProfile.user_id, ProviderProfile.provider_type,
+            ProviderProfile.city, ProviderProfile.state, ProviderProfile.zip_code,
+            ProviderProfile.is_verified, User.is_active, ProviderProfile.rating,
+            ProviderProfile.total_reviews, ProviderProfile.hourly_rate
+        ).join(User, User.id == ProviderProfile.user_id).order_by(ProviderProfile.id)
+        service_query = select(Service.provider_id, Service.service_type)\
+            .where(Service.is_active == True).distinct()
+        if provider_ids is not None:
+            profile_query = profile_query.where(ProviderProfile.id.in_(provider_ids))
+            service_query = service_query.where(Service.provider_id.in_(provider_ids))
+
+        services = {}
+        for provider_id, service_type in db.session.execute(service_query):
+            services.setdefault(provider_id, set()).add(service_type)
+
+        records = []
+        for row in db.session.execute(profile_query):
+            location_key, latitude, longitude = locations.resolve(row.zip_code, row.city) or (None, None, None)
+            records.append(ProviderRecord(
+                id=row.id,
+                user_id=row.user_id,
+                provider_type=row.provider_type,
+                city=row.city,
+                city_key=normalize(row.city),
+                state_key=normalize(row.state),
+                zip_code=row.zip_code.strip() if row.zip_code else None,
+                is_verified=bool(row.is_verified),
+                is_active=bool(row.is_active),
+                rating=row.rating,
+                total_reviews=row.total_reviews or 0,
+                hourly_rate=float(row.hourly_rate) if row.hourly_rate is not None else None,
+                service_types=frozenset(services.get(row.id, ())),
+                location_key=location_key,
+                latitude=latitude,
+                longitude=longitude
+            ))
+        return records
+
+    def _record_keys(self, record):
+        """Yield ``(field, value)`` posting keys for a record"""
+        yield 'provider_type', record.provider_type
+        yield 'verified', record.is_verified
+        for service_type in record.service_types:
+            yield 'service_type', service_type
+        if record.city_key:
+            yield 'city', record.city_key
+        if record.state_key:
+            yield 'state', record.state_key
+        if record.zip_code:
+            yield 'zip_code', record.zip_code
+        if record.location_key:
+            yield 'location', record.location_key
+
+    def _build_postings(self):
+        size = len(self._records)
+        slot_lists = {}
+        active = []
+        for slot, record in enumerate(self._records):
+            if record is None:
+                continue
+            if record.is_active:
+                active.append(slot)
+            for key in self._record_keys(record):
+                slot_lists.setdefault(key, []).append(slot)
+            self._remember_labels(record)
+        self._postings = {field: {} for field in POSTING_FIELDS}
+        for (field, value), slots in slot_lists.items():
+            self._postings[field][value] = bits_from_slots(slots, size)
+        self._active = bits_from_slots(active, size)
+        self._rating = sorted(
+            (record.rating, slot) for slot, record in enumerate(self._records)
+            if record is not None and record.rating is not None
+        )
+        self._hourly_rate = sorted(
+            (record.hourly_rate, slot) for slot, record in enumerate(self._records)
+            if record is not None and record.hourly_rate is not None
+        )
+
+    def _remember_labels(self, record):
+        if record.city_key:
+            self._labels['city'].setdefault(record.city_key, record.city.strip())
+        if record.state_key:
+            self._labels['state'].setdefault(record.state_key, record.state_key.upper())
+
+    def _refresh(self, provider_ids):
+        """Replace the index entries of the given providers"""
+        fresh = {record.id: record for record in self._load(provider_ids)}
+        for provider_id in provider_ids:
+            slot = self._slots.get(provider_id)
+            if slot is not None:
+                self._remove(slot)
+            record = fresh.get(provider_id)
+            if record is None:
+                self._slots.pop(provider_id, None)
+                continue
+            if slot is None:
+                slot = len(self._records)
+                self._records.append(None)
+                self._slots[provider_id] = slot
+            self._insert(slot, record)
+
+    def _remove(self, slot):
+        record = self._records[slot]
+        if record is None:
+            return
+        mask = ~(1 << slot)
+        for field, value in self._record_keys(record):
+            self._postings[field][value] &= mask
+        self._active &= mask
+        if record.rating is not None:
+            position = bisect_left(self._rating, (record.rating, slot))
+            del self._rating[position]
+        if record.hourly_rate is not None:
+            position = bisect_left(self._hourly_rate, (record.hourly_rate, slot))
+            del self._hourly_rate[position]
+        self._user_slots.pop(record.user_id, None)
+        self._records[slot] = None
+        self._update_columns(slot, None)
+
+    def _insert(self, slot, record):
+        bit = 1 << slot
+        for field, value in self._record_keys(record):
+            postings = self._postings[field]
+            postings[value] = postings.get(value, 0) | bit
+        if record.is_active:
+            self._active |= bit
+        if record.rating is not None:
+            insort(self._rating, (record.rating, slot))
+        if record.hourly_rate is not None:
+            insort(self._hourly_rate, (record.hourly_rate, slot))
+        self._remember_labels(record)
+        self._user_slots[record.user_id] = slot
+        self._records[slot] = record
+        self._update_columns(slot, record)
+
+    def _update_columns(self, slot, record):
+        columns = self._columns
+        if columns is None:
+            return
+        if slot >= len(columns['id']):
+            size = max(slot + 1, 2 * len(columns['id']))
+            for name, array in columns.items():
+                # Spare rows belong to no provider yet
+                grown = np.full(size, -1 if name == 'id' else 0, dtype=array.dtype)
+                grown[:len(array)] = array
+                columns[name] = grown
+        values = column_values(record) if record is not None else {'id': -1}
+        for name, array in columns.items():
+            array[slot] = values.get(name, 0)
+
+    @property
+    def size(self):
+        """Number of slots, including those of removed providers"""
+        return len(self._records)
+
+    def slot_of(self, provider_id):
+        return self._slots.get(provider_id)
+
+    def slots_for(self, provider_ids):
+        """Return the index slots of the given providers as a NumPy array"""
+        with self._lock:
+            return np.array([self._slots[provider_id] for provider_id in provider_ids
+                             if provider_id in self._slots], dtype=np.int64)
+
+    def columns(self):
+        """Return per-slot NumPy arrays of the fields used for match scoring
+
+        Callers should hold ``lock`` while reading them; rows of removed
+        providers have ``id == -1``.
+        """
+        with self._lock:
+            if self._columns is None:
+                rows = [column_values(record) if record is not None else {'id': -1}
+                        for record in self._records]
+                self._columns = {
+                    name: np.array([row.get(name, 0) for row in rows], dtype=dtype)
+                    for name, dtype in COLUMN_DTYPES.items()
+                }
+            return self._columns
+
+    # -- queries ------------------------------------------------------------
+
+    def _range_bits(self, array, low=None, high=None):
+        start = bisect_left(array, (low,)) if low is not None else 0
+        end = bisect_right(array, (high, float('inf'))) if high is not None else len(array)
+        return bits_from_slots((slot for _, slot in array[start:end]), len(self._records))
+
+    def _substring_bits(self, field, needle):
+        needle = normalize(needle)
+        bits = 0
+        for value, posting in self._postings[field].items():
+            if needle in value:
+                bits |= posting
+        return bits
+
+    def search(self, provider_type=None, service_types=None, city=None, state=None, zip_code=None,
+               verified_only=False, min_rating=None, min_hourly=None, max_hourly=None,
+               provider_ids=None, near=None, radius_km=None):
+        """Return the active providers matching every given criterion
+
+        ``city`` and ``state`` match case-insensitive substrings like the
+        previous ``ilike('%...%')`` filters, ``service_types`` matches providers
+        offering any of the listed types through an active service and
+        ``provider_ids`` restricts the result to an explicit set of providers.
+        ``near`` is a ``(latitude, longitude)`` pair; providers whose location
+        centroid lies within ``radius_km`` of it match.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            bits = self._active
+            if provider_type is not None:
+                bits &= self._postings['provider_type'].get(provider_type, 0)
+            if service_types is not None:
+                service_bits = 0
+                for service_type in service_types:
+                    service_bits |= self._postings['service_type'].get(service_type, 0)
+                bits &= service_bits
+            if city:
+                bits &= self._substring_bits('city', city)
+            if state:
+                bits &= self._substring_bits('state', state)
+            if zip_code:
+                bits &= self._postings['zip_code'].get(str(zip_code).strip(), 0)
+            if verified_only:
+                bits &= self._postings['verified'].get(True, 0)
+            if min_rating is not None:
+                bits &= self._range_bits(self._rating, low=min_rating)
+            if min_hourly is not None or max_hourly is not None:
+                bits &= self._range_bits(self._hourly_rate, low=min_hourly, high=max_hourly)
+            if near is not None:
+                radius = radius_km if radius_km is not None else DEFAULT_RADIUS_KM
+                location_bits = 0
+                for location_key in locations.within(near[0], near[1], radius):
+                    location_bits |= self._postings['location'].get(location_key, 0)
+                bits &= location_bits
+            if provider_ids is not None:
+                slots = self._slots
+                bits &= bits_from_slots(
+                    (slots[provider_id] for provider_id in provider_ids if provider_id in slots),
+                    len(self._records)
+                )
+            return ProviderSearchResult(self, bits)
+
+    def facets(self, bits):
+        """Count matching providers per value of each facet field"""
+        with self._lock:
+            result = {}
+            for field in FACET_FIELDS:
+                counts = {}
+                for value, posting in self._postings[field].items():
+                    count = (bits & posting).bit_count()
+                    if not count:
+                        continue
+                    if field in self._labels:
+                        label = self._labels[field].get(value, value)
+                    elif field == 'verified':
+                        label = 'true' if value else 'false'
+                    else:
+                        label = value.value
+                    counts[label] = counts.get(label, 0) + count
+                result[field] = counts
+            return result
+
+provider_index = ProviderCatalogIndex()
@@ -0,0 +1,115 @@
+import logging
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from src.utils.metrics import normalize_sql
+
+# Per-route SQL query budgets and N+1 detection.
+#
+# A view declares how many statements one request may run with
+# ``@query_budget(n)``; the number should not depend on the page size, so a
+# lazy relationship loaded once per row (``booking.service`` in a loop)
+# breaks it as soon as a page holds more than a few rows. Independently of
+# budgets, a statement that runs ``QUERY_REPEAT_THRESHOLD`` or more times in
+# one request with different parameters is reported as a likely N+1.
+#
+# ``QUERY_BUDGET_MODE`` is ``'raise'`` (violations raise
+# ``QueryBudgetExceeded`` out of the request, failing a test), ``'warn'``
+# (they are logged) or ``'off'``. Left unset it is ``'raise'`` when the app
+# is testing, ``'warn'`` in debug mode and ``'off'`` otherwise. Statements a
+# streamed response runs after the view has returned are not counted.
+
+DEFAULTS = {
+    'QUERY_BUDGET_MODE': None,
+    'QUERY_REPEAT_THRESHOLD': 5,
+}
+
+MODES = ('raise', 'warn', 'off')
+
+# Transaction control (the production mode's BEGIN) is not counted
+UNCOUNTED = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'PRAGMA')
+
+logger = logging.getLogger(__name__)
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more statements than its route allows, or an N+1 pattern"""
+
+def query_budget(max_queries):
+    """Declare that a view runs at most ``max_queries`` SQL statements per request"""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+def budget_mode(app):
+    mode = app.config.get('QUERY_BUDGET_MODE')
+    if mode is None:
+        return 'raise' if app.testing else 'warn' if app.debug else 'off'
+    if mode not in MODES:
+        raise ValueError(f'QUERY_BUDGET_MODE must be one of {", ".join(MODES)}')
+    return mode
+
+class QueryLog:
+    """Statements run by one request, grouped by normalized SQL"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = {}
+
+    def add(self, statement, parameters):
+        self.count += 1
+        key = normalize_sql(statement)
+        entry = self.statements.get(key)
+        if entry is None:
+            entry = self.statements[key] = [0, set()]
+        entry[0] += 1
+        entry[1].add(repr(parameters))
+
+    def repeated(self, threshold):
+        """``(normalized SQL, runs)`` of statements run ``threshold`` times with different parameters"""
+        return [(sql, runs) for sql, (runs, parameters) in self.statements.items()
+                if runs >= threshold and len(parameters) > 1]
+
+def violations(query_log, budget, threshold):
+    problems = []
+    if budget is not None and query_log.count > budget:
+        problems.append(f'{query_log.count} SQL statements, budget is {budget}')
+    for sql, runs in query_log.repeated(threshold):
+        problems.append(f'possible N+1: {runs} runs of {sql[:300]}')
+    return problems
+
+def _install_engine_events(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            query_log = g.get('query_log')
+            if query_log is not None and not statement.lstrip().upper().startswith(UNCOUNTED):
+                query_log.add(statement, parameters)
+
+def init_app(app, db):
+    """Check the query budgets of ``app``'s views against the engines of ``db``"""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    budget_mode(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            _install_engine_events(engine)
+
+    @app.before_request
+    def _start_query_log():
+        if budget_mode(current_app) != 'off':
+            g.query_log = QueryLog()
+
+    @app.after_request
+    def _check_query_budget(response):
+        query_log = g.pop('query_log', None)
+        if query_log is None:
+            return response
+        view = current_app.view_functions.get(request.endpoint)
+        problems = violations(query_log, getattr(view, 'query_budget', None),
+                              current_app.config['QUERY_REPEAT_THRESHOLD'])
+        if problems:
+            message = f'{request.method} {request.full_path.rstrip("?")} ({request.endpoint}): ' + '; '.join(problems)
+            if budget_mode(current_app) == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning('query budget: %s', message)
+        return response
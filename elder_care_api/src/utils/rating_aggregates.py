@@ -0,0 +1,82 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, update, case
+from src.models.care_models import db, ProviderProfile, Review
+from src.utils.counters import IncrementalCounter
+
+# Incrementally maintained review aggregates on provider profiles.
+#
+# Every flush that inserts, edits or deletes a ``Review`` applies the change
+# in rating sum, review count and 1-5 star histogram to the affected providers
+# with a single relative UPDATE each (see ``counters.IncrementalCounter``), so
+# the aggregates commit or roll back together with the review. ``rating`` and
+# ``total_reviews`` are derived from them and are what reads (``get_provider``,
+# the catalog index and match scoring) use.
+
+STARS = (1, 2, 3, 4, 5)
+
+providers = ProviderProfile.__table__
+
+def _star_column(stars):
+    return providers.c[f'rating_{stars}_count']
+
+def _add(deltas, provider_id, rating, sign):
+    if provider_id is None or rating is None:
+        return
+    delta = deltas.setdefault(provider_id, {'count': 0, 'sum': 0, 'stars': dict.fromkeys(STARS, 0)})
+    delta['count'] += sign
+    delta['sum'] += sign * rating
+    if rating in delta['stars']:
+        delta['stars'][rating] += sign
+
+def apply_deltas(connection, deltas):
+    """Apply aggregate deltas with relative UPDATEs and recompute the mean rating"""
+    for provider_id, delta in deltas.items():
+        count = func.coalesce(providers.c.total_reviews, 0) + delta['count']
+        total = func.coalesce(providers.c.rating_sum, 0.0) + delta['sum']
+        values = {
+            'total_reviews': count,
+            'rating_sum': total,
+            'rating': case((count > 0, func.round(total / count, 2)), else_=0.0),
+        }
+        for stars, change in delta['stars'].items():
+            if change:
+                values[f'rating_{stars}_count'] = func.coalesce(_star_column(stars), 0) + change
+        connection.execute(update(providers).where(providers.c.id == provider_id).values(**values))
+
+aggregates = IncrementalCounter(
+    'rating', Review, (Review.provider_id, Review.rating), _add, apply_deltas,
+    ProviderProfile, ['rating', 'total_reviews', 'rating_sum'] + [f'rating_{stars}_count' for stars in STARS]
+)
+
+def rebuild(connection):
+    """Recompute every provider's aggregates from the reviews table"""
+    reviews = Review.__table__
+
+    def of_provider(expression, *conditions):
+        return select(expression).where(reviews.c.provider_id == providers.c.id, *conditions)\
+            .correlate(providers).scalar_subquery()
+
+    count = of_provider(func.count())
+    total = of_provider(func.coalesce(func.sum(reviews.c.rating), 0))
+    values = {
+        'total_reviews': count,
+        'rating_sum': total,
+        'rating': case((count > 0, func.round(total * 1.0 / count, 2)), else_=0.0),
+    }
+    for stars in STARS:
+        values[f'rating_{stars}_count'] = of_provider(func.count(), reviews.c.rating == stars)
+    return connection.execute(update(providers).values(**values)).rowcount
+
+@click.command('rebuild-ratings')
+@with_appcontext
+def rebuild_ratings_command():
+    """Recompute provider rating aggregates from all reviews"""
+    updated = rebuild(db.session.connection())
+    db.session.commit()
+    # Bulk UPDATE bypasses the change feed; rebuild the catalog index and drop cached responses
+    from src.utils.provider_index import provider_index
+    from src.utils.response_cache import response_cache
+    provider_index.invalidate()
+    response_cache.invalidate()
+    click.echo(f'Rebuilt rating aggregates for {updated} providers.')
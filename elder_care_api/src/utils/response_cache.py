@@ -0,0 +1,133 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+from flask import current_app, request, make_response
+from src.utils import change_feed
+from src.utils.cache import TTLCache
+
+# Cache of rendered JSON responses for the provider read endpoints and the
+# dashboards.
+#
+# Entries are keyed on the request path and its sorted query arguments and
+# remember the version of every scope the response was built from: one
+# counter per provider (bumped when its profile, services or reviews change),
+# one for the whole catalog (bumped by any provider change, for listings),
+# one for user records (names and active flags appear in every response),
+# one per provider for its bookings, and one per user for the bookings they
+# made and the messages they received. Versions are read before the view
+# runs, so a write committed while a response is being built leaves the entry
+# stale rather than wrong. Views whose output also depends on the clock
+# (upcoming bookings) pass ``max_age``. Every response carries a strong ETag
+# and a Last-Modified date, and conditional requests are answered with
+# ``304 Not Modified``.
+#
+# Version counters only see commits made by this process. So that writes from
+# other workers show up too, every entry is also rebuilt once it is
+# ``RESPONSE_CACHE_MAX_AGE`` seconds old (config, default
+# ``DEFAULT_MAX_AGE``; ``None`` turns the limit off for single-process
+# deployments).
+
+CATALOG = 'catalog'
+USERS = 'users'
+
+# Seconds an entry is served for when the app sets no RESPONSE_CACHE_MAX_AGE
+DEFAULT_MAX_AGE = 60
+
+def provider_scope(provider_id):
+    return ('provider', provider_id)
+
+def provider_bookings_scope(provider_id):
+    return ('provider_bookings', provider_id)
+
+def user_scope(user_id):
+    return ('user', user_id)
+
+class ResponseCache:
+    """Bounded LRU cache of 200 responses, invalidated by version counters"""
+
+    def __init__(self, maxsize=1024):
+        self.entries = TTLCache(maxsize, ttl=None)
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._started_at = time.time()
+        change_feed.subscribe('provider', self._providers_changed)
+        change_feed.subscribe('user', self._users_changed)
+        change_feed.subscribe('booking', self._bookings_changed)
+        change_feed.subscribe('message', self._messages_changed)
+
+    def version(self, scope):
+        """``(counter, modified_at)`` of a scope"""
+        with self._lock:
+            return self._versions.get(scope, (0, self._started_at))
+
+    def bump(self, scopes):
+        now = time.time()
+        with self._lock:
+            for scope in scopes:
+                counter, _ = self._versions.get(scope, (0, self._started_at))
+                self._versions[scope] = (counter + 1, now)
+
+    def invalidate(self):
+        """Drop every entry (after writes the change feed does not see)"""
+        # Every response depends on the user scope
+        self.bump([CATALOG, USERS])
+        self.entries.clear()
+
+    def _providers_changed(self, provider_ids):
+        self.bump([CATALOG] + [provider_scope(provider_id) for provider_id in provider_ids])
+
+    def _users_changed(self, user_ids):
+        self.bump([USERS])
+
+    def _bookings_changed(self, keys):
+        scopes = set()
+        for _, provider_id, family_user_id in keys:
+            scopes.update((provider_bookings_scope(provider_id), user_scope(family_user_id)))
+        self.bump(scopes)
+
+    def _messages_changed(self, recipient_ids):
+        self.bump([user_scope(user_id) for user_id in recipient_ids])
+
+    def cached(self, scopes, max_age=None):
+        """Decorate a view whose response depends on ``scopes(**view_args)``
+
+        With ``max_age`` (seconds) an entry is rebuilt once it is that old,
+        if that is sooner than ``RESPONSE_CACHE_MAX_AGE``.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**view_args):
+                key = (request.path, tuple(sorted(request.args.items(multi=True))))
+                versions = tuple(self.version(scope) for scope in scopes(**view_args))
+                entry = self.entries.get(key)
+                limit = current_app.config.get('RESPONSE_CACHE_MAX_AGE', DEFAULT_MAX_AGE)
+                if max_age is not None and (limit is None or max_age < limit):
+                    limit = max_age
+                if entry is not None and limit is not None and time.monotonic() - entry['stored_at'] >= limit:
+                    entry = None
+                if entry is not None and entry['versions'] == versions:
+                    response = make_response(entry['body'], 200)
+                    response.mimetype = entry['mimetype']
+                    response.headers['X-Cache'] = 'HIT'
+                else:
+                    response = make_response(view(**view_args))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    body = response.get_data()
+                    entry = {
+                        'versions': versions,
+                        'body': body,
+                        'etag': hashlib.sha1(body).hexdigest(),
+                        'mimetype': response.mimetype,
+                        'stored_at': time.monotonic()
+                    }
+                    self.entries.set(key, entry)
+                    response.headers['X-Cache'] = 'MISS'
+                response.set_etag(entry['etag'])
+                response.last_modified = max(modified_at for _, modified_at in versions)
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+response_cache = ResponseCache()
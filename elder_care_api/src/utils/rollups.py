@@ -0,0 +1,127 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from src.models.care_models import db
+
+# Daily booking rollups for provider earnings and booking analytics.
+#
+# ``booking_daily_rollups`` holds, per (provider, day, service type, status),
+# the number of bookings, their scheduled minutes and their total cost, and
+# ``booking_daily_totals`` the same per (day, service type, status) across all
+# providers, so the analytics endpoints aggregate a bounded number of rows per
+# bucket instead of scanning years of bookings. Triggers on ``bookings`` apply
+# every insert, update and delete as a relative change to the affected rows
+# (an update moves the booking out of its old rows and into its new ones),
+# inside the writing statement, so the rollups commit or roll back with the
+# bookings and also cover Core bulk writes. Rows whose count drops to zero
+# are removed. A booking is counted under its service's type; changing a
+# service's type recomputes the rows of both types.
+
+ROLLUP_TABLE = 'booking_daily_rollups'
+TOTALS_TABLE = 'booking_daily_totals'
+
+_KEY = "provider_id, day, service_type, status"
+_TOTALS_KEY = "day, service_type, status"
+
+def _upsert(table, key, values, source):
+    return f"""
+        INSERT INTO {table} ({key}, bookings, minutes, revenue)
+        SELECT {values} {source}
+        ON CONFLICT ({key}) DO UPDATE SET
+            bookings = bookings + excluded.bookings,
+            minutes = minutes + excluded.minutes,
+            revenue = revenue + excluded.revenue;
+    """
+
+def _add(row, sign):
+    """Add (sign 1) or remove (sign -1) booking ``row`` (``NEW`` or ``OLD``)"""
+    values = (f"date({row}.scheduled_date), s.service_type, coalesce({row}.status, 'PENDING'), "
+              f"{sign}, {sign} * coalesce({row}.duration_minutes, 0), {sign} * coalesce({row}.total_cost, 0)")
+    # The WHERE clause also tells SQLite the ON CONFLICT belongs to the INSERT
+    source = f"FROM services s WHERE s.id = {row}.service_id"
+    return (_upsert(ROLLUP_TABLE, _KEY, f"{row}.provider_id, {values}", source)
+            + _upsert(TOTALS_TABLE, _TOTALS_KEY, values, source))
+
+def _remove(row):
+    match = (f"day = date({row}.scheduled_date) "
+             f"AND service_type = (SELECT service_type FROM services WHERE id = {row}.service_id) "
+             f"AND status = coalesce({row}.status, 'PENDING') AND bookings <= 0")
+    return f"""
+        {_add(row, -1)}
+        DELETE FROM {ROLLUP_TABLE} WHERE provider_id = {row}.provider_id AND {match};
+        DELETE FROM {TOTALS_TABLE} WHERE {match};
+    """
+
+_ROLLUP_ROWS = f"""
+    INSERT INTO {ROLLUP_TABLE} ({_KEY}, bookings, minutes, revenue)
+    SELECT b.provider_id, date(b.scheduled_date), s.service_type, coalesce(b.status, 'PENDING'),
+           count(*), sum(coalesce(b.duration_minutes, 0)), sum(coalesce(b.total_cost, 0))
+      FROM bookings b
+      JOIN services s ON s.id = b.service_id
+"""
+
+_ROLLUP_GROUP = "GROUP BY b.provider_id, date(b.scheduled_date), s.service_type, coalesce(b.status, 'PENDING')"
+
+_TOTALS_ROWS = f"""
+    INSERT INTO {TOTALS_TABLE} ({_TOTALS_KEY}, bookings, minutes, revenue)
+    SELECT {_TOTALS_KEY}, sum(bookings), sum(minutes), sum(revenue)
+      FROM {ROLLUP_TABLE}
+"""
+
+_TOTALS_GROUP = f"GROUP BY {_TOTALS_KEY}"
+
+_CHANGED_TYPES = "service_type IN (OLD.service_type, NEW.service_type)"
+
+SCHEMA = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS booking_rollup_insert
+    AFTER INSERT ON bookings BEGIN {_add('NEW', 1)} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS booking_rollup_update
+    AFTER UPDATE OF provider_id, service_id, scheduled_date, duration_minutes, status, total_cost ON bookings
+    BEGIN {_remove('OLD')} {_add('NEW', 1)} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS booking_rollup_delete
+    AFTER DELETE ON bookings BEGIN {_remove('OLD')} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS booking_rollup_service_type
+    AFTER UPDATE OF service_type ON services WHEN OLD.service_type IS NOT NEW.service_type BEGIN
+        DELETE FROM {ROLLUP_TABLE} WHERE provider_id = NEW.provider_id AND {_CHANGED_TYPES};
+        {_ROLLUP_ROWS} WHERE b.provider_id = NEW.provider_id AND s.{_CHANGED_TYPES} {_ROLLUP_GROUP};
+        DELETE FROM {TOTALS_TABLE} WHERE {_CHANGED_TYPES};
+        {_TOTALS_ROWS} WHERE {_CHANGED_TYPES} {_TOTALS_GROUP};
+    END
+    """,
+]
+
+def install(engine):
+    """Create the rollup triggers, backfilling the rollups on first install"""
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'booking_rollup_insert'")
+        ).first()
+        for statement in SCHEMA:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            rebuild(connection)
+
+def rebuild(connection):
+    """Recompute the rollups from the bookings table; returns the number of provider rows"""
+    connection.exec_driver_sql(f"DELETE FROM {ROLLUP_TABLE}")
+    connection.exec_driver_sql(f"DELETE FROM {TOTALS_TABLE}")
+    rows = connection.exec_driver_sql(f"{_ROLLUP_ROWS} {_ROLLUP_GROUP}").rowcount
+    connection.exec_driver_sql(f"{_TOTALS_ROWS} {_TOTALS_GROUP}")
+    return rows
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Recompute the daily booking rollups from all bookings"""
+    rows = rebuild(db.session.connection())
+    db.session.commit()
+    click.echo(f'Rebuilt {rows} daily booking rollup rows.')
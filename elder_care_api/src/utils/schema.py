@@ -0,0 +1,80 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from src.models.care_models import db
+from src.utils import fulltext, rollups
+
+# Schema upgrades for existing databases.
+#
+# ``db.create_all()`` only creates missing tables. ``upgrade`` also adds
+# columns and indexes that were introduced after a table was created (with an
+# optional backfill statement run right after a column appears) and installs
+# the SQLite-specific objects such as the full-text index and the booking
+# rollup triggers. The app does not
+# touch the schema when it starts; run ``flask upgrade-db`` (part of a deploy,
+# before the new workers start) to apply it.
+
+COLUMN_BACKFILLS = {
+    # Keep the existing mean rating meaningful once it is derived from the sum
+    ('provider_profiles', 'rating_sum'):
+        "UPDATE provider_profiles SET rating_sum = coalesce(rating, 0) * coalesce(total_reviews, 0)",
+    # Same text format as SQLAlchemy's SQLite DateTime, keeping any fractional seconds
+    ('bookings', 'end_time'):
+        "UPDATE bookings SET end_time = strftime('%Y-%m-%d %H:%M:%S', scheduled_date, "
+        "'+' || duration_minutes || ' minutes') || substr(scheduled_date, 20)",
+    ('users', 'unread_messages'):
+        "UPDATE users SET unread_messages = (SELECT count(*) FROM messages "
+        "WHERE messages.recipient_id = users.id AND NOT coalesce(messages.is_read, 0))",
+}
+
+def add_missing_columns(connection):
+    """Add model columns missing from existing tables; returns the added names"""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+            backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+            if backfill:
+                connection.execute(text(backfill))
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+def add_missing_indexes(connection):
+    """Create model indexes missing from existing tables; returns their names"""
+    inspector = inspect(connection)
+    added = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                added.append(index.name)
+    return added
+
+def upgrade(engine):
+    """Bring a database up to the current schema"""
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        added = add_missing_columns(connection)
+        added += add_missing_indexes(connection)
+    fulltext.install(engine)
+    rollups.install(engine)
+    return added
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Create missing tables, columns and indexes"""
+    added = upgrade(db.engine)
+    if added:
+        click.echo(f'Added {", ".join(added)}.')
+    click.echo('Database schema is up to date.')
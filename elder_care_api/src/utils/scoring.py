@@ -0,0 +1,84 @@
+import numpy as np
+from src.utils.geo import haversine_km, parse_radius, DEFAULT_RADIUS_KM
+from src.utils.provider_index import SERVICE_TYPE_BITS
+
+# Vectorized provider match scoring.
+#
+# ``score_candidates`` scores every candidate slot of the catalog index in one
+# pass over the index's NumPy columns, and ``top_k`` picks the best ones with
+# ``argpartition`` so only the requested page is sorted and serialized. Both
+# must give the same scores and ordering as scoring each provider one at a
+# time and sorting the full list; ``tests/test_scoring.py`` keeps that
+# per-provider reference and checks them against it.
+
+# Points for being free during the requested availability windows
+AVAILABILITY_WEIGHT = 10
+
+SERVICE_TYPE_BITS_BY_VALUE = {
+    service_type.value: bit for service_type, bit in SERVICE_TYPE_BITS.items()
+}
+
+def candidate_distances(columns, slots, near):
+    """Return the distance in km from ``near`` to each candidate slot"""
+    return haversine_km(near[0], near[1], columns['latitude'][slots], columns['longitude'][slots])
+
+def score_candidates(columns, slots, search_criteria, distances=None, availability=None):
+    """Return the match score of each candidate slot
+
+    ``availability`` holds the fraction of the requested windows each
+    candidate has free, when the search asked for availability.
+    """
+    score = np.zeros(len(slots), dtype=np.float64)
+
+    # Base score for verified providers
+    score += np.where(columns['is_verified'][slots], 20, 0)
+
+    # Rating score (0-25 points)
+    score += (columns['rating'][slots] / 5.0) * 25
+
+    # Service match score
+    services_needed = search_criteria.get('services', [])
+    if services_needed:
+        service_mask = columns['service_mask'][slots]
+        matching_services = np.zeros(len(slots), dtype=np.int64)
+        for service in set(services_needed):
+            if service in SERVICE_TYPE_BITS_BY_VALUE:
+                matching_services += (service_mask >> SERVICE_TYPE_BITS_BY_VALUE[service]) & 1
+        score += (matching_services / len(services_needed)) * 30
+
+    # Budget compatibility score
+    budget_range = search_criteria.get('budget_range', {})
+    if budget_range.get('max_hourly'):
+        hourly_rate = columns['hourly_rate'][slots]
+        within_budget = (hourly_rate != 0) & (hourly_rate <= float(budget_range['max_hourly']))
+        score += np.where(within_budget, 15, 0)
+
+    # Review count bonus
+    total_reviews = columns['total_reviews'][slots]
+    score += np.where(total_reviews > 10, 10, np.where(total_reviews > 5, 5, 0))
+
+    # Proximity score (0-10 points, falling off linearly to the radius edge)
+    if distances is not None:
+        radius = parse_radius(search_criteria.get('location', {}).get('radius_km')) or DEFAULT_RADIUS_KM
+        score += np.nan_to_num((1 - np.minimum(distances / radius, 1)) * 10)
+
+    # Availability score (0-10 points for the share of requested time that is free)
+    if availability is not None:
+        score += availability * AVAILABILITY_WEIGHT
+
+    return np.minimum(score, 100)  # Cap at 100
+
+def top_k(scores, ids, k):
+    """Return positions of the ``k`` best scores, highest first, ties by ascending id"""
+    if k <= 0 or not len(scores):
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)
+        ties = ties[np.argsort(ids[ties], kind='stable')][:k - len(above)]
+        selected = np.concatenate([above, ties])
+    else:
+        selected = np.arange(len(scores))
+    order = np.lexsort((ids[selected], -scores[selected]))
+    return selected[order]
@@ -0,0 +1,212 @@
+import json
+from datetime import datetime, date
+import click
+from flask.cli import with_appcontext
+from werkzeug.security import generate_password_hash
+from src.models.care_models import (
+    db, User, ProviderProfile, Service, Elder, FamilyProfile, UserRole, ProviderType, ServiceType
+)
+
+# Sample data for development databases.
+#
+# Run ``flask seed`` once after ``flask upgrade-db``. Creating the accounts
+# hashes their passwords (PBKDF2, hundreds of milliseconds each), which is why
+# this is a command and not something the app does when it starts.
+
+def seed_sample_data():
+    """Add a sample family and three providers to an empty database; returns whether it did"""
+    if User.query.count() > 0:
+        return False
+    
+    # Create sample family user
+    family_user = User(
+        username='johnson_family',
+        email='mary.johnson@email.com',
+        password_hash=generate_password_hash('password123'),
+        first_name='Mary',
+        last_name='Johnson',
+        phone='555-0123',
+        role=UserRole.FAMILY
+    )
+    db.session.add(family_user)
+    db.session.flush()
+    
+    # Create family profile
+    family_profile = FamilyProfile(
+        user_id=family_user.id,
+        address='123 Main St',
+        city='Downtown',
+        state='CA',
+        zip_code='90210',
+        emergency_contact_name='John Johnson',
+        emergency_contact_phone='555-0124'
+    )
+    db.session.add(family_profile)
+    db.session.flush()
+    
+    # Create elder
+    elder = Elder(
+        family_profile_id=family_profile.id,
+        first_name='Robert',
+        last_name='Johnson',
+        date_of_birth=date(1940, 5, 15),
+        gender='Male',
+        medical_conditions='Diabetes, Hypertension',
+        medications='Metformin, Lisinopril',
+        mobility_level='Limited',
+        care_preferences='Prefers morning appointments'
+    )
+    db.session.add(elder)
+    
+    # Create sample provider users
+    providers_data = [
+        {
+            'username': 'sarah_johnson_rn',
+            'email': 'sarah.johnson@caregivers.com',
+            'first_name': 'Sarah',
+            'last_name': 'Johnson',
+            'phone': '555-0201',
+            'business_name': 'Sarah Johnson, RN',
+            'provider_type': ProviderType.INDIVIDUAL,
+            'license_number': 'RN123456',
+            'certifications': 'Registered Nurse, CPR Certified',
+            'specialties': 'Medication Management, Wound Care, Companionship',
+            'description': 'Experienced registered nurse with 10+ years in elder care',
+            'city': 'Downtown',
+            'state': 'CA',
+            'zip_code': '90210',
+            'hourly_rate': 45.00,
+            'rating': 4.9,
+            'total_reviews': 127,
+            'is_verified': True,
+            'verification_date': datetime.utcnow(),
+            'services': [
+                {'name': 'In-Home Nursing Care', 'service_type': ServiceType.MEDICAL_SERVICES, 'price': 45.00, 'duration': 60},
+                {'name': 'Medication Management', 'service_type': ServiceType.MEDICAL_SERVICES, 'price': 40.00, 'duration': 30},
+                {'name': 'Companionship', 'service_type': ServiceType.HOME_CARE, 'price': 35.00, 'duration': 120}
+            ]
+        },
+        {
+            'username': 'sunshine_senior_center',
+            'email': 'info@sunshinesenior.com',
+            'first_name': 'Sunshine',
+            'last_name': 'Center',
+            'phone': '555-0301',
+            'business_name': 'Sunshine Senior Center',
+            'provider_type': ProviderType.FACILITY,
+            'license_number': 'FAC789012',
+            'certifications': 'State Licensed Adult Day Care',
+            'specialties': 'Social Activities, Meals, Transportation',
+            'description': 'Premier adult day care facility with comprehensive programs',
+            'city': 'Westside',
+            'state': 'CA',
+            'zip_code': '90211',
+            'daily_rate': 65.00,
+            'rating': 4.8,
+            'total_reviews': 89,
+            'is_verified': True,
+            'verification_date': datetime.utcnow(),
+            'services': [
+                {'name': 'Adult Day Care', 'service_type': ServiceType.ADULT_DAY_CARE, 'price': 65.00, 'duration': 480},
+                {'name': 'Transportation Service', 'service_type': ServiceType.TRANSPORTATION, 'price': 25.00, 'duration': 60}
+            ]
+        },
+        {
+            'username': 'michael_chen_cna',
+            'email': 'michael.chen@homecare.com',
+            'first_name': 'Michael',
+            'last_name': 'Chen',
+            'phone': '555-0401',
+            'business_name': 'Michael Chen, CNA',
+            'provider_type': ProviderType.INDIVIDUAL,
+            'license_number': 'CNA345678',
+            'certifications': 'Certified Nursing Assistant, First Aid',
+            'specialties': 'Personal Hygiene, Mobility Assistance, Light Housekeeping',
+            'description': 'Compassionate CNA specializing in personal care assistance',
+            'city': 'Northside',
+            'state': 'CA',
+            'zip_code': '90212',
+            'hourly_rate': 35.00,
+            'rating': 4.7,
+            'total_reviews': 156,
+            'is_verified': True,
+            'verification_date': datetime.utcnow(),
+            'services': [
+                {'name': 'Personal Care Assistance', 'service_type': ServiceType.HOME_CARE, 'price': 35.00, 'duration': 120},
+                {'name': 'Mobility Assistance', 'service_type': ServiceType.HOME_CARE, 'price': 35.00, 'duration': 60},
+                {'name': 'Light Housekeeping', 'service_type': ServiceType.HOME_CARE, 'price': 30.00, 'duration': 90}
+            ]
+        }
+    ]
+    
+    for provider_data in providers_data:
+        # Create provider user
+        provider_user = User(
+            username=provider_data['username'],
+            email=provider_data['email'],
+            password_hash=generate_password_hash('password123'),
+            first_name=provider_data['first_name'],
+            last_name=provider_data['last_name'],
+            phone=provider_data['phone'],
+            role=UserRole.PROVIDER
+        )
+        db.session.add(provider_user)
+        db.session.flush()
+    
+        # Create provider profile
+        provider_profile = ProviderProfile(
+            user_id=provider_user.id,
+            provider_type=provider_data['provider_type'],
+            business_name=provider_data['business_name'],
+            license_number=provider_data['license_number'],
+            certifications=provider_data['certifications'],
+            specialties=provider_data['specialties'],
+            description=provider_data['description'],
+            city=provider_data['city'],
+            state=provider_data['state'],
+            zip_code=provider_data['zip_code'],
+            hourly_rate=provider_data.get('hourly_rate'),
+            daily_rate=provider_data.get('daily_rate'),
+            rating=provider_data['rating'],
+            total_reviews=provider_data['total_reviews'],
+            # Later reviews update the mean from the sum, see rating_aggregates
+            rating_sum=provider_data['rating'] * provider_data['total_reviews'],
+            is_verified=provider_data['is_verified'],
+            verification_date=provider_data['verification_date'],
+            availability_schedule=json.dumps({
+                'monday': {'start': '09:00', 'end': '17:00'},
+                'tuesday': {'start': '09:00', 'end': '17:00'},
+                'wednesday': {'start': '09:00', 'end': '17:00'},
+                'thursday': {'start': '09:00', 'end': '17:00'},
+                'friday': {'start': '09:00', 'end': '17:00'},
+                'saturday': {'start': '10:00', 'end': '16:00'},
+                'sunday': {'start': '10:00', 'end': '16:00'}
+            })
+        )
+        db.session.add(provider_profile)
+        db.session.flush()
+    
+        # Create services for the provider
+        for service_data in provider_data['services']:
+            service = Service(
+                provider_id=provider_profile.id,
+                service_type=service_data['service_type'],
+                name=service_data['name'],
+                description=f"Professional {service_data['name'].lower()} service",
+                price=service_data['price'],
+                duration_minutes=service_data['duration'],
+                is_active=True
+            )
+            db.session.add(service)
+    
+    db.session.commit()
+    return True
+
+@click.command('seed')
+@with_appcontext
+def seed_command():
+    """Add sample users, providers and services to an empty database"""
+    if seed_sample_data():
+        click.echo('Sample data created successfully!')
+    else:
+        click.echo('Database already has users; nothing to seed.')
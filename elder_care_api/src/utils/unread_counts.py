@@ -0,0 +1,51 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, update
+from src.models.care_models import db, User, Message
+from src.utils.counters import IncrementalCounter
+
+# Incrementally maintained unread message counts on users.
+#
+# ``users.unread_messages`` holds the number of a user's received messages
+# that are not read yet, so inbox badges never run a ``COUNT(*)``. Every flush
+# that inserts, edits or deletes a ``Message`` applies the change to the
+# affected recipients with one relative UPDATE each (see
+# ``counters.IncrementalCounter``), so the counts commit or roll back together
+# with the messages. Bulk Core UPDATEs, such as
+# marking a conversation read, bypass the flush and call ``apply_deltas``
+# themselves with the number of rows they changed.
+
+users = User.__table__
+
+def _add(deltas, recipient_id, is_read, sign):
+    if recipient_id is not None and not is_read:
+        deltas[recipient_id] = deltas.get(recipient_id, 0) + sign
+
+def apply_deltas(connection, deltas):
+    """Apply ``{user_id: change}`` to the unread counts with relative UPDATEs"""
+    for user_id, delta in deltas.items():
+        connection.execute(update(users).where(users.c.id == user_id).values(
+            unread_messages=func.max(func.coalesce(users.c.unread_messages, 0) + delta, 0),
+            # Not a change to the user record
+            updated_at=users.c.updated_at
+        ))
+
+counts = IncrementalCounter(
+    'unread', Message, (Message.recipient_id, Message.is_read), _add, apply_deltas, User, ['unread_messages']
+)
+
+def rebuild(connection):
+    """Recompute every user's unread count from the messages table"""
+    messages = Message.__table__
+    unread = select(func.count()).where(
+        messages.c.recipient_id == users.c.id, ~func.coalesce(messages.c.is_read, False)
+    ).correlate(users).scalar_subquery()
+    return connection.execute(update(users).values(unread_messages=unread, updated_at=users.c.updated_at)).rowcount
+
+@click.command('rebuild-unread-counts')
+@with_appcontext
+def rebuild_unread_counts_command():
+    """Recompute unread message counts from all messages"""
+    updated = rebuild(db.session.connection())
+    db.session.commit()
+    click.echo(f'Rebuilt unread message counts for {updated} users.')
@@ -0,0 +1,98 @@
+import os
+import sys
+
+import pytest
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_ROOT)
+sys.path.insert(0, os.path.join(API_ROOT, 'scripts'))
+
+def reset_caches():
+    """Drop the process-wide caches, which outlive a single app"""
+    from src.routes import dashboards
+    from src.utils.availability_index import free_slot_index
+    from src.utils.pagination import count_cache
+    from src.utils.provider_index import provider_index
+    from src.utils.response_cache import response_cache
+    response_cache.invalidate()
+    count_cache.clear()
+    provider_index.invalidate()
+    free_slot_index.invalidate()
+    dashboards._provider_ids.clear()
+
+def make_app(database, config=None):
+    """App on a fresh SQLite file with the schema applied and budgets enforced"""
+    from src.main import create_app
+    from src.models.care_models import db
+    from src.utils import schema
+    reset_caches()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'TESTING': True,
+        'QUERY_BUDGET_MODE': 'raise',
+        **(config or {})
+    })
+    with app.app_context():
+        schema.upgrade(db.engine)
+    return app
+
+@pytest.fixture
+def app(tmp_path):
+    """App with the sample family and providers"""
+    from src.utils.seed import seed_sample_data
+    app = make_app(tmp_path / 'test.db')
+    with app.app_context():
+        seed_sample_data()
+    yield app
+    reset_caches()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def sample(app):
+    """Ids of the sample family, elder, first provider and its first service"""
+    from src.models.care_models import db, User, FamilyProfile, Elder, ProviderProfile, Service, UserRole
+    with app.app_context():
+        family_user = User.query.filter_by(role=UserRole.FAMILY).order_by(User.id).first()
+        elder = Elder.query.join(FamilyProfile).filter(FamilyProfile.user_id == family_user.id).first()
+        provider = db.session.scalars(db.select(ProviderProfile).order_by(ProviderProfile.id)).first()
+        service = db.session.scalars(
+            db.select(Service).where(Service.provider_id == provider.id).order_by(Service.id)
+        ).first()
+        return {
+            'family_user_id': family_user.id, 'elder_id': elder.id, 'provider_id': provider.id,
+            'provider_user_id': provider.user_id, 'service_id': service.id
+        }
+
+def booking_payload(sample, scheduled_date, duration_minutes=60):
+    return {
+        'family_user_id': sample['family_user_id'], 'provider_id': sample['provider_id'],
+        'service_id': sample['service_id'], 'elder_id': sample['elder_id'],
+        'scheduled_date': scheduled_date, 'duration_minutes': duration_minutes
+    }
+
+@pytest.fixture
+def book(client, sample):
+    """Create a confirmed booking of the sample provider through the API; returns its id"""
+    def book(scheduled_date, duration_minutes=60):
+        response = client.post('/api/bookings', json=booking_payload(sample, scheduled_date, duration_minutes))
+        assert response.status_code == 201, response.get_json()
+        booking_id = response.get_json()['id']
+        response = client.put(f'/api/bookings/{booking_id}/status', json={'status': 'confirmed'})
+        assert response.status_code == 200, response.get_json()
+        return booking_id
+    return book
+
+@pytest.fixture(scope='module')
+def seeded(tmp_path_factory):
+    """App with the synthetic data set of the plan and budget checks, and its ids"""
+    from check_query_plans import seed
+    from src.utils.seed import seed_sample_data
+    app = make_app(tmp_path_factory.mktemp('seeded') / 'test.db')
+    with app.app_context():
+        seed_sample_data()
+    ids = seed(app)
+    yield app, ids
+    reset_caches()
@@ -0,0 +1,109 @@
+import pytest
+
+from src.models.care_models import db, Message, ProviderProfile, Review, User
+from src.utils import rating_aggregates, unread_counts
+
+AGGREGATES = ['rating', 'total_reviews', 'rating_sum'] + [f'rating_{stars}_count' for stars in rating_aggregates.STARS]
+
+def aggregates(provider_id):
+    provider = db.session.get(ProviderProfile, provider_id)
+    db.session.refresh(provider)
+    return {name: getattr(provider, name) for name in AGGREGATES}
+
+def rebuilt_aggregates(provider_id):
+    """Aggregates as recomputed from the reviews table, leaving the stored ones untouched"""
+    connection = db.session.connection()
+    nested = connection.begin_nested()
+    rating_aggregates.rebuild(connection)
+    values = aggregates(provider_id)
+    nested.rollback()
+    db.session.expire_all()
+    return values
+
+@pytest.fixture
+def reviewed(app, sample, book):
+    """The sample provider with a rebuilt (consistent) starting point and a booking to review"""
+    booking_id = book('2031-03-03T10:00:00')
+    with app.app_context():
+        rating_aggregates.rebuild(db.session.connection())
+        db.session.commit()
+    return sample['provider_id'], booking_id
+
+def add_review(provider_id, booking_id, sample, rating):
+    review = Review(booking_id=booking_id, provider_id=provider_id, family_user_id=sample['family_user_id'],
+                    rating=rating)
+    db.session.add(review)
+    db.session.commit()
+    return review
+
+def test_reviews_update_the_rating_incrementally(app, sample, reviewed):
+    provider_id, booking_id = reviewed
+    with app.app_context():
+        reviews = [add_review(provider_id, booking_id, sample, rating) for rating in (5, 4, 4, 1)]
+        values = aggregates(provider_id)
+        assert values['total_reviews'] == 4
+        assert values['rating_sum'] == 14
+        assert values['rating'] == 3.5
+        assert (values['rating_1_count'], values['rating_4_count'], values['rating_5_count']) == (1, 2, 1)
+        assert values == rebuilt_aggregates(provider_id)
+
+        reviews[3].rating = 5
+        db.session.commit()
+        db.session.delete(reviews[1])
+        db.session.commit()
+        values = aggregates(provider_id)
+        assert (values['total_reviews'], values['rating_sum'], values['rating']) == (3, 14, 4.67)
+        assert values == rebuilt_aggregates(provider_id)
+
+def test_a_review_of_a_seeded_provider_keeps_its_rating(app, sample, book):
+    booking_id = book('2031-03-03T10:00:00')
+    with app.app_context():
+        before = aggregates(sample['provider_id'])
+        assert before['total_reviews'] > 0
+        add_review(sample['provider_id'], booking_id, sample, 5)
+        after = aggregates(sample['provider_id'])
+        assert after['total_reviews'] == before['total_reviews'] + 1
+        assert after['rating'] == round((before['rating'] * before['total_reviews'] + 5) / after['total_reviews'], 2)
+
+def test_rolled_back_reviews_leave_the_rating_alone(app, sample, reviewed):
+    provider_id, booking_id = reviewed
+    with app.app_context():
+        add_review(provider_id, booking_id, sample, 2)
+        before = aggregates(provider_id)
+        db.session.add(Review(booking_id=booking_id, provider_id=provider_id,
+                              family_user_id=sample['family_user_id'], rating=5))
+        db.session.flush()
+        db.session.rollback()
+        assert aggregates(provider_id) == before
+
+def unread(client, user_id):
+    response = client.get(f'/api/messages/unread-count?user_id={user_id}')
+    assert response.status_code == 200
+    return response.get_json()['unread_count']
+
+def test_unread_counts_follow_sends_and_reads(app, client, sample):
+    family, provider_user = sample['family_user_id'], sample['provider_user_id']
+    for content in ('Hello', 'Are you free on Monday?', 'Thanks'):
+        response = client.post('/api/messages', json={'sender_id': family, 'recipient_id': provider_user,
+                                                      'content': content})
+        assert response.status_code == 201
+    client.post('/api/messages', json={'sender_id': provider_user, 'recipient_id': family, 'content': 'Yes'})
+    assert unread(client, provider_user) == 3
+    assert unread(client, family) == 1
+
+    with app.app_context():
+        message = db.session.scalars(db.select(Message).where(Message.recipient_id == provider_user)).first()
+        message.is_read = True
+        db.session.commit()
+    assert unread(client, provider_user) == 2
+
+    response = client.post('/api/messages/read', json={'user_id': provider_user, 'with_user_id': family})
+    assert response.get_json() == {'updated': 2, 'unread_count': 0}
+    assert unread(client, provider_user) == 0
+    assert unread(client, family) == 1
+
+    with app.app_context():
+        unread_counts.rebuild(db.session.connection())
+        db.session.commit()
+        assert db.session.get(User, family).unread_messages == 1
+        assert db.session.get(User, provider_user).unread_messages == 0
@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from conftest import booking_payload
+from src.models.care_models import db, Service
+from src.routes.analytics import MAX_ANALYTICS_BUCKETS, bucket_starts
+
+def analytics(client, path='/api/analytics/bookings', **args):
+    query = '&'.join(f'{name}={value}' for name, value in args.items())
+    response = client.get(f'{path}?{query}')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def set_status(client, booking_id, *statuses):
+    for status in statuses:
+        assert client.put(f'/api/bookings/{booking_id}/status', json={'status': status}).status_code == 200
+
+@pytest.fixture
+def other_provider(app, sample):
+    """Booking payload fields for a service of another provider, with its service type"""
+    with app.app_context():
+        service = db.session.scalars(
+            db.select(Service).where(Service.provider_id != sample['provider_id']).order_by(Service.id)
+        ).first()
+        return {'provider_id': service.provider_id, 'service_id': service.id}, service.service_type.value
+
+def test_bucket_starts_cover_the_range():
+    assert bucket_starts(date(2031, 3, 5), date(2031, 3, 7), 'day') == \
+        [date(2031, 3, 5), date(2031, 3, 6), date(2031, 3, 7)]
+    # Weeks start on Monday, months on the first, both before the range when it starts mid-bucket
+    assert bucket_starts(date(2031, 3, 5), date(2031, 3, 17), 'week') == \
+        [date(2031, 3, 3), date(2031, 3, 10), date(2031, 3, 17)]
+    assert bucket_starts(date(2030, 11, 30), date(2031, 2, 1), 'month') == \
+        [date(2030, 11, 1), date(2030, 12, 1), date(2031, 1, 1), date(2031, 2, 1)]
+    assert len(bucket_starts(date(2031, 1, 1), date(2040, 1, 1), 'day')) == MAX_ANALYTICS_BUCKETS + 1
+
+def test_revenue_and_hours_count_completed_bookings_only(client, book):
+    completed = book('2031-03-03T10:00:00', 90)
+    set_status(client, completed, 'in_progress', 'completed')
+    book('2031-03-03T14:00:00', 60)
+    set_status(client, book('2031-03-04T10:00:00'), 'cancelled')
+    total_cost = client.get(f'/api/bookings/{completed}').get_json()['total_cost']
+    assert total_cost > 0
+
+    body = analytics(client, start_date='2031-03-03', end_date='2031-03-05')
+    assert (body['start_date'], body['end_date'], body['granularity']) == ('2031-03-03', '2031-03-05', 'day')
+    first, second, third = body['buckets']
+    assert first['period'] == '2031-03-03'
+    assert (first['bookings'], first['hours'], first['revenue']) == (2, 1.5, total_cost)
+    assert first['by_status']['completed'] == first['by_status']['confirmed'] == 1
+    assert (second['bookings'], second['cancellations'], second['revenue'], second['hours']) == (1, 1, 0, 0)
+    assert third['bookings'] == 0
+    assert body['totals'] == {
+        'bookings': 3, 'cancellations': 1, 'revenue': total_cost, 'hours': 1.5,
+        'by_status': dict(first['by_status'], cancelled=1)
+    }
+
+def test_provider_analytics_count_only_that_provider(client, sample, book, other_provider):
+    fields, service_type = other_provider
+    book('2031-03-03T10:00:00')
+    response = client.post('/api/bookings', json=dict(booking_payload(sample, '2031-03-03T10:00:00'), **fields))
+    assert response.status_code == 201, response.get_json()
+
+    everyone = analytics(client, start_date='2031-03-01', end_date='2031-03-31', granularity='month')
+    assert everyone['provider_id'] is None
+    assert everyone['totals']['bookings'] == 2
+
+    provider = analytics(client, f'/api/analytics/providers/{sample["provider_id"]}/bookings',
+                         start_date='2031-03-01', end_date='2031-03-31', granularity='month')
+    assert provider['provider_id'] == sample['provider_id']
+    assert provider['totals']['bookings'] == 1
+    other = analytics(client, f'/api/analytics/providers/{fields["provider_id"]}/bookings',
+                      start_date='2031-03-01', end_date='2031-03-31', service_type=service_type)
+    assert other['service_type'] == service_type
+    assert other['totals']['bookings'] == 1
+    assert [bucket['bookings'] for bucket in other['buckets'] if bucket['bookings']] == [1]
+
+    filtered = analytics(client, start_date='2031-03-01', end_date='2031-03-31', service_type=service_type)
+    assert filtered['totals']['bookings'] == 1
+
+def test_default_range_is_the_last_thirty_days(client):
+    body = analytics(client)
+    today = datetime.utcnow().date()
+    assert body['end_date'] == today.isoformat()
+    assert body['start_date'] == (today - timedelta(days=29)).isoformat()
+    assert len(body['buckets']) == 30
+
+@pytest.mark.parametrize('query', [
+    '?granularity=year',
+    '?service_type=gardening',
+    '?start_date=March',
+    '?start_date=2031-03-05&end_date=2031-03-04',
+    '?start_date=2020-01-01&end_date=2031-01-01',
+])
+def test_analytics_reject_bad_arguments(client, sample, query):
+    assert client.get(f'/api/analytics/bookings{query}').status_code == 400
+    assert client.get(f'/api/analytics/providers/{sample["provider_id"]}/bookings{query}').status_code == 400
+
+def test_provider_analytics_of_unknown_providers_404(client):
+    assert client.get('/api/analytics/providers/999/bookings').status_code == 404
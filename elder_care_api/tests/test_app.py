@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import inspect, text
+
+import src.main
+from conftest import reset_caches
+from src.main import create_app
+from src.models.care_models import db, ProviderProfile, User
+from src.utils import fulltext, rollups
+
+def test_importing_main_builds_no_app():
+    assert not hasattr(src.main, 'app')
+
+@pytest.fixture
+def bare_app(tmp_path):
+    """App on a database file that does not exist yet"""
+    reset_caches()
+    database = tmp_path / 'app.db'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'TESTING': True})
+    yield app, database
+    reset_caches()
+
+def test_config_comes_from_the_environment_then_the_argument(monkeypatch, tmp_path):
+    monkeypatch.setenv('SECRET_KEY', 'from-env')
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "env.db"}')
+    monkeypatch.setenv('FLASK_SQLITE_READ_POOL_SIZE', '16')
+    monkeypatch.setenv('FLASK_MESSAGE_STREAM_LIMIT', '4')
+    app = create_app({'MESSAGE_STREAM_LIMIT': 2})
+    assert app.config['SECRET_KEY'] == 'from-env'
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == f'sqlite:///{tmp_path / "env.db"}'
+    assert app.config['DATABASE_MODE'] == 'default'
+    assert app.config['SQLITE_READ_POOL_SIZE'] == 16
+    assert app.config['MESSAGE_STREAM_LIMIT'] == 2
+
+def test_creating_the_app_does_not_touch_the_database(bare_app):
+    app, database = bare_app
+    assert app.test_client().get('/api/health').get_json()['status'] == 'healthy'
+    assert not database.exists()
+
+def test_upgrade_db_creates_the_schema_then_reports_it_current(bare_app):
+    app, database = bare_app
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['upgrade-db'])
+    assert result.exit_code == 0, result.output
+    assert result.output == 'Database schema is up to date.\n'
+    with app.app_context():
+        tables = set(inspect(db.engine).get_table_names())
+        assert {'users', 'provider_profiles', 'bookings', fulltext.FTS_TABLE, rollups.ROLLUP_TABLE} <= tables
+    assert runner.invoke(args=['upgrade-db']).output == 'Database schema is up to date.\n'
+
+def test_upgrade_db_adds_and_backfills_what_an_older_database_lacks(bare_app):
+    app, _ = bare_app
+    runner = app.test_cli_runner()
+    runner.invoke(args=['upgrade-db'])
+    runner.invoke(args=['seed'])
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP INDEX ix_reviews_created_at'))
+            connection.execute(text('ALTER TABLE provider_profiles DROP COLUMN rating_sum'))
+
+    result = runner.invoke(args=['upgrade-db'])
+    assert result.exit_code == 0, result.output
+    assert result.output == 'Added provider_profiles.rating_sum, ix_reviews_created_at.\nDatabase schema is up to date.\n'
+    with app.app_context():
+        for provider in db.session.scalars(db.select(ProviderProfile)):
+            assert provider.rating_sum == pytest.approx(provider.rating * provider.total_reviews)
+
+def test_seed_fills_an_empty_database_once(bare_app):
+    app, _ = bare_app
+    runner = app.test_cli_runner()
+    runner.invoke(args=['upgrade-db'])
+    assert runner.invoke(args=['seed']).output == 'Sample data created successfully!\n'
+    assert runner.invoke(args=['seed']).output == 'Database already has users; nothing to seed.\n'
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(User)) == 4
+        assert db.session.scalar(db.select(db.func.count()).select_from(ProviderProfile)) == 3
+    assert app.test_client().get('/api/providers').get_json()['pagination']['total'] == 3
@@ -0,0 +1,90 @@
+import json
+from datetime import date, datetime, time
+from types import SimpleNamespace
+
+from src.utils.availability import (
+    DEFAULT_SCHEDULE, SLOTS_PER_DAY, free_slots, hours_mask, parse_schedule, range_mask, runs, slot_of, time_of
+)
+from src.utils.availability_index import free_slot_index, mask_words
+
+MONDAY = date(2031, 3, 3)
+
+def booking(start, minutes):
+    return SimpleNamespace(scheduled_date=start, duration_minutes=minutes)
+
+def test_slots_and_masks():
+    assert slot_of('09:00') == 36
+    assert slot_of('09:10') == 36
+    assert slot_of('09:10', round_up=True) == 37
+    assert slot_of(time(23, 59, 59)) == SLOTS_PER_DAY - 1
+    assert time_of(SLOTS_PER_DAY) == '24:00'
+    assert range_mask(2, 5) == 0b11100
+    assert range_mask(5, 5) == 0
+    assert hours_mask([{'start': '00:00', 'end': '00:30'}, {'start': '01:00', 'end': '01:15'}]) == 0b10011
+    assert list(runs(0b1110011000)) == [(3, 5), (7, 10)]
+    assert list(runs(range_mask(0, SLOTS_PER_DAY))) == [(0, SLOTS_PER_DAY)]
+
+def test_mask_words_split_the_day_at_64_slots():
+    low, high = mask_words(range_mask(60, 70))
+    assert low == range_mask(60, 64)
+    assert high == range_mask(0, 6)
+
+def test_parse_schedule_caches_and_falls_back_to_the_default():
+    text = json.dumps({'monday': [{'start': '09:00', 'end': '12:00'}, {'start': '13:00', 'end': '17:00'}],
+                       'exceptions': {'2031-03-10': None}})
+    schedule = parse_schedule(text)
+    assert parse_schedule(text) is schedule
+    assert schedule.day_mask(MONDAY) == range_mask(36, 48) | range_mask(52, 68)
+    assert schedule.day_mask(date(2031, 3, 10)) == 0
+    assert schedule.day_mask(date(2031, 3, 4)) == 0
+    for broken in (None, '', 'not json', '[1, 2]'):
+        fallback = parse_schedule(broken)
+        assert fallback.source == {}
+        assert fallback.day_mask(MONDAY) == hours_mask(DEFAULT_SCHEDULE['monday'])
+
+def test_free_slots_clear_booked_time():
+    schedule = parse_schedule(json.dumps({'monday': {'start': '09:00', 'end': '17:00'}}))
+    bookings = [booking(datetime(2031, 3, 3, 10, 10), 50), booking(datetime(2031, 3, 3, 16, 0), 120)]
+    assert free_slots(schedule, bookings, MONDAY, MONDAY) == [
+        {'date': '2031-03-03', 'start_time': '09:00', 'end_time': '10:00', 'available': True},
+        {'date': '2031-03-03', 'start_time': '11:00', 'end_time': '16:00', 'available': True},
+    ]
+
+def test_bookings_past_midnight_take_slots_on_both_days():
+    schedule = parse_schedule(json.dumps({day: {'start': '00:00', 'end': '24:00'} for day in ('monday', 'tuesday')}))
+    slots = free_slots(schedule, [booking(datetime(2031, 3, 3, 23, 0), 120)], MONDAY, date(2031, 3, 4))
+    assert [(slot['date'], slot['start_time'], slot['end_time']) for slot in slots] == [
+        ('2031-03-03', '00:00', '23:00'), ('2031-03-04', '01:00', '24:00')
+    ]
+
+def test_availability_endpoint_and_window_index_agree(app, client, sample, book):
+    book('2031-03-03T10:00:00', 120)
+    response = client.get(f'/api/providers/{sample["provider_id"]}/availability?start_date=2031-03-03&end_date=2031-03-03')
+    assert response.status_code == 200
+    free = response.get_json()['available_slots']
+    assert all(not (slot['start_time'] < '12:00' and slot['end_time'] > '10:00') for slot in free)
+
+    with app.app_context():
+        with free_slot_index.catalog.lock:
+            booked = free_slot_index.window_ratios([(MONDAY, range_mask(slot_of('10:00'), slot_of('12:00')))])
+            open_ = free_slot_index.window_ratios([(MONDAY, range_mask(slot_of('13:00'), slot_of('14:00')))])
+            slot = free_slot_index.catalog.slot_of(sample['provider_id'])
+    assert booked[slot] == 0
+    assert open_[slot] == 1
+
+def test_search_checks_index_freshness_once(app, client, monkeypatch):
+    from src.utils.provider_index import provider_index
+    rebuild = provider_index.rebuild
+    rebuilds = []
+    monkeypatch.setattr(provider_index, 'rebuild', lambda: rebuilds.append(provider_index.generation) or rebuild())
+    # Every freshness check rebuilds; a second one between filtering and the
+    # availability lookup would renumber the slots the filter result refers to
+    app.config['PROVIDER_INDEX_MAX_AGE'] = 0
+    # Rebuilding inside the request is outside the route's query budget
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+    response = client.post('/api/providers/search', json={
+        'availability': {'date': '2031-03-03', 'start_time': '13:00', 'end_time': '14:00', 'flexible': True}
+    })
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['total_found'] == 3
+    assert len(rebuilds) == 1
@@ -0,0 +1,37 @@
+from src.routes.batch import MAX_BATCH_REQUESTS
+
+def test_batch_returns_the_same_responses_as_separate_requests(client, sample, book):
+    booking_id = book('2031-03-03T10:00:00')
+    paths = [f'/api/bookings/{booking_id}', f'/api/providers/{sample["provider_id"]}',
+             f'/api/providers/{sample["provider_id"]}/reviews?per_page=3', '/api/bookings/999999']
+    response = client.post('/api/batch', json={'requests': [{'id': path, 'path': path} for path in paths]})
+    assert response.status_code == 200
+    results = response.get_json()['responses']
+    assert [result['id'] for result in results] == paths
+    for path, result in zip(paths, results):
+        direct = client.get(path)
+        assert result['status'] == direct.status_code
+        if direct.status_code == 200:
+            assert result['body'] == direct.get_json()
+
+def test_batch_passes_conditional_requests_through(client, sample):
+    path = f'/api/providers/{sample["provider_id"]}'
+    etag = client.get(path).headers['ETag']
+    result = client.post('/api/batch', json={'requests': [
+        {'path': path, 'headers': {'If-None-Match': etag}}
+    ]}).get_json()['responses'][0]
+    assert result['status'] == 304
+    assert result['body'] is None
+    assert result['headers']['ETag'] == etag
+
+def test_batch_rejects_what_it_cannot_run(client, sample):
+    assert client.post('/api/batch', json={'requests': []}).status_code == 400
+    assert client.post('/api/batch', json={'requests': [{'path': '/api/health'}] * (MAX_BATCH_REQUESTS + 1)}).status_code == 400
+    assert client.post('/api/batch', json={'requests': [{'method': 'GET'}]}).status_code == 400
+    results = client.post('/api/batch', json={'requests': [
+        {'path': '/api/bookings', 'method': 'POST'},
+        {'path': '/api/health'},
+        {'path': f'/api/messages?user_id={sample["family_user_id"]}'},
+        {'path': '/api/nothing-here'},
+    ]}).get_json()['responses']
+    assert [result['status'] for result in results] == [405, 400, 400, 400]
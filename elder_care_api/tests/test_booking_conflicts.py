@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import booking_payload
+
+from src.models.care_models import Booking
+from src.utils.booking_conflicts import MAX_BOOKING_MINUTES, find_conflict, find_conflicts
+
+@pytest.mark.parametrize('scheduled_date, duration_minutes, conflicts', [
+    ('2031-03-03T10:30:00', 60, True),   # starts inside
+    ('2031-03-03T09:30:00', 60, True),   # ends inside
+    ('2031-03-03T09:00:00', 240, True),  # covers it
+    ('2031-03-03T11:00:00', 60, False),  # starts as it ends
+    ('2031-03-03T09:00:00', 60, False),  # ends as it starts
+])
+def test_overlapping_booking_is_rejected(client, sample, book, scheduled_date, duration_minutes, conflicts):
+    existing = book('2031-03-03T10:00:00')
+    response = client.post('/api/bookings', json=booking_payload(sample, scheduled_date, duration_minutes))
+    if conflicts:
+        assert response.status_code == 409
+        assert response.get_json()['conflicting_booking_id'] == existing
+    else:
+        assert response.status_code == 201
+
+def test_pending_bookings_only_block_when_configured(app, client, sample):
+    assert client.post('/api/bookings', json=booking_payload(sample, '2031-03-03T10:00:00')).status_code == 201
+    assert client.post('/api/bookings', json=booking_payload(sample, '2031-03-03T10:30:00')).status_code == 201
+    app.config['BOOKING_CONFLICTS_INCLUDE_PENDING'] = True
+    assert client.post('/api/bookings', json=booking_payload(sample, '2031-03-03T10:15:00')).status_code == 409
+
+def test_update_checks_the_new_slot_but_not_the_booking_itself(client, book):
+    first = book('2031-03-03T10:00:00')
+    second = book('2031-03-03T12:00:00')
+    assert client.put(f'/api/bookings/{second}', json={'duration_minutes': 90}).status_code == 200
+    response = client.put(f'/api/bookings/{second}', json={'scheduled_date': '2031-03-03T10:30:00'})
+    assert response.status_code == 409
+    assert response.get_json()['conflicting_booking_id'] == first
+
+def test_find_conflicts_matches_find_conflict(app, sample, book):
+    for start in ('2031-03-03T08:00:00', '2031-03-03T10:00:00', '2031-03-03T13:00:00'):
+        book(start, 90)
+    intervals = [(datetime(2031, 3, 3, hour, minute), datetime(2031, 3, 3, hour + 1, minute))
+                 for hour in range(6, 16) for minute in (0, 30)]
+    with app.app_context():
+        batch = find_conflicts(sample['provider_id'], intervals)
+        single = [find_conflict(sample['provider_id'], start, 60) for start, _ in intervals]
+        assert [booking is not None for booking in batch] == [booking is not None for booking in single]
+        assert sum(booking is not None for booking in batch) > 0
+        assert all(isinstance(booking, Booking) for booking in batch if booking is not None)
+
+def test_a_booking_as_long_as_allowed_still_conflicts(client, sample, book):
+    existing = book('2031-03-02T12:00:00', MAX_BOOKING_MINUTES)
+    response = client.post('/api/bookings', json=booking_payload(sample, '2031-03-03T11:00:00'))
+    assert response.status_code == 409
+    assert response.get_json()['conflicting_booking_id'] == existing
+
+@pytest.mark.parametrize('duration_minutes', ['60', 0, -30, 1.5, True, MAX_BOOKING_MINUTES + 1])
+def test_invalid_durations_are_rejected(client, sample, book, duration_minutes):
+    response = client.post('/api/bookings', json=booking_payload(sample, '2031-03-03T10:00:00', duration_minutes))
+    assert response.status_code == 400
+    booking_id = book('2031-03-04T10:00:00')
+    assert client.put(f'/api/bookings/{booking_id}', json={'duration_minutes': duration_minutes}).status_code == 400
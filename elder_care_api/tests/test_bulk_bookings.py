@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import booking_payload
+from src.routes.bookings import MAX_RECURRENCE_DAYS, expand_recurrence
+
+def dates(occurrences):
+    return [start.strftime('%a %Y-%m-%d') for start, _ in occurrences]
+
+def test_weekly_recurrence_steps_by_interval_weeks():
+    rule = {'start': '2031-03-05T09:00:00', 'interval': 2, 'days': ['monday', 'wednesday'], 'until': '2031-04-01'}
+    assert dates(expand_recurrence(rule, 60)) == [
+        'Wed 2031-03-05', 'Mon 2031-03-17', 'Wed 2031-03-19', 'Mon 2031-03-31'
+    ]
+    assert dates(expand_recurrence(dict(rule, until=None, count=2), 60)) == ['Wed 2031-03-05', 'Mon 2031-03-17']
+
+def test_daily_recurrence_keeps_the_start_time():
+    occurrences = expand_recurrence({'start': '2031-03-05T09:30:00', 'frequency': 'daily', 'interval': 3,
+                                     'count': 3}, 45)
+    assert occurrences == [(datetime(2031, 3, day, 9, 30), 45) for day in (5, 8, 11)]
+
+@pytest.mark.parametrize('rule', [
+    {'until': '2040-01-01'},
+    {'count': 300, 'interval': 52},
+    {'count': 2, 'interval': 10 ** 12},
+    {'count': 2, 'interval': 0},
+])
+def test_recurrences_are_bounded(rule):
+    with pytest.raises(ValueError):
+        expand_recurrence(dict({'start': '2031-03-05T09:00:00'}, **rule), 60)
+
+def test_recurrence_span_limit_is_inclusive():
+    rule = {'start': '2031-03-05T09:00:00', 'frequency': 'daily', 'interval': MAX_RECURRENCE_DAYS, 'count': 2}
+    assert len(expand_recurrence(rule, 60)) == 2
+
+def test_bulk_booking_returns_the_inserted_rows(client, sample, book):
+    taken = book('2031-03-10T09:00:00')
+    payload = dict(booking_payload(sample, None), mode='best_effort', recurrence={
+        'start': '2031-03-03T09:00:00', 'until': '2031-03-20', 'days': ['monday', 'thursday']
+    })
+    response = client.post('/api/bookings/bulk', json=payload)
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [conflict['conflicting_booking_id'] for conflict in body['conflicts']] == [taken]
+    assert [booking['scheduled_date'][:10] for booking in body['created']] == \
+        ['2031-03-03', '2031-03-06', '2031-03-13', '2031-03-17', '2031-03-20']
+    for created in body['created']:
+        stored = client.get(f'/api/bookings/{created["id"]}').get_json()
+        assert stored['scheduled_date'] == created['scheduled_date']
+
+    assert client.post('/api/bookings/bulk', json=dict(payload, recurrence={
+        'start': '2031-03-03T09:00:00', 'count': 5, 'interval': 10 ** 12
+    })).status_code == 400
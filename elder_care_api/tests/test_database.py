@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from conftest import make_app
+from src.utils import database
+
+class CountingLock:
+    """``write_lock`` stand-in that counts its acquisitions"""
+
+    def __init__(self):
+        self.acquired = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        self.acquired += 1
+        self._lock.acquire()
+
+    def release(self):
+        self._lock.release()
+
+@pytest.fixture
+def production_client(tmp_path, monkeypatch):
+    from src.utils.seed import seed_sample_data
+    app = make_app(tmp_path / 'production.db', {'DATABASE_MODE': 'production'})
+    with app.app_context():
+        seed_sample_data()
+    monkeypatch.setattr(database, 'write_lock', CountingLock())
+    return app.test_client()
+
+def test_provider_search_reads_without_the_write_lock(production_client):
+    response = production_client.post('/api/providers/search', json={})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['total_found'] > 0
+    assert database.write_lock.acquired == 0
+
+def test_writes_take_the_write_lock(production_client):
+    production_client.post('/api/messages', json={'sender_id': 1, 'recipient_id': 2, 'content': 'Hello'})
+    assert database.write_lock.acquired == 1
@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+
+import pytest
+
+from src.models.care_models import db, Review
+from src.utils import exports
+
+DATES = ['2031-03-07T09:00:00', '2031-03-03T09:00:00', '2031-03-05T14:00:00', '2031-03-04T09:00:00',
+         '2031-03-06T11:00:00']
+
+@pytest.fixture
+def bookings(client, book):
+    """Ids of five confirmed bookings, booked out of date order"""
+    return [book(scheduled_date) for scheduled_date in DATES]
+
+def listed_bookings(client, query=''):
+    """Bookings from the list endpoint, oldest first"""
+    response = client.get(f'/api/bookings?per_page=100{query}')
+    assert response.status_code == 200
+    return list(reversed(response.get_json()['bookings']))
+
+def ndjson_rows(response):
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+def csv_rows(response):
+    return list(csv.DictReader(io.StringIO(response.data.decode())))
+
+def test_flatten_uses_dotted_names():
+    assert exports.flatten({'id': 1, 'service': {'name': 'Care', 'meta': {'tier': 2}}, 'notes': None}) == {
+        'id': 1, 'service.name': 'Care', 'service.meta.tier': 2, 'notes': None
+    }
+
+def test_booking_export_streams_ndjson_oldest_first(client, bookings, monkeypatch):
+    monkeypatch.setattr(exports, 'EXPORT_BATCH_SIZE', 2)
+    response = client.get('/api/bookings/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=bookings.ndjson'
+    rows = ndjson_rows(response)
+    assert rows == listed_bookings(client)
+    assert [row['scheduled_date'] for row in rows] == sorted(DATES)
+
+def test_booking_export_encodes_each_batch_as_one_chunk(client, bookings, monkeypatch):
+    monkeypatch.setattr(exports, 'EXPORT_BATCH_SIZE', 2)
+    response = client.get('/api/bookings/export', buffered=False)
+    try:
+        chunks = [chunk for chunk in response.response if chunk]
+    finally:
+        response.close()
+    assert [chunk.count(b'\n') for chunk in chunks] == [2, 2, 1]
+
+def test_booking_export_writes_csv_with_dotted_columns(client, bookings):
+    response = client.get('/api/bookings/export?format=csv&start_date=2031-03-04&end_date=2031-03-06T12:00:00')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=bookings.csv'
+    rows = csv_rows(response)
+    expected = listed_bookings(client, '&start_date=2031-03-04&end_date=2031-03-06T12:00:00')
+    assert len(rows) == 3
+    assert [row['id'] for row in rows] == [str(booking['id']) for booking in expected]
+    assert {'service.name', 'provider.business_name', 'elder.first_name'} <= set(rows[0])
+    assert rows[0]['service.name'] == expected[0]['service']['name']
+
+def test_empty_exports_have_no_rows(client):
+    assert client.get('/api/bookings/export').data == b''
+    assert client.get('/api/bookings/export?format=csv').data == b''
+
+@pytest.mark.parametrize('path', ['/api/bookings/export', '/api/reviews/export'])
+@pytest.mark.parametrize('query, error', [
+    ('?format=xml', 'Invalid format. Must be one of: ndjson, csv'),
+    ('?start_date=soon', 'Invalid start_date format'),
+])
+def test_exports_reject_bad_arguments(client, path, query, error):
+    response = client.get(path + query)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+def test_review_export_filters_by_provider_and_rating(app, client, sample, bookings):
+    with app.app_context():
+        for booking_id, rating in zip(bookings, (5, 2, 4, 1, 5)):
+            db.session.add(Review(booking_id=booking_id, provider_id=sample['provider_id'],
+                                  family_user_id=sample['family_user_id'], rating=rating, comment=f'{rating} stars'))
+        db.session.commit()
+
+    rows = ndjson_rows(client.get(f'/api/reviews/export?provider_id={sample["provider_id"]}&min_rating=4'))
+    assert [row['rating'] for row in rows] == [5, 4, 5]
+    assert [row['booking_id'] for row in rows] == [bookings[0], bookings[2], bookings[4]]
+    # Reviewers are named by first name and initial only
+    assert {row['family_user']['last_name'] for row in rows} == {'J.'}
+    assert all(row['family_user_id'] == sample['family_user_id'] for row in rows)
+
+    response = client.get('/api/reviews/export?format=csv&max_rating=2')
+    assert response.headers['Content-Disposition'] == 'attachment; filename=reviews.csv'
+    rows = csv_rows(response)
+    assert [(row['rating'], row['comment'], row['family_user.last_name']) for row in rows] == [
+        ('2', '2 stars', 'J.'), ('1', '1 stars', 'J.')
+    ]
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import text
+
+from src.models.care_models import db, ProviderProfile, Service, ServiceType
+from src.utils import fulltext
+
+def names(client, q):
+    response = client.get(f'/api/providers?q={q}')
+    assert response.status_code == 200
+    return [provider['business_name'] for provider in response.get_json()['providers']]
+
+def matching(app, q):
+    with app.app_context():
+        return fulltext.search(db.session, q)
+
+@pytest.mark.parametrize('q, expected', [
+    ('', None),
+    ('  ,. ', None),
+    ('nurse', '"nurse"*'),
+    ("wound-care, o'clock", '"wound" "care" "o" "clock"*'),
+])
+def test_match_query_quotes_every_word_and_prefixes_the_last(q, expected):
+    assert fulltext.build_match_query(q) == expected
+
+def test_text_search_matches_profiles_and_service_names(client):
+    assert names(client, 'wound care') == ['Sarah Johnson, RN']
+    assert names(client, 'housekeep') == ['Michael Chen, CNA']
+    # Porter stemming: "programs" matches "program"
+    assert names(client, 'program') == ['Sunshine Senior Center']
+    # Punctuation and FTS5 syntax are treated as plain words
+    assert names(client, 'NOT "senior') == []
+    assert names(client, 'senior)') == ['Sunshine Senior Center']
+
+def test_text_search_ranks_business_names_first(app, client):
+    with app.app_context():
+        first, second, third = db.session.scalars(db.select(ProviderProfile).order_by(ProviderProfile.id))
+        first.description = 'Evergreen evergreen evergreen'
+        second.specialties = 'Evergreen Gardens outings'
+        third.business_name = 'Evergreen Home Care'
+        db.session.commit()
+    assert names(client, 'evergreen') == ['Evergreen Home Care', 'Sunshine Senior Center', 'Sarah Johnson, RN']
+
+def test_triggers_follow_profile_and_service_writes(app, sample):
+    provider_id = sample['provider_id']
+    with app.app_context():
+        provider = db.session.get(ProviderProfile, provider_id)
+        provider.description = 'Speaks Cantonese and Mandarin'
+        db.session.commit()
+    assert matching(app, 'cantonese') == [provider_id]
+    assert matching(app, 'experienced') == []
+
+    with app.app_context():
+        service = Service(
+            provider_id=provider_id, name='Dementia Support', service_type=ServiceType.HOME_CARE,
+            price=50.0, duration_minutes=60
+        )
+        db.session.add(service)
+        db.session.commit()
+        service_id = service.id
+    assert matching(app, 'dementia') == [provider_id]
+
+    with app.app_context():
+        db.session.get(Service, service_id).is_active = False
+        db.session.commit()
+    assert matching(app, 'dementia') == []
+
+    with app.app_context():
+        db.session.get(Service, service_id).is_active = True
+        db.session.commit()
+        db.session.delete(db.session.get(Service, service_id))
+        db.session.commit()
+    assert matching(app, 'dementia') == []
+    assert matching(app, 'cantonese') == [provider_id]
+
+def test_triggers_follow_writes_that_bypass_the_orm(app, sample):
+    provider_id = sample['provider_id']
+    with app.app_context():
+        db.session.execute(
+            text("UPDATE provider_profiles SET business_name = 'Harbour Nursing' WHERE id = :id"),
+            {'id': provider_id}
+        )
+        db.session.execute(text("UPDATE services SET provider_id = :id"), {'id': provider_id})
+        db.session.commit()
+    assert matching(app, 'harbour') == [provider_id]
+    # Every service moved to the first provider, so only it still has service text
+    assert matching(app, 'professional') == [provider_id]
+
+    with app.app_context():
+        db.session.execute(text("DELETE FROM services WHERE provider_id = :id"), {'id': provider_id})
+        db.session.execute(text("DELETE FROM provider_profiles WHERE id = :id"), {'id': provider_id})
+        db.session.commit()
+        assert db.session.execute(text(f"SELECT count(*) FROM {fulltext.FTS_TABLE}")).scalar() == 2
+    assert matching(app, 'harbour') == []
+
+def test_rebuild_repopulates_the_index(app):
+    with app.app_context():
+        expected = fulltext.search(db.session, 'care')
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(f"DELETE FROM {fulltext.FTS_TABLE}")
+        assert fulltext.search(db.session, 'care') == []
+        with db.engine.begin() as connection:
+            fulltext.rebuild(connection)
+        assert fulltext.search(db.session, 'care') == expected
+        assert fulltext.search(db.session, 'care', limit=1) == expected[:1]
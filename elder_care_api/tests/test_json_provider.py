@@ -0,0 +1,100 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from flask import jsonify
+
+from src.models.care_models import BookingStatus
+from src.routes import providers
+from src.utils import json_provider
+from src.utils.json_provider import stream_json
+
+VALUE = {
+    'when': datetime(2031, 3, 5, 9, 30, 15, 250000),
+    'day': date(2031, 3, 5),
+    'at': time(9, 30),
+    'price': Decimal('45.50'),
+    'status': BookingStatus.CONFIRMED,
+    'count': np.int64(3),
+    'ratio': np.float64(0.25),
+    'scores': np.array([1.5, 2.0]),
+    'name': 'Chan Tai Man 陳大文',
+    'nested': {'b': [1, None, True], 'a': {2: 'two'}},
+}
+
+@pytest.fixture
+def stdlib(monkeypatch):
+    """Encode and decode without orjson"""
+    monkeypatch.setattr(json_provider, 'orjson', None)
+
+def test_both_backends_encode_the_same_bytes(app, monkeypatch):
+    encoded = app.json.dumpb(VALUE)
+    assert encoded == app.json.dumps(VALUE).encode()
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    assert app.json.dumpb(VALUE) == encoded
+    assert app.json.dumps(VALUE).encode() == encoded
+    assert json.loads(encoded) == {
+        'at': '09:30:00', 'count': 3, 'day': '2031-03-05', 'name': 'Chan Tai Man 陳大文',
+        'nested': {'a': {'2': 'two'}, 'b': [1, None, True]}, 'price': 45.5, 'ratio': 0.25,
+        'scores': [1.5, 2.0], 'status': 'confirmed', 'when': '2031-03-05T09:30:15.250000'
+    }
+
+@pytest.mark.parametrize('backend', ['orjson', 'stdlib'])
+def test_responses_are_compact_utf8_with_sorted_keys(app, request, backend):
+    if backend == 'stdlib':
+        request.getfixturevalue('stdlib')
+    with app.test_request_context():
+        response = jsonify({'z': 1, 'a': 'café'})
+    assert response.data == '{"a":"café","z":1}\n'.encode()
+    assert app.json.loads(response.data) == {'a': 'café', 'z': 1}
+
+def test_unknown_types_are_rejected(app):
+    with pytest.raises(TypeError):
+        app.json.dumpb({'value': object()})
+
+def streamed(app, *args, **kwargs):
+    """Chunks of a ``stream_json`` response, consumed inside the request context"""
+    with app.test_request_context():
+        response = stream_json(*args, **kwargs)
+        assert response.is_streamed
+        return [chunk for chunk in response.response if chunk]
+
+def test_stream_json_matches_the_buffered_encoding(app, monkeypatch):
+    items = [{'id': number, 'name': f'provider {number}', 'price': Decimal(number)} for number in range(50)]
+    envelope = {'total_found': 50, 'facets': {'city': {'Downtown': 50}}, 'limit': None}
+    expected = app.json.dumpb(dict(envelope, providers=items)) + b'\n'
+    assert b''.join(streamed(app, iter(items), envelope, 'providers')) == expected
+    assert b''.join(streamed(app, iter(items))) == app.json.dumpb(items) + b'\n'
+    assert b''.join(streamed(app, iter([]), {'total_found': 0}, 'providers')) == b'{"providers":[],"total_found":0}\n'
+
+    monkeypatch.setattr(json_provider, 'STREAM_CHUNK_BYTES', 256)
+    chunks = streamed(app, iter(items))
+    assert len(chunks) > 5
+    assert b''.join(chunks) == app.json.dumpb(items) + b'\n'
+
+def test_stream_json_consumes_items_lazily(app):
+    produced = []
+
+    def items():
+        for number in range(3):
+            produced.append(number)
+            yield number
+
+    with app.test_request_context():
+        response = stream_json(items())
+        assert produced == []
+        assert b''.join(response.response) == b'[0,1,2]\n'
+    assert produced == [0, 1, 2]
+
+def test_wide_searches_are_streamed(client, monkeypatch):
+    buffered = client.post('/api/providers/search', json={}).get_json()
+    calls = []
+    monkeypatch.setattr(providers, 'stream_json', lambda *args: calls.append(args) or stream_json(*args))
+    monkeypatch.setattr(providers, 'STREAM_MIN_RESULTS', 1)
+    monkeypatch.setattr(providers, 'STREAM_BATCH_SIZE', 2)
+    response = client.post('/api/providers/search', json={})
+    assert response.status_code == 200
+    assert len(calls) == 1
+    assert response.get_json() == buffered
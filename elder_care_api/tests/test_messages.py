@@ -0,0 +1,131 @@
+import json
+
+import pytest
+
+from src.models.care_models import db, Message
+from src.utils.message_bus import message_bus, MessageBus, Subscription
+
+def send(client, sample, content):
+    response = client.post('/api/messages', json={
+        'sender_id': sample['family_user_id'], 'recipient_id': sample['provider_user_id'], 'content': content
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['id']
+
+def stream_path(sample):
+    return f'/api/messages/stream?user_id={sample["provider_user_id"]}'
+
+def read_stream(client, path, **kwargs):
+    """Body of a stream that ends by itself; closing it unsubscribes like a disconnect"""
+    response = client.get(path, **kwargs)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_data(as_text=True)
+    response.close()
+    return body
+
+def test_streams_end_after_their_lifetime_with_the_id_to_resume_from(app, client, sample):
+    first = send(client, sample, 'Before the stream')
+    app.config['MESSAGE_STREAM_MAX_SECONDS'] = 0.2
+    body = read_stream(client, stream_path(sample))
+    assert body.startswith('retry: ')
+    assert body.endswith(f'id: {first}\n\n')
+    assert 'event: message' not in body
+
+    # Sent while the client was reconnecting: replayed from Last-Event-ID
+    second = send(client, sample, 'While reconnecting')
+    body = read_stream(client, stream_path(sample), headers={'Last-Event-ID': str(first)})
+    assert f'event: message\nid: {second}\n' in body
+    assert body.endswith(f'id: {second}\n\n')
+    assert message_bus.count == 0
+
+def test_streams_beyond_the_limit_get_503(app, client, sample):
+    app.config['MESSAGE_STREAM_LIMIT'] = 1
+    open_stream = client.get(stream_path(sample), buffered=False)
+    assert open_stream.status_code == 200
+    refused = client.get(stream_path(sample))
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == '3'
+    open_stream.close()
+    assert message_bus.count == 0
+    again = client.get(stream_path(sample), buffered=False)
+    assert again.status_code == 200
+    again.close()
+
+def test_bus_delivers_to_the_recipient_streams_only():
+    bus = MessageBus()
+    first, second = bus.subscribe(1), bus.subscribe(1)
+    other = bus.subscribe(2)
+    bus.publish(1, ('message', 5, {'id': 5}))
+    assert first.get(0) == second.get(0) == ('message', 5, {'id': 5})
+    assert other.get(0) is None
+
+    bus.unsubscribe(first)
+    bus.unsubscribe(first)
+    assert bus.count == 2
+    bus.publish(1, ('message', 6, {'id': 6}))
+    assert first.get(0) is None
+    assert second.get(0) == ('message', 6, {'id': 6})
+
+    assert bus.subscribe(3, limit=2) is None
+    bus.unsubscribe(other)
+    assert bus.subscribe(3, limit=2) is not None
+
+def test_subscriptions_that_fall_behind_are_dropped():
+    subscription = Subscription(1, maxsize=2)
+    for event_id in range(3):
+        subscription.deliver(('message', event_id, {}))
+    assert subscription.dropped
+    assert [subscription.get(0)[1] for _ in range(2)] == [0, 1]
+
+def test_messages_are_published_only_when_committed(app, sample):
+    subscription = message_bus.subscribe(sample['provider_user_id'])
+    try:
+        with app.app_context():
+            def add(content):
+                message = Message(sender_id=sample['family_user_id'], recipient_id=sample['provider_user_id'],
+                                  content=content)
+                db.session.add(message)
+                db.session.flush()
+                return message.id
+
+            add('Rolled back')
+            db.session.rollback()
+            assert subscription.get(0) is None
+
+            message_id = add('Committed')
+            assert subscription.get(0) is None
+            db.session.commit()
+        name, event_id, data = subscription.get(0)
+        assert (name, event_id, data['content']) == ('message', message_id, 'Committed')
+        assert data['sender'] == {'id': sample['family_user_id'], 'first_name': 'Mary', 'last_name': 'Johnson'}
+    finally:
+        message_bus.unsubscribe(subscription)
+
+def test_open_streams_receive_messages_and_read_receipts(client, sample):
+    response = client.get(stream_path(sample), buffered=False)
+    try:
+        events = iter(response.response)
+        assert next(events) == b'retry: 3000\n\n'
+        message_id = send(client, sample, 'Are you free on Friday?')
+        event = next(events).decode()
+        assert event.startswith(f'event: message\nid: {message_id}\ndata: ')
+        data = json.loads(event.split('data: ', 1)[1])
+        assert (data['content'], data['sender']['first_name']) == ('Are you free on Friday?', 'Mary')
+
+        read = client.post('/api/messages/read', json={'user_id': sample['provider_user_id']})
+        assert read.status_code == 200
+        event = next(events).decode()
+        assert event.startswith('event: read\ndata: ')
+        assert json.loads(event.split('data: ', 1)[1]) == {'message_ids': [message_id], 'unread_count': 0}
+    finally:
+        response.close()
+    assert message_bus.count == 0
+
+@pytest.mark.parametrize('query, headers', [
+    ('', {}),
+    ('?user_id=2', {'Last-Event-ID': 'latest'}),
+])
+def test_streams_reject_bad_arguments(client, query, headers):
+    response = client.get(f'/api/messages/stream{query}', headers=headers)
+    assert response.status_code == 400
+    assert message_bus.count == 0
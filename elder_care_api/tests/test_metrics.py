@@ -0,0 +1,16 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.models.care_models import db
+from src.utils.metrics import metrics
+
+def test_failed_statements_leave_no_timer_behind(app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            count, _ = metrics.sql_totals.get('default', [0, 0.0])
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    connection.exec_driver_sql('SELECT * FROM no_such_table')
+            assert connection.exec_driver_sql('SELECT 1').scalar() == 1
+            assert metrics.sql_totals['default'][0] == count + 1
+            assert not any(isinstance(value, list) for value in connection.info.values())
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pytest
+
+from src.utils.pagination import decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    token = encode_cursor(datetime(2031, 3, 3, 10, 30), 42)
+    assert '=' not in token
+    assert decode_cursor(token, (datetime, int)) == [datetime(2031, 3, 3, 10, 30), 42]
+    assert decode_cursor(token) == ['2031-03-03T10:30:00', 42]
+
+@pytest.mark.parametrize('token', ['not a cursor', encode_cursor(1), encode_cursor('yesterday', 1), 'W10'])
+def test_invalid_cursors_are_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, (datetime, int))
+
+def walk(client, url):
+    """Ids of every page of a keyset-paginated booking list"""
+    ids, cursor = [], ''
+    while cursor is not None:
+        body = client.get(f'{url}&cursor={cursor}').get_json()
+        ids += [booking['id'] for booking in body['bookings']]
+        cursor = body['pagination']['next_cursor']
+    return ids
+
+def test_keyset_pages_cover_the_same_rows_as_numbered_pages(client, sample, book):
+    for day in range(3, 10):
+        book(f'2031-03-{day:02d}T10:00:00')
+        book(f'2031-03-{day:02d}T14:00:00')
+    url = f'/api/bookings?family_user_id={sample["family_user_id"]}&per_page=4'
+    numbered = []
+    for page in range(1, 5):
+        numbered += [booking['id'] for booking in client.get(f'{url}&page={page}').get_json()['bookings']]
+    assert len(numbered) == 14
+    assert walk(client, url) == numbered
+
+    body = client.get(f'{url}&cursor=&include_total=true').get_json()
+    assert body['pagination']['total'] == 14
+    assert client.get(f'{url}&cursor=garbage').status_code == 400
@@ -0,0 +1,108 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.models.care_models import db, User, UserRole, ProviderProfile, ProviderType, Service, ServiceType
+from src.utils.provider_index import (
+    provider_index, bits_from_slots, slots_from_bits, slot_array, bits_from_flags
+)
+
+def test_bitset_helpers_round_trip():
+    rng = random.Random(7)
+    for size in (1, 8, 9, 200):
+        slots = sorted(rng.sample(range(size), rng.randint(0, size)))
+        bits = bits_from_slots(slots, size)
+        assert bits.bit_count() == len(slots)
+        assert slots_from_bits(bits) == slots
+        assert slot_array(bits).tolist() == slots
+        flags = np.zeros(size, dtype=bool)
+        flags[slots] = True
+        assert bits_from_flags(flags) == bits
+
+def test_listing_facets_count_the_matching_providers(client):
+    facets = client.get('/api/providers').get_json()['facets']
+    assert facets == {
+        'provider_type': {'individual': 2, 'facility': 1},
+        'service_type': {'medical_services': 1, 'home_care': 2, 'adult_day_care': 1, 'transportation': 1},
+        'city': {'Downtown': 1, 'Westside': 1, 'Northside': 1},
+        'state': {'CA': 3},
+        'verified': {'true': 3},
+    }
+
+    facets = client.get('/api/providers?service_type=home_care&city=DOWN').get_json()['facets']
+    assert facets['provider_type'] == {'individual': 1}
+    assert facets['city'] == {'Downtown': 1}
+    assert facets['service_type'] == {'medical_services': 1, 'home_care': 1}
+
+    search = client.post('/api/providers/search', json={'budget_range': {'max_hourly': 40}}).get_json()
+    assert search['facets']['city'] == {'Northside': 1}
+
+def comparable(array):
+    """Column values as a list, with NaN (no hourly rate or location) as None since NaN != NaN"""
+    return [None if value != value else value for value in array.tolist()]
+
+def snapshot_of_index():
+    """Search results, facets and scoring columns of the index, keyed by provider id"""
+    matches = provider_index.search()
+    columns = provider_index.columns()
+    live = columns['id'] >= 0
+    return {
+        'ids': matches.ids(),
+        'facets': matches.facets(),
+        'home_care': provider_index.search(service_types=[ServiceType.HOME_CARE]).ids(),
+        'verified': provider_index.search(verified_only=True).ids(),
+        'rating': provider_index.search(min_rating=4.75).ids(),
+        'hourly': provider_index.search(min_hourly=30, max_hourly=50).ids(),
+        'columns': {
+            name: dict(zip(columns['id'][live].tolist(), comparable(array[live])))
+            for name, array in columns.items()
+        },
+    }
+
+def test_writes_refresh_only_the_changed_providers(app, sample, monkeypatch):
+    with app.app_context():
+        provider_index.search()
+        provider_index.columns()
+        generation = provider_index.generation
+        first, second, third = db.session.scalars(db.select(ProviderProfile).order_by(ProviderProfile.id))
+
+        third.hourly_rate = 60
+        third.is_verified = False
+        db.session.get(User, first.user_id).is_active = False
+        db.session.add(Service(
+            provider_id=second.id, name='Home Visits', service_type=ServiceType.HOME_CARE,
+            price=40.0, duration_minutes=60
+        ))
+        user = User(
+            username='harbour_care', email='harbour@example.com', password_hash='x',
+            first_name='Harbour', last_name='Care', role=UserRole.PROVIDER
+        )
+        db.session.add(user)
+        db.session.flush()
+        newcomer = ProviderProfile(
+            user_id=user.id, provider_type=ProviderType.PHARMACY, business_name='Harbour Pharmacy',
+            city='Downtown', state='CA', zip_code='90210', hourly_rate=30, rating=4.8, total_reviews=3
+        )
+        db.session.add(newcomer)
+        db.session.commit()
+
+        refreshed = []
+        monkeypatch.setattr(provider_index, 'rebuild', lambda: pytest.fail('expected an incremental refresh'))
+        original = provider_index._refresh
+        monkeypatch.setattr(provider_index, '_refresh', lambda ids: (refreshed.extend(ids), original(ids)))
+        incremental = snapshot_of_index()
+        assert provider_index.generation == generation
+        assert sorted(refreshed) == sorted([first.id, second.id, third.id, newcomer.id])
+
+        assert incremental['ids'] == [second.id, third.id, newcomer.id]
+        assert incremental['home_care'] == [second.id, third.id]
+        assert incremental['verified'] == [second.id]
+        assert incremental['rating'] == [second.id, newcomer.id]
+        assert incremental['hourly'] == [newcomer.id]
+        assert incremental['facets']['provider_type'] == {'facility': 1, 'individual': 1, 'pharmacy': 1}
+
+        monkeypatch.undo()
+        provider_index.invalidate()
+        assert snapshot_of_index() == incremental
+        assert provider_index.generation == generation + 1
@@ -0,0 +1,69 @@
+import pytest
+
+def search(client, body, query=''):
+    return client.post(f'/api/providers/search{query}', json=body)
+
+def test_search_pages_with_limit_and_offset(client):
+    everything = search(client, {}).get_json()
+    ids = [provider['id'] for provider in everything['providers']]
+    assert everything['total_found'] == len(ids) == 3
+
+    page = search(client, {'limit': 1, 'offset': 1}).get_json()
+    assert [provider['id'] for provider in page['providers']] == ids[1:2]
+    assert (page['limit'], page['offset'], page['total_found']) == (1, 1, 3)
+    assert search(client, {}, '?limit=2&offset=1').get_json()['providers'] == everything['providers'][1:3]
+    assert search(client, {'limit': 0}).get_json()['providers'] == []
+
+@pytest.mark.parametrize('body, query', [
+    ({'limit': 'ten'}, ''),
+    ({'limit': -1}, ''),
+    ({'limit': 2.5}, ''),
+    ({'offset': -5}, ''),
+    ({'offset': 'next'}, ''),
+    ({}, '?limit=abc'),
+    ({}, '?offset=-1'),
+])
+def test_search_rejects_bad_limits_and_offsets(client, body, query):
+    response = search(client, body, query)
+    assert response.status_code == 400
+    assert 'must be a non-negative integer' in response.get_json()['error']
+
+def test_radius_searches_use_the_given_radius(client):
+    near = {'near': '90210'}
+    default = search(client, {'location': near}).get_json()
+    tiny = search(client, {'location': dict(near, radius_km=0.001)}).get_json()
+    assert default['total_found'] >= tiny['total_found']
+    assert all(provider['distance_km'] <= 0.001 for provider in tiny['providers'])
+    listed = client.get('/api/providers?near=90210&radius_km=0.001').get_json()
+    assert listed['pagination']['total'] == tiny['total_found']
+
+@pytest.mark.parametrize('radius_km', [0, -5, 'far', True])
+def test_searches_reject_radii_that_are_not_positive(client, radius_km):
+    response = search(client, {'location': {'near': '90210', 'radius_km': radius_km}})
+    assert response.status_code == 400
+    assert 'radius_km' in response.get_json()['error']
+    assert client.get(f'/api/providers?near=90210&radius_km={radius_km}').status_code == 400
+
+@pytest.mark.parametrize('numbers, strings', [
+    ({'budget_range': {'min_hourly': 40}}, {'budget_range': {'min_hourly': '40'}}),
+    ({'budget_range': {'max_hourly': 40}}, {'budget_range': {'max_hourly': '40.0'}}),
+    ({'preferences': {'min_rating': 4.8}}, {'preferences': {'min_rating': '4.8'}}),
+])
+def test_budget_and_rating_bounds_accept_numeric_strings(client, numbers, strings):
+    expected = search(client, numbers).get_json()
+    assert 0 < expected['total_found'] < 3
+    response = search(client, strings)
+    assert response.status_code == 200
+    assert response.get_json()['providers'] == expected['providers']
+
+@pytest.mark.parametrize('body, name', [
+    ({'budget_range': {'min_hourly': 'cheap'}}, 'budget_range.min_hourly'),
+    ({'budget_range': {'max_hourly': [50]}}, 'budget_range.max_hourly'),
+    ({'budget_range': {'max_hourly': 'inf'}}, 'budget_range.max_hourly'),
+    ({'preferences': {'min_rating': 'good'}}, 'preferences.min_rating'),
+    ({'preferences': {'min_rating': True}}, 'preferences.min_rating'),
+])
+def test_searches_reject_bounds_that_are_not_numbers(client, body, name):
+    response = search(client, body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f'{name} must be a number'
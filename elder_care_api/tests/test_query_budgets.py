@@ -0,0 +1,7 @@
+from check_query_budgets import run_checks
+
+def test_every_request_within_its_query_budget(seeded):
+    app, ids = seeded
+    lines, checked, failures = run_checks(app, ids)
+    assert checked > 0
+    assert not failures, '\n'.join(failures)
@@ -0,0 +1,7 @@
+from check_query_plans import format_failure, run_checks
+
+def test_no_unexpected_full_table_scans(seeded):
+    app, ids = seeded
+    checked, failures = run_checks(app, ids)
+    assert checked > 0
+    assert not failures, '\n'.join(format_failure(failure) for failure in failures)
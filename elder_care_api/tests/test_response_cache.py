@@ -0,0 +1,45 @@
+from src.models.care_models import db, ProviderProfile
+
+def rename_elsewhere(app, provider_id, name):
+    """Change a provider the way another worker would: committed, but unseen by this process's change feed"""
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('UPDATE provider_profiles SET business_name = ? WHERE id = ?', (name, provider_id))
+
+def test_writes_through_the_orm_invalidate_entries(app, client, sample):
+    path = f'/api/providers/{sample["provider_id"]}'
+    assert client.get(path).headers['X-Cache'] == 'MISS'
+    assert client.get(path).headers['X-Cache'] == 'HIT'
+    client.post('/api/messages', json={'sender_id': sample['family_user_id'], 'recipient_id': sample['provider_user_id'],
+                                       'content': 'Hello'})
+    assert client.get(path).headers['X-Cache'] == 'HIT'
+    with app.app_context():
+        db.session.get(ProviderProfile, sample['provider_id']).business_name = 'Renamed'
+        db.session.commit()
+    response = client.get(path)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['business_name'] == 'Renamed'
+
+def test_conditional_requests_get_304(client, sample):
+    path = f'/api/providers/{sample["provider_id"]}'
+    etag = client.get(path).headers['ETag']
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+def test_entries_expire_so_other_workers_writes_show_up(app, client, sample):
+    path = f'/api/providers/{sample["provider_id"]}'
+    client.get(path)
+    rename_elsewhere(app, sample['provider_id'], 'Renamed Elsewhere')
+    app.config['RESPONSE_CACHE_MAX_AGE'] = 3600
+    assert client.get(path).headers['X-Cache'] == 'HIT'
+    app.config['RESPONSE_CACHE_MAX_AGE'] = 0
+    response = client.get(path)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['business_name'] == 'Renamed Elsewhere'
+
+def test_provider_dashboard_is_cached_once_its_provider_id_is_known(client, sample):
+    from src.routes import dashboards
+    path = f'/api/dashboard/provider/{sample["provider_user_id"]}'
+    assert client.get(path).headers['X-Cache'] == 'MISS'
+    assert dashboards._provider_ids.get(sample['provider_user_id']) == sample['provider_id']
+    assert client.get(path).headers['X-Cache'] == 'MISS'
+    assert client.get(path).headers['X-Cache'] == 'HIT'
@@ -0,0 +1,76 @@
+from collections import Counter
+
+from src.models.care_models import db, Booking, Service, ServiceType
+from src.utils import rollups
+
+RAW = """
+    SELECT b.provider_id, date(b.scheduled_date), s.service_type, coalesce(b.status, 'PENDING'),
+           count(*), sum(coalesce(b.duration_minutes, 0)), sum(coalesce(b.total_cost, 0))
+      FROM bookings b JOIN services s ON s.id = b.service_id
+     GROUP BY 1, 2, 3, 4
+"""
+
+def rows(sql):
+    return sorted((*row[:-1], round(row[-1], 2)) for row in db.session.execute(db.text(sql)))
+
+def assert_rollups_match_bookings():
+    raw = rows(RAW)
+    assert rows(f'SELECT provider_id, day, service_type, status, bookings, minutes, revenue '
+                f'FROM {rollups.ROLLUP_TABLE}') == raw
+    totals = {}
+    for _, *key, count, minutes, revenue in raw:
+        totals[tuple(key)] = totals.get(tuple(key), Counter()) + Counter(count=count, minutes=minutes, revenue=revenue)
+    assert rows(f'SELECT day, service_type, status, bookings, minutes, revenue FROM {rollups.TOTALS_TABLE}') == \
+        sorted((*key, total['count'], total['minutes'], round(total['revenue'], 2)) for key, total in totals.items())
+
+def complete(client, booking_id):
+    for status in ('in_progress', 'completed'):
+        assert client.put(f'/api/bookings/{booking_id}/status', json={'status': status}).status_code == 200
+
+def test_triggers_keep_the_rollups_in_step_with_bookings(app, client, sample, book):
+    first = book('2031-03-03T10:00:00')
+    second = book('2031-03-03T14:00:00', 90)
+    third = book('2031-03-04T10:00:00', 30)
+    with app.app_context():
+        assert_rollups_match_bookings()
+
+    assert client.put(f'/api/bookings/{first}', json={'scheduled_date': '2031-03-05T09:00:00'}).status_code == 200
+    complete(client, first)
+    assert client.delete(f'/api/bookings/{second}').status_code == 200
+    with app.app_context():
+        assert_rollups_match_bookings()
+        db.session.delete(db.session.get(Booking, third))
+        db.session.commit()
+        assert_rollups_match_bookings()
+
+        service = db.session.get(Service, sample['service_id'])
+        service.service_type = ServiceType.COMPANIONSHIP if service.service_type != ServiceType.COMPANIONSHIP \
+            else ServiceType.HOME_CARE
+        db.session.commit()
+        assert_rollups_match_bookings()
+
+        # Drifted rows are repaired by a rebuild
+        db.session.execute(db.text(f'DELETE FROM {rollups.ROLLUP_TABLE}'))
+        rollups.rebuild(db.session.connection())
+        db.session.commit()
+        assert_rollups_match_bookings()
+
+def test_analytics_reads_the_rollups(client, sample, book):
+    complete(client, book('2031-03-03T10:00:00', 120))
+    book('2031-03-10T10:00:00')
+    client.delete(f'/api/bookings/{book("2031-03-11T10:00:00")}')
+
+    response = client.get('/api/analytics/bookings?start_date=2031-03-01&end_date=2031-03-31&granularity=week')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['totals']['bookings'] == 3
+    assert body['totals']['cancellations'] == 1
+    assert body['totals']['hours'] == 2
+    assert [bucket['period'] for bucket in body['buckets']] == \
+        ['2031-02-24', '2031-03-03', '2031-03-10', '2031-03-17', '2031-03-24', '2031-03-31']
+    assert [bucket['bookings'] for bucket in body['buckets']] == [0, 1, 2, 0, 0, 0]
+
+    response = client.get(f'/api/analytics/providers/{sample["provider_id"]}/bookings'
+                          '?start_date=2031-03-01&end_date=2031-03-31&granularity=month')
+    assert response.get_json()['totals'] == body['totals']
+    assert client.get('/api/analytics/bookings?granularity=year').status_code == 400
@@ -0,0 +1,109 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.models.care_models import ServiceType
+from src.utils.geo import parse_radius, DEFAULT_RADIUS_KM
+from src.utils.provider_index import COLUMN_DTYPES, ProviderRecord, column_values
+from src.utils.scoring import score_candidates, top_k, AVAILABILITY_WEIGHT
+
+def reference_score(provider, search_criteria, distance_km=None, availability_ratio=None):
+    """Match score of one provider, the way search scored each provider before it was vectorized"""
+    score = 0
+
+    # Base score for verified providers
+    if provider.is_verified:
+        score += 20
+
+    # Rating score (0-25 points)
+    score += ((provider.rating or 0.0) / 5.0) * 25
+
+    # Service match score
+    services_needed = search_criteria.get('services', [])
+    if services_needed:
+        provider_services = [service_type.value for service_type in provider.service_types]
+        matching_services = set(services_needed) & set(provider_services)
+        service_match_ratio = len(matching_services) / len(services_needed)
+        score += service_match_ratio * 30
+
+    # Budget compatibility score
+    budget_range = search_criteria.get('budget_range', {})
+    if budget_range.get('max_hourly') and provider.hourly_rate:
+        if provider.hourly_rate <= budget_range['max_hourly']:
+            score += 15
+
+    # Review count bonus
+    if provider.total_reviews > 10:
+        score += 10
+    elif provider.total_reviews > 5:
+        score += 5
+
+    # Proximity score (0-10 points, falling off linearly to the radius edge)
+    if distance_km is not None:
+        radius_km = parse_radius(search_criteria.get('location', {}).get('radius_km')) or DEFAULT_RADIUS_KM
+        score += (1 - min(distance_km / radius_km, 1)) * 10
+
+    # Availability score (0-10 points for the share of requested time that is free)
+    if availability_ratio is not None:
+        score += availability_ratio * AVAILABILITY_WEIGHT
+
+    return min(score, 100)  # Cap at 100
+
+def make_providers(rng, count):
+    """Providers drawn from few distinct values, so many of them tie"""
+    service_types = list(ServiceType)
+    return [ProviderRecord(
+        id=provider_id, user_id=provider_id, provider_type=None, city=None, city_key=None, state_key=None,
+        zip_code=None, is_verified=rng.random() < 0.5, is_active=True,
+        rating=rng.choice([None, 0.0, 3.5, 4.0, 4.5, 5.0]),
+        total_reviews=rng.choice([0, 5, 6, 10, 11, 40]),
+        hourly_rate=rng.choice([None, 0.0, 20.0, 35.0, 45.0]),
+        service_types=frozenset(rng.sample(service_types, rng.randint(0, 3))),
+        location_key=None, latitude=None, longitude=None
+    ) for provider_id in rng.sample(range(1, 10 * count), count)]
+
+def make_columns(providers):
+    rows = [column_values(provider) for provider in providers]
+    return {name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in COLUMN_DTYPES.items()}
+
+CRITERIA = [
+    {},
+    {'services': ['companionship', 'home_care']},
+    {'services': ['medical_services', 'unknown']},
+    {'budget_range': {'max_hourly': 35}},
+    {'location': {'radius_km': 5}},
+    {'services': ['companionship'], 'budget_range': {'max_hourly': 45}, 'location': {'radius_km': 2.5}},
+]
+
+@pytest.mark.parametrize('criteria', CRITERIA)
+@pytest.mark.parametrize('with_distances', [False, True])
+@pytest.mark.parametrize('with_availability', [False, True])
+def test_vectorized_scores_match_the_reference(criteria, with_distances, with_availability):
+    rng = random.Random(repr((criteria, with_distances, with_availability)))
+    providers = make_providers(rng, 200)
+    distances = availability = None
+    if with_distances:
+        # Providers without a known location have no distance
+        distances = [rng.choice([None, 0.0, 1.0, 2.5, 4.0, 12.0]) for _ in providers]
+    if with_availability:
+        availability = [rng.choice([0.0, 0.25, 0.5, 1.0]) for _ in providers]
+
+    expected = [reference_score(
+        provider, criteria,
+        distance_km=distances[position] if distances else None,
+        availability_ratio=availability[position] if availability else None
+    ) for position, provider in enumerate(providers)]
+
+    columns = make_columns(providers)
+    slots = np.arange(len(providers))
+    scores = score_candidates(
+        columns, slots, criteria,
+        np.array([np.nan if distance is None else distance for distance in distances]) if distances else None,
+        np.array(availability) if availability else None
+    )
+    assert scores.tolist() == pytest.approx(expected)
+
+    ranked = sorted(range(len(providers)), key=lambda position: (-expected[position], providers[position].id))
+    for k in (1, 7, 50, len(providers)):
+        assert top_k(scores, columns['id'], k).tolist() == ranked[:k]